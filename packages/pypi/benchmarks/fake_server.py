@@ -0,0 +1,369 @@
+"""In-process fake of the Dataform gRPC service used by the benchmarks.
+
+The fake keeps repositories, workspaces, files, compilation results and workflow invocations in
+memory and answers with raw protobuf messages, so the client side (DataformTools, the policy layer,
+proto-plus marshalling) is what gets measured. Latency and error rates are configurable per server.
+"""
+import random
+import threading
+import time
+from concurrent import futures
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import grpc
+from google.cloud import dataform_v1beta1
+from google.cloud.dataform_v1beta1.services.dataform.transports import DataformGrpcAsyncIOTransport, DataformGrpcTransport
+from google.protobuf import empty_pb2, timestamp_pb2
+
+from dataform_tools import AsyncDataformTools, ClientPool, DataformTools
+
+
+SERVICE_NAME = "google.cloud.dataform.v1beta1.Dataform"
+
+
+def _pb(message_type: Any) -> Any:
+    return message_type.pb(message_type())
+
+
+def generate_actions(count: int, database: str = "project", schema: str = "dataset", max_dependencies: int = 3, seed: int = 0) -> List[Any]:
+    """Generates count raw CompilationResultAction protos forming a DAG; each action depends on up to max_dependencies earlier ones."""
+    rng = random.Random(seed)
+    relation_type = dataform_v1beta1.CompilationResultAction.Relation.RelationType.TABLE
+    actions = []
+    for index in range(count):
+        action = _pb(dataform_v1beta1.CompilationResultAction)
+        action.target.database = database
+        action.target.schema = schema
+        action.target.name = f"table_{index}"
+        action.relation.relation_type = relation_type
+        action.relation.select_query = f"select * from `{database}.{schema}.table_{index}`"
+        action.relation.tags.append(f"tag_{index % 10}")
+        for dependency in sorted({rng.randrange(index) for _ in range(min(index, max_dependencies))}):
+            target = action.relation.dependency_targets.add()
+            target.database = database
+            target.schema = schema
+            target.name = f"table_{dependency}"
+        actions.append(action)
+    return actions
+
+
+class FakeDataformServer():
+    def __init__(self, actions: int = 1000, latency_seconds: float = 0.0, latency_jitter_seconds: float = 0.0, error_rate: float = 0.0, error_code: grpc.StatusCode = grpc.StatusCode.UNAVAILABLE, invocation_seconds: float = 0.0, npm_install_seconds: float = 0.0, max_workers: int = 32, seed: int = 0):
+        """Fake Dataform service listening on an ephemeral localhost port.
+        Args:
+            actions (int): Number of actions in every compilation result.
+            latency_seconds (float): Server side delay added to every call.
+            latency_jitter_seconds (float): Uniform random delay added on top of latency_seconds.
+            error_rate (float): Probability that a call fails with error_code instead of being served.
+            error_code (grpc.StatusCode): Status returned by injected failures.
+            invocation_seconds (float): Seconds a workflow invocation stays RUNNING before it SUCCEEDED.
+            npm_install_seconds (float): Extra delay of InstallNpmPackages, which takes tens of seconds in Dataform.
+            max_workers (int): Size of the server thread pool, i.e. calls served concurrently.
+            seed (int): Seed of the action graph and of the latency/error randomness.
+        """
+        self.latency_seconds = latency_seconds
+        self.latency_jitter_seconds = latency_jitter_seconds
+        self.error_rate = error_rate
+        self.error_code = error_code
+        self.invocation_seconds = invocation_seconds
+        self.npm_install_seconds = npm_install_seconds
+        self.max_workers = max_workers
+        self.actions = generate_actions(actions, seed=seed)
+        self.calls: Dict[str, int] = {}
+        # full resource names, workspaces are also created by CreateWorkspace
+        self.repositories: Set[str] = set()
+        self.workspaces: Set[str] = set()
+        self.files: Dict[Tuple[str, str], bytes] = {}
+        self.committed_files: Dict[Tuple[str, str], bytes] = {}
+        # commit SHAs of the default branch, newest first, shared by every repository
+        self.commit_shas: List[str] = []
+        self.compilation_results: Dict[str, Any] = {}
+        self.invocations: Dict[str, Tuple[Any, float]] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[grpc.Server] = None
+        self.port = 0
+
+    @property
+    def address(self) -> str:
+        return f"127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self) -> None:
+        handlers = {name: self._handler(name, request_type, response_type, function) for name, (request_type, response_type, function) in self._methods().items()}
+        self._server = grpc.server(futures.ThreadPoolExecutor(self.max_workers))
+        self._server.add_generic_rpc_handlers((grpc.method_handlers_generic_handler(SERVICE_NAME, handlers),))
+        self.port = self._server.add_insecure_port("127.0.0.1:0")
+        self._server.start()
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.stop(grace=None)
+            self._server = None
+
+    def client_pool(self, **kwargs) -> "FakeClientPool":
+        """Returns a ClientPool whose clients talk to this server over an insecure channel."""
+        return FakeClientPool(self.address, **kwargs)
+
+    def dataform_tools(self, client_pool: Optional[ClientPool] = None, **kwargs) -> DataformTools:
+        """Returns a DataformTools connected to this server. Extra arguments are passed to DataformTools."""
+        return DataformTools("project", "location", client_pool=client_pool or self.client_pool(), **kwargs)
+
+    def async_dataform_tools(self, **kwargs) -> "FakeAsyncDataformTools":
+        """Returns an AsyncDataformTools connected to this server, create it inside the event loop that uses it."""
+        return FakeAsyncDataformTools(self.address, "project", "location", **kwargs)
+
+    def _handler(self, name: str, request_type: Any, response_type: Any, function: Callable[[Any], Any]) -> grpc.RpcMethodHandler:
+        def handle(request: Any, context: grpc.ServicerContext) -> Any:
+            with self._lock:
+                self.calls[name] = self.calls.get(name, 0) + 1
+                delay = self.latency_seconds + self._random.uniform(0, self.latency_jitter_seconds)
+                failed = self._random.random() < self.error_rate
+            if delay > 0:
+                time.sleep(delay)
+            if failed:
+                context.abort(self.error_code, f"Injected {self.error_code.name} error")
+            try:
+                return function(request)
+            except KeyError as e:
+                context.abort(grpc.StatusCode.NOT_FOUND, f"{e} not found")
+            except FileExistsError as e:
+                context.abort(grpc.StatusCode.ALREADY_EXISTS, f"{e} already exists")
+
+        return grpc.unary_unary_rpc_method_handler(
+            handle,
+            request_deserializer=request_type.pb(request_type()).FromString,
+            response_serializer=lambda response: response.SerializeToString(),
+        )
+
+    def _methods(self) -> Dict[str, Tuple[Any, Any, Callable[[Any], Any]]]:
+        types = dataform_v1beta1
+        return {
+            "ListRepositories": (types.ListRepositoriesRequest, types.ListRepositoriesResponse, self._list_repositories),
+            "ListWorkspaces": (types.ListWorkspacesRequest, types.ListWorkspacesResponse, self._list_workspaces),
+            "CreateWorkspace": (types.CreateWorkspaceRequest, types.Workspace, self._create_workspace),
+            "GetWorkspace": (types.GetWorkspaceRequest, types.Workspace, self._get_workspace),
+            "DeleteWorkspace": (types.DeleteWorkspaceRequest, empty_pb2.Empty, self._delete_workspace),
+            "CreateCompilationResult": (types.CreateCompilationResultRequest, types.CompilationResult, self._create_compilation_result),
+            "GetCompilationResult": (types.GetCompilationResultRequest, types.CompilationResult, lambda request: self.compilation_results[request.name]),
+            "QueryCompilationResultActions": (types.QueryCompilationResultActionsRequest, types.QueryCompilationResultActionsResponse, self._query_compilation_result_actions),
+            "CreateWorkflowInvocation": (types.CreateWorkflowInvocationRequest, types.WorkflowInvocation, self._create_workflow_invocation),
+            "GetWorkflowInvocation": (types.GetWorkflowInvocationRequest, types.WorkflowInvocation, lambda request: self._workflow_invocation(request.name)),
+            "ListWorkflowInvocations": (types.ListWorkflowInvocationsRequest, types.ListWorkflowInvocationsResponse, self._list_workflow_invocations),
+            "QueryWorkflowInvocationActions": (types.QueryWorkflowInvocationActionsRequest, types.QueryWorkflowInvocationActionsResponse, self._query_workflow_invocation_actions),
+            "WriteFile": (types.WriteFileRequest, types.WriteFileResponse, self._write_file),
+            "ReadFile": (types.ReadFileRequest, types.ReadFileResponse, self._read_file),
+            "RemoveFile": (types.RemoveFileRequest, types.RemoveFileResponse, self._remove_file),
+            "QueryDirectoryContents": (types.QueryDirectoryContentsRequest, types.QueryDirectoryContentsResponse, self._query_directory_contents),
+            "FetchFileGitStatuses": (types.FetchFileGitStatusesRequest, types.FetchFileGitStatusesResponse, self._fetch_file_git_statuses),
+            "FetchGitAheadBehind": (types.FetchGitAheadBehindRequest, types.FetchGitAheadBehindResponse, lambda request: _pb(types.FetchGitAheadBehindResponse)),
+            "ResetWorkspaceChanges": (types.ResetWorkspaceChangesRequest, types.ResetWorkspaceChangesResponse, self._reset_workspace_changes),
+            "FetchRepositoryHistory": (types.FetchRepositoryHistoryRequest, types.FetchRepositoryHistoryResponse, self._fetch_repository_history),
+            # tests change committed_files themselves to stand for what a pull brings in
+            "PullGitCommits": (types.PullGitCommitsRequest, types.PullGitCommitsResponse, lambda request: _pb(types.PullGitCommitsResponse)),
+            "InstallNpmPackages": (types.InstallNpmPackagesRequest, types.InstallNpmPackagesResponse, self._install_npm_packages),
+        }
+
+    @staticmethod
+    def _page(names: List[str], request: Any, response: Any, field: str) -> Any:
+        start = int(request.page_token or 0)
+        end = start + (request.page_size or 100)
+        for name in names[start:end]:
+            getattr(response, field).add().name = name
+        if end < len(names):
+            response.next_page_token = str(end)
+        return response
+
+    def _list_repositories(self, request: Any) -> Any:
+        names = sorted(name for name in self.repositories if name.rsplit("/repositories/", 1)[0] == request.parent)
+        return self._page(names, request, _pb(dataform_v1beta1.ListRepositoriesResponse), "repositories")
+
+    def _list_workspaces(self, request: Any) -> Any:
+        names = sorted(name for name in self.workspaces if name.rsplit("/workspaces/", 1)[0] == request.parent)
+        return self._page(names, request, _pb(dataform_v1beta1.ListWorkspacesResponse), "workspaces")
+
+    def _create_workspace(self, request: Any) -> Any:
+        workspace = _pb(dataform_v1beta1.Workspace)
+        workspace.name = f"{request.parent}/workspaces/{request.workspace_id}"
+        with self._lock:
+            if workspace.name in self.workspaces:
+                raise FileExistsError(workspace.name)
+            self.workspaces.add(workspace.name)
+        return workspace
+
+    def _get_workspace(self, request: Any) -> Any:
+        if request.name not in self.workspaces:
+            raise KeyError(request.name)
+        workspace = _pb(dataform_v1beta1.Workspace)
+        workspace.name = request.name
+        return workspace
+
+    def _delete_workspace(self, request: Any) -> Any:
+        with self._lock:
+            self.workspaces.remove(request.name)
+            for key in [key for key in self.files if key[0] == request.name]:
+                del self.files[key]
+        return empty_pb2.Empty()
+
+    def _install_npm_packages(self, request: Any) -> Any:
+        if self.npm_install_seconds > 0:
+            time.sleep(self.npm_install_seconds)
+        return _pb(dataform_v1beta1.InstallNpmPackagesResponse)
+
+    def _create_compilation_result(self, request: Any) -> Any:
+        result = _pb(dataform_v1beta1.CompilationResult)
+        result.CopyFrom(request.compilation_result)
+        with self._lock:
+            result.name = f"{request.parent}/compilationResults/{len(self.compilation_results) + 1}"
+            self.compilation_results[result.name] = result
+        if result.git_commitish:
+            result.resolved_git_commit_sha = f"{abs(hash(result.git_commitish)):040x}"[:40]
+        return result
+
+    def _query_compilation_result_actions(self, request: Any) -> Any:
+        response = _pb(dataform_v1beta1.QueryCompilationResultActionsResponse)
+        start = int(request.page_token or 0)
+        end = start + (request.page_size or 1000)
+        response.compilation_result_actions.extend(self.actions[start:end])
+        if end < len(self.actions):
+            response.next_page_token = str(end)
+        return response
+
+    def _create_workflow_invocation(self, request: Any) -> Any:
+        invocation = _pb(dataform_v1beta1.WorkflowInvocation)
+        invocation.CopyFrom(request.workflow_invocation)
+        invocation.state = dataform_v1beta1.WorkflowInvocation.State.RUNNING
+        invocation.invocation_timing.start_time.CopyFrom(timestamp_pb2.Timestamp(seconds=int(time.time())))
+        with self._lock:
+            invocation.name = f"{request.parent}/workflowInvocations/{len(self.invocations) + 1}"
+            self.invocations[invocation.name] = (invocation, time.monotonic() + self.invocation_seconds)
+        return invocation
+
+    def _workflow_invocation(self, name: str) -> Any:
+        invocation, finishes_at = self.invocations[name]
+        if invocation.state == dataform_v1beta1.WorkflowInvocation.State.RUNNING and time.monotonic() >= finishes_at:
+            invocation.state = dataform_v1beta1.WorkflowInvocation.State.SUCCEEDED
+            invocation.invocation_timing.end_time.CopyFrom(timestamp_pb2.Timestamp(seconds=int(time.time())))
+        return invocation
+
+    def _list_workflow_invocations(self, request: Any) -> Any:
+        response = _pb(dataform_v1beta1.ListWorkflowInvocationsResponse)
+        names = sorted((name for name in self.invocations if name.startswith(request.parent + "/")), key=lambda name: int(name.rsplit("/", 1)[1]), reverse=True)
+        start = int(request.page_token or 0)
+        end = start + (request.page_size or 100)
+        response.workflow_invocations.extend(self._workflow_invocation(name) for name in names[start:end])
+        if end < len(names):
+            response.next_page_token = str(end)
+        return response
+
+    def _query_workflow_invocation_actions(self, request: Any) -> Any:
+        response = _pb(dataform_v1beta1.QueryWorkflowInvocationActionsResponse)
+        start = int(request.page_token or 0)
+        end = start + (request.page_size or 1000)
+        for compiled in self.actions[start:end]:
+            action = response.workflow_invocation_actions.add()
+            action.target.CopyFrom(compiled.target)
+            action.state = dataform_v1beta1.WorkflowInvocationAction.State.SUCCEEDED
+            action.bigquery_action.sql_script = compiled.relation.select_query
+        if end < len(self.actions):
+            response.next_page_token = str(end)
+        return response
+
+    def _write_file(self, request: Any) -> Any:
+        with self._lock:
+            self.files[(request.workspace, request.path)] = request.contents
+        return _pb(dataform_v1beta1.WriteFileResponse)
+
+    def _read_file(self, request: Any) -> Any:
+        response = _pb(dataform_v1beta1.ReadFileResponse)
+        response.file_contents = self.files[(request.workspace, request.path)]
+        return response
+
+    def _remove_file(self, request: Any) -> Any:
+        with self._lock:
+            self.files.pop((request.workspace, request.path), None)
+        return _pb(dataform_v1beta1.RemoveFileResponse)
+
+    def _query_directory_contents(self, request: Any) -> Any:
+        response = _pb(dataform_v1beta1.QueryDirectoryContentsResponse)
+        prefix = f"{request.path}/" if request.path else ""
+        children = set()
+        for workspace, path in list(self.files):
+            if workspace == request.workspace and path.startswith(prefix):
+                head, _, tail = path[len(prefix):].partition("/")
+                children.add((prefix + head, bool(tail)))
+        with_metadata = request.view == dataform_v1beta1.DirectoryContentsView.DIRECTORY_CONTENTS_VIEW_METADATA
+        for path, is_directory in sorted(children):
+            entry = response.directory_entries.add()
+            if is_directory:
+                entry.directory = path
+            else:
+                entry.file = path
+                if with_metadata:
+                    entry.metadata.size_bytes = len(self.files.get((request.workspace, path), b""))
+        return response
+
+    def _fetch_file_git_statuses(self, request: Any) -> Any:
+        response = _pb(dataform_v1beta1.FetchFileGitStatusesResponse)
+        state = dataform_v1beta1.FetchFileGitStatusesResponse.UncommittedFileChange.State
+        with self._lock:
+            keys = {key for key in self.files if key[0] == request.name} | {key for key in self.committed_files if key[0] == request.name}
+            for key in sorted(keys):
+                if key not in self.committed_files:
+                    change_state = state.ADDED
+                elif key not in self.files:
+                    change_state = state.DELETED
+                elif self.files[key] != self.committed_files[key]:
+                    change_state = state.MODIFIED
+                else:
+                    continue
+                change = response.uncommitted_file_changes.add()
+                change.path = key[1]
+                change.state = change_state
+        return response
+
+    def _reset_workspace_changes(self, request: Any) -> Any:
+        with self._lock:
+            for key in [key for key in self.files if key[0] == request.name]:
+                del self.files[key]
+            self.files.update({key: contents for key, contents in self.committed_files.items() if key[0] == request.name})
+        return _pb(dataform_v1beta1.ResetWorkspaceChangesResponse)
+
+    def _fetch_repository_history(self, request: Any) -> Any:
+        response = _pb(dataform_v1beta1.FetchRepositoryHistoryResponse)
+        start = int(request.page_token or 0)
+        end = start + (request.page_size or 100)
+        with self._lock:
+            for commit_sha in self.commit_shas[start:end]:
+                response.commits.add().commit_sha = commit_sha
+            if end < len(self.commit_shas):
+                response.next_page_token = str(end)
+        return response
+
+
+class FakeClientPool(ClientPool):
+    def __init__(self, address: str, **kwargs):
+        """ClientPool creating clients that connect to address over an insecure channel without credentials."""
+        super().__init__(**kwargs)
+        self.address = address
+
+    def _create_client(self, client_options) -> dataform_v1beta1.DataformClient:
+        channel = grpc.insecure_channel(self.address, options=self._channel_options())
+        return dataform_v1beta1.DataformClient(transport=DataformGrpcTransport(channel=channel))
+
+
+class FakeAsyncDataformTools(AsyncDataformTools):
+    def __init__(self, address: str, *args, **kwargs):
+        """AsyncDataformTools whose client connects to address over an insecure channel without credentials."""
+        self.address = address
+        super().__init__(*args, **kwargs)
+
+    def _create_client(self, client_options) -> dataform_v1beta1.DataformAsyncClient:
+        channel = grpc.aio.insecure_channel(self.address)
+        return dataform_v1beta1.DataformAsyncClient(transport=DataformGrpcAsyncIOTransport(channel=channel))
@@ -0,0 +1,60 @@
+"""Enforces the import-time budget of the dataform_tools package.
+
+`import dataform_tools` must not import the Dataform client, google.api_core, grpc or asyncio; they
+are loaded on first client construction or first use of a type. The script imports the package in
+fresh interpreters, reports the median import time and exits with status 1 if the budget is exceeded
+or a heavy module was imported eagerly:
+
+    uv run python benchmarks/import_time.py --budget-ms 150
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import List, Optional
+
+
+# Modules that must only be imported lazily.
+HEAVY_MODULES = ("google.cloud.dataform_v1beta1", "google.api_core.exceptions", "grpc", "asyncio")
+
+_PROBE = """
+import json, sys, time
+started_at = time.perf_counter()
+import dataform_tools
+elapsed = time.perf_counter() - started_at
+print(json.dumps({"seconds": elapsed, "loaded": [name for name in %r if name in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def measure_import(runs: int) -> List[dict]:
+    """Imports dataform_tools in runs fresh interpreters and returns the probe result of each."""
+    results = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", _PROBE], check=True, capture_output=True, text=True).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7, help="Fresh interpreters to import the package in.")
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="Maximum median import time in milliseconds.")
+    args = parser.parse_args(argv)
+
+    results = measure_import(args.runs)
+    median_ms = statistics.median(result["seconds"] for result in results) * 1000
+    loaded = sorted({name for result in results for name in result["loaded"]})
+    print(f"import dataform_tools: median {median_ms:.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    failed = False
+    if loaded:
+        print(f"FAIL: heavy modules imported eagerly: {', '.join(loaded)}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print(f"FAIL: import time exceeds the budget by {median_ms - args.budget_ms:.1f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
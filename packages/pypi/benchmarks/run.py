@@ -0,0 +1,256 @@
+"""Benchmarks of the main DataformTools paths against the in-process fake Dataform service.
+
+Runs without GCP access or credentials:
+
+    uv run python benchmarks/run.py
+    uv run python benchmarks/run.py --actions 100 1000 10000 --latency-ms 5 --error-rate 0.01 --json results.json
+
+Each benchmark reports ops/sec, p50/p99 latency per operation and the peak Python memory allocated by
+a single operation (measured with tracemalloc in a separate, untimed pass).
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, List, Optional
+
+from typing_extensions import TypedDict
+
+from dataform_tools import CompiledGraph, DataformTools, InvocationConfigType, PolicyLayer, RpcPolicy
+from fake_server import FakeDataformServer
+
+
+REPOSITORY = "repository"
+WORKSPACE = "workspace"
+REPOSITORY_PATH = f"projects/project/locations/location/repositories/{REPOSITORY}"
+
+
+class BenchmarkResult(TypedDict):
+    name: str
+    operations: int
+    ops_per_second: float
+    p50_ms: float
+    p99_ms: float
+    peak_memory_bytes: int
+    retries: int
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def measure(name: str, operation: Callable[[int], Any], operations: int, policy: Optional[PolicyLayer] = None, warmup: int = 1) -> BenchmarkResult:
+    """Times operations calls of operation(index), then measures the peak memory of one more call."""
+    for index in range(warmup):
+        operation(index)
+    retries_before = sum(counters["retries"] for counters in policy.snapshot().values()) if policy else 0
+    latencies = []
+    started_at = time.perf_counter()
+    for index in range(operations):
+        operation_started_at = time.perf_counter()
+        operation(warmup + index)
+        latencies.append(time.perf_counter() - operation_started_at)
+    elapsed = time.perf_counter() - started_at
+    retries = sum(counters["retries"] for counters in policy.snapshot().values()) - retries_before if policy else 0
+
+    tracemalloc.start()
+    try:
+        operation(warmup + operations)
+        _, peak_memory_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    latencies.sort()
+    return {
+        "name": name,
+        "operations": operations,
+        "ops_per_second": operations / elapsed,
+        "p50_ms": _percentile(latencies, 0.5) * 1000,
+        "p99_ms": _percentile(latencies, 0.99) * 1000,
+        "peak_memory_bytes": peak_memory_bytes,
+        "retries": int(retries),
+    }
+
+
+def bench_write_file(tools: DataformTools, operations: int) -> BenchmarkResult:
+    contents = "config { type: 'table' }\nselect 1 as a\n" * 20
+
+    def operation(index: int) -> None:
+        tools.write_file(REPOSITORY, WORKSPACE, f"definitions/generated_{index}.sqlx", contents)
+
+    return measure("write_file", operation, operations, tools.policy)
+
+
+def bench_query_compilation_result_actions(tools: DataformTools, size: int, operations: int) -> BenchmarkResult:
+    name = f"{REPOSITORY_PATH}/compilationResults/1"
+
+    def operation(_: int) -> None:
+        count = sum(1 for _ in tools.query_compilation_result_actions(name))
+        assert count == size
+
+    return measure(f"query_compilation_result_actions[{size}]", operation, operations, tools.policy)
+
+
+def bench_iter_compilation_result_actions(tools: DataformTools, size: int, operations: int) -> BenchmarkResult:
+    name = f"{REPOSITORY_PATH}/compilationResults/1"
+
+    def operation(_: int) -> None:
+        count = sum(1 for _ in tools.iter_compilation_result_actions(name, compact=True))
+        assert count == size
+
+    return measure(f"iter_compilation_result_actions[{size}]", operation, operations, tools.policy)
+
+
+def bench_compiled_graph(tools: DataformTools, size: int, operations: int) -> BenchmarkResult:
+    name = f"{REPOSITORY_PATH}/compilationResults/1"
+
+    def operation(_: int) -> None:
+        graph = CompiledGraph.from_compilation_result(tools, name)
+        graph.transitive_dependent_ids([0])
+
+    return measure(f"compiled_graph[{size}]", operation, operations, tools.policy)
+
+
+def bench_run_dataform_remotely(tools: DataformTools, operations: int) -> BenchmarkResult:
+    invocation_config: InvocationConfigType = {
+        "included_tags": ["tag_0"],
+        "transitive_dependencies_included": False,
+        "transitive_dependents_included": False,
+        "fully_refresh_incremental_tables_enabled": False,
+    }
+
+    def operation(index: int) -> None:
+        result = tools.run_dataform_remotely(REPOSITORY, {"default_database": "project", "vars": {"run": str(index)}}, invocation_config, None, "main")
+        assert result is not None
+
+    return measure("run_dataform_remotely", operation, operations, tools.policy)
+
+
+def bench_workspace_refresh(server: FakeDataformServer, tools: DataformTools, files: int, operations: int) -> List[BenchmarkResult]:
+    """Full refreshes versus incremental refreshes of a workspace with files committed files and one edit per refresh."""
+    workspace_name = "tracked_workspace"
+    workspace_path = f"{REPOSITORY_PATH}/workspaces/{workspace_name}"
+    server.committed_files.update({(workspace_path, f"definitions/{index % 20}/table_{index}.sqlx"): b"select %d" % index for index in range(files)})
+    server.files.update(server.committed_files)
+    with tempfile.TemporaryDirectory() as directory:
+        state = tools.workspace_state(REPOSITORY, workspace_name, os.path.join(directory, "manifest.json"))
+
+        def full(_: int) -> None:
+            state.refresh(full=True)
+
+        def incremental(index: int) -> None:
+            tools.write_file(REPOSITORY, workspace_name, "definitions/0/table_0.sqlx", f"select {index} as edited")
+            assert state.refresh()["files_read"] == 1
+
+        return [
+            measure(f"workspace_refresh_full[{files}]", full, max(1, operations // 10), tools.policy),
+            measure(f"workspace_refresh_incremental[{files}]", incremental, operations, tools.policy),
+        ]
+
+
+def bench_workspace_pool(server: FakeDataformServer, tools: DataformTools, operations: int) -> List[BenchmarkResult]:
+    """A CI job's workspace setup and teardown: create, npm install (200ms here) and delete versus lease and release from a warm pool."""
+    def cold(index: int) -> None:
+        workspace_name = f"ci_{index}"
+        tools.create_workspace(REPOSITORY, workspace_name)
+        tools.install_npm_pacakages(REPOSITORY, workspace_name)
+        tools.write_file(REPOSITORY, workspace_name, "definitions/changed.sqlx", "select 1")
+        tools.delete_workspace(REPOSITORY, workspace_name)
+
+    server.npm_install_seconds = 0.2
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            pool = tools.workspace_pool(REPOSITORY, os.path.join(directory, "pool.json"), size=2)
+            pool.warm()
+
+            def pooled(_: int) -> None:
+                with pool.lease(owner="benchmark") as lease:
+                    tools.write_file(REPOSITORY, lease.workspace_name, "definitions/changed.sqlx", "select 1")
+
+            return [
+                measure("workspace_create_install_delete", cold, max(1, operations // 10), tools.policy),
+                measure("workspace_pool_lease_release", pooled, operations, tools.policy),
+            ]
+    finally:
+        server.npm_install_seconds = 0.0
+
+
+def bench_fleet(server: FakeDataformServer, projects: int, operations: int) -> List[BenchmarkResult]:
+    """Fleet audits of projects x 3 locations with 3 repositories of 4 workspaces each, one RPC at a time versus concurrently."""
+    scopes = [(f"project_{index}", location) for index in range(projects) for location in ("europe-west2", "us-central1", "asia-east1")]
+    for gcp_project_id, gcp_location in scopes:
+        for repository_index in range(3):
+            repository = f"projects/{gcp_project_id}/locations/{gcp_location}/repositories/repository_{repository_index}"
+            server.repositories.add(repository)
+            server.workspaces.update(f"{repository}/workspaces/workspace_{workspace_index}" for workspace_index in range(4))
+    expected = len(scopes) * 3 * (1 + 4)
+
+    def audit(max_concurrency: int) -> Callable[[int], None]:
+        async def list_fleet() -> int:
+            async with server.async_dataform_tools(max_concurrency=max_concurrency) as tools:
+                return sum([1 async for _ in tools.list_fleet(scopes)])
+
+        def operation(_: int) -> None:
+            assert asyncio.run(list_fleet()) == expected
+        return operation
+
+    return [
+        measure(f"fleet_audit_sequential[{len(scopes)}]", audit(1), max(1, operations // 100)),
+        measure(f"fleet_audit_concurrent[{len(scopes)}]", audit(100), max(1, operations // 20)),
+    ]
+
+
+def run(sizes: List[int], operations: int, latency_ms: float, jitter_ms: float, error_rate: float) -> List[BenchmarkResult]:
+    results: List[BenchmarkResult] = []
+    # retry injected errors quickly, the backoff would otherwise dominate every measurement. Invocations
+    # are retried too: the fake never executes a call it fails, so a retried create is safe here.
+    fast_retries = RpcPolicy(timeout=30.0, initial_backoff=0.001, max_backoff=0.01, max_attempts=10)
+    policy_overrides = {"read": fast_retries, "write": fast_retries, "compile": fast_retries, "invoke": fast_retries}
+    for size in sizes:
+        with FakeDataformServer(actions=size, latency_seconds=latency_ms / 1000, latency_jitter_seconds=jitter_ms / 1000, error_rate=error_rate) as server:
+            with server.dataform_tools(policy=PolicyLayer(policy_overrides)) as tools:
+                if size == sizes[0]:
+                    results.append(bench_write_file(tools, operations))
+                    results.append(bench_run_dataform_remotely(tools, operations))
+                    results.extend(bench_workspace_refresh(server, tools, size, operations))
+                    results.extend(bench_workspace_pool(server, tools, operations))
+                    results.extend(bench_fleet(server, 40, operations))
+                paging_operations = max(1, operations // max(1, size // 100))
+                results.append(bench_query_compilation_result_actions(tools, size, paging_operations))
+                results.append(bench_iter_compilation_result_actions(tools, size, paging_operations))
+                results.append(bench_compiled_graph(tools, size, paging_operations))
+    return results
+
+
+def format_table(results: List[BenchmarkResult]) -> str:
+    header = f"{'benchmark':<42} {'ops':>6} {'ops/sec':>10} {'p50 ms':>9} {'p99 ms':>9} {'peak KiB':>10} {'retries':>8}"
+    lines = [header, "-" * len(header)]
+    for result in results:
+        lines.append(f"{result['name']:<42} {result['operations']:>6} {result['ops_per_second']:>10.1f} {result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['peak_memory_bytes'] / 1024:>10.0f} {result['retries']:>8}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--actions", type=int, nargs="+", default=[100, 1000, 10000], help="Graph sizes (actions per compilation result) to benchmark.")
+    parser.add_argument("--operations", type=int, default=200, help="Timed operations per benchmark, paging benchmarks scale it down with the graph size.")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Server side latency added to every call.")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform random latency added on top of --latency-ms.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Probability that a call fails with UNAVAILABLE.")
+    parser.add_argument("--json", dest="json_path", help="Also write the results to this JSON file.")
+    args = parser.parse_args(argv)
+
+    results = run(args.actions, args.operations, args.latency_ms, args.jitter_ms, args.error_rate)
+    print(format_table(results))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"arguments": vars(args), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
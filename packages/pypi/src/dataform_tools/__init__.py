@@ -1,4 +1,44 @@
+from typing import Any
+
 from .dataform_tools import DataformTools
 from .dataform_tools import CodeCompilationConfigType
 from .dataform_tools import InvocationConfigType
-from .dataform_tools import Target
\ No newline at end of file
+from .dataform_tools import Target
+from .compilation_cache import CompilationCache, MemoryCacheBackend, SqliteCacheBackend
+from .actions import ActionRecord
+from .graph import CompiledGraph
+from .planner import InvocationPlan, plan_invocation
+from .compilation_diff import CompilationDiff, action_fingerprint
+from .client_pool import ClientPool
+from .policies import CircuitOpenError, PolicyLayer, RpcPolicy
+from .instrumentation import HistogramCollector, Instrumentation, OpenTelemetryInstrumentation, RpcSpan
+from .workspace_state import WorkspaceChanges, WorkspaceState
+from .workspace_pool import WorkspaceLease, WorkspacePool, WorkspacePoolExhaustedError
+from .runtime import ActionEstimate, DurationHistory, RuntimePrediction, RuntimePredictor
+
+# The asyncio based API is imported on first access, importing asyncio alone costs tens of milliseconds.
+_LAZY_EXPORTS = {
+    "AsyncDataformTools": "async_dataform_tools",
+    "WorkflowWatcher": "watcher",
+    "RunReport": "fanout",
+    "RunSpec": "fanout",
+    "CsvHistoryWriter": "history",
+    "ExportSummary": "history",
+    "ParquetHistoryWriter": "history",
+    "FleetLister": "fleet",
+    "FleetRecord": "fleet",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _LAZY_EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | _LAZY_EXPORTS.keys())
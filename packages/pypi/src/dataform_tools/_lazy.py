@@ -0,0 +1,31 @@
+import importlib
+from types import ModuleType
+from typing import Any, Optional
+
+
+class LazyModule():
+    def __init__(self, name: str):
+        """Stands in for a module that is only imported on first attribute access.
+
+        google.cloud.dataform_v1beta1 and google.api_core pull in grpc and every proto type module,
+        which takes hundreds of milliseconds. Referencing them through a LazyModule keeps
+        `import dataform_tools` cheap until a client is created or a type is used.
+        """
+        self._name = name
+        self._module: Optional[ModuleType] = None
+
+    def __getattr__(self, attribute: str) -> Any:
+        module = self._module
+        if module is None:
+            # import_module holds the import lock, concurrent first accesses import once
+            module = self._module = importlib.import_module(self._name)
+        return getattr(module, attribute)
+
+    def __repr__(self) -> str:
+        return f"<LazyModule {self._name}{' (loaded)' if self._module is not None else ''}>"
+
+
+dataform_v1beta1 = LazyModule("google.cloud.dataform_v1beta1")
+exceptions = LazyModule("google.api_core.exceptions")
+client_options_generator = LazyModule("google.api_core.client_options")
+transports = LazyModule("google.cloud.dataform_v1beta1.services.dataform.transports")
@@ -0,0 +1,88 @@
+import functools
+import sys
+from typing import Any, Dict, Optional, Tuple
+
+from ._lazy import dataform_v1beta1
+
+
+DEFAULT_ACTIONS_PAGE_SIZE = 500
+
+# (database, schema, name) of an action, hashable so it can be used as a dict key.
+TargetKey = Tuple[str, str, str]
+
+_EMPTY: Tuple = ()
+
+# WorkflowInvocation states after which an invocation no longer changes.
+TERMINAL_STATES = frozenset({"SUCCEEDED", "FAILED", "CANCELLED"})
+
+
+@functools.lru_cache(maxsize=None)
+def _relation_types() -> Dict[int, str]:
+    relation_type = dataform_v1beta1.CompilationResultAction.Relation.RelationType
+    return {
+        relation_type.TABLE: "table",
+        relation_type.VIEW: "view",
+        relation_type.INCREMENTAL_TABLE: "incremental",
+        relation_type.MATERIALIZED_VIEW: "materialized_view",
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def _action_states() -> Dict[int, str]:
+    return {state.value: state.name for state in dataform_v1beta1.WorkflowInvocationAction.State}
+
+
+def target_key(target: Any) -> TargetKey:
+    """Returns the (database, schema, name) key of a Target proto message or Target dict."""
+    if isinstance(target, dict):
+        return (target.get("database") or "", target.get("schema") or "", target.get("name") or "")
+    return (target.database, target.schema, target.name)
+
+
+def _intern_target(target: Any) -> TargetKey:
+    # database and schema repeat across almost every action, interning keeps one copy of each string
+    return (sys.intern(target.database), sys.intern(target.schema), target.name)
+
+
+class ActionRecord():
+    """Compact projection of a compilation result or workflow invocation action.
+
+    Holds only what graph and status consumers need, in __slots__, instead of the full proto message
+    with its compiled SQL. type is e.g. "table", "view", "incremental", "assertion", "operations",
+    "declaration" for compilation actions and "bigquery", "notebook", "data_preparation" for invocation
+    actions. tags and disabled are only set for compilation actions. state is the WorkflowInvocationAction
+    state name, or None for compilation actions.
+    """
+    __slots__ = ("target", "type", "dependencies", "tags", "state", "disabled")
+
+    def __init__(self, target: TargetKey, type: str, dependencies: Tuple[TargetKey, ...] = _EMPTY, tags: Tuple[str, ...] = _EMPTY, state: Optional[str] = None, disabled: bool = False):
+        self.target = target
+        self.type = type
+        self.dependencies = dependencies
+        self.tags = tags
+        self.state = state
+        self.disabled = disabled
+
+    def __repr__(self) -> str:
+        return f"ActionRecord(target={self.target!r}, type={self.type!r}, dependencies={len(self.dependencies)}, state={self.state!r})"
+
+
+def compact_compilation_action(action: Any) -> ActionRecord:
+    """Projects a CompilationResultAction (proto-plus or raw protobuf message) to an ActionRecord."""
+    message_type = dataform_v1beta1.CompilationResultAction
+    pb = message_type.pb(action) if isinstance(action, message_type) else action
+    kind = pb.WhichOneof("compiled_object") or "unknown"
+    compiled = getattr(pb, kind, None)
+    if kind == "relation" and compiled is not None:
+        kind = _relation_types().get(compiled.relation_type, "table")
+    dependencies = tuple(_intern_target(dependency) for dependency in getattr(compiled, "dependency_targets", _EMPTY))
+    tags = tuple(sys.intern(tag) for tag in getattr(compiled, "tags", _EMPTY))
+    return ActionRecord(_intern_target(pb.target), kind, dependencies, tags, None, bool(getattr(compiled, "disabled", False)))
+
+
+def compact_invocation_action(action: Any) -> ActionRecord:
+    """Projects a WorkflowInvocationAction (proto-plus or raw protobuf message) to an ActionRecord."""
+    message_type = dataform_v1beta1.WorkflowInvocationAction
+    pb = message_type.pb(action) if isinstance(action, message_type) else action
+    kind = (pb.WhichOneof("action") or "bigquery_action").removesuffix("_action")
+    return ActionRecord(_intern_target(pb.target), kind, _EMPTY, _EMPTY, _action_states().get(pb.state))
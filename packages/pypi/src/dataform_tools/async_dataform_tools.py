@@ -0,0 +1,590 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Iterable, List, Optional
+
+from ._lazy import client_options_generator, dataform_v1beta1, exceptions
+from .actions import DEFAULT_ACTIONS_PAGE_SIZE, compact_compilation_action, compact_invocation_action
+from . import fanout, history
+from .compilation_cache import CompilationCache
+from .dataform_tools import ClientOptions, CodeCompilationConfigType, CompilationResultType, GitOptions, InvocationConfigType
+from .fanout import DEFAULT_MAX_IN_FLIGHT, RunReport, RunSpec
+from .fleet import DEFAULT_PROJECT_CONCURRENCY, FleetLister, FleetRecord, FleetScope
+from .history import DEFAULT_EXPORT_CONCURRENCY, ExportSummary, HistoryWriter
+from .instrumentation import NOOP_INSTRUMENTATION, Instrumentation, instrumented_call_async
+from .policies import COMPILE, INVOKE, READ, WRITE, PolicyLayer
+
+if TYPE_CHECKING:
+    from google.cloud.dataform_v1beta1 import DataformAsyncClient
+    from google.cloud.dataform_v1beta1.types import CompilationResult, Repository, WorkflowInvocation, Workspace
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = 100
+
+
+class AsyncDataformTools():
+    def __init__(self, gcp_project_id:str, gcp_location:str, client_options:Optional[ClientOptions] = None, max_concurrency:int = DEFAULT_MAX_CONCURRENCY, compilation_cache:Optional[CompilationCache] = None, policy:Optional[PolicyLayer] = None, instrumentation:Optional[Instrumentation] = None):
+        """Initializes the AsyncDataformTools class.
+
+        Mirrors DataformTools but every method is a coroutine backed by DataformAsyncClient, so many
+        operations can be awaited concurrently (e.g. with asyncio.gather) from a single event loop.
+        Create instances from inside the event loop that will use them.
+        Args:
+            gcp_project_id (str): The GCP project ID.
+            gcp_location (str): The GCP location.
+            client_options (ClientOptions|None): Options passed to the underlying client.
+            max_concurrency (int): Maximum number of RPCs this instance keeps in flight at once.
+            compilation_cache (CompilationCache|None): Reuses compilation results of a git_commitish that was already compiled with the same config.
+            policy (PolicyLayer|None): Timeouts, retries, rate limits and circuit breakers applied to every RPC. Defaults to PolicyLayer().
+            instrumentation (Instrumentation|None): Receives a span per RPC and per run_dataform_remotely phase, e.g. HistogramCollector(). Defaults to a no-op.
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+        self.gcp_project_id = gcp_project_id
+        self.gcp_location = gcp_location
+        self.max_concurrency = max_concurrency
+        self.compilation_cache = compilation_cache
+        self.policy = policy if policy is not None else PolicyLayer()
+        self.instrumentation = instrumentation if instrumentation is not None else NOOP_INSTRUMENTATION
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.client = self._create_client(client_options)
+
+    def _create_client(self, client_options:Optional[ClientOptions]) -> "DataformAsyncClient":
+        if client_options is None:
+            return dataform_v1beta1.DataformAsyncClient()
+        options = client_options_generator.ClientOptions(**client_options)
+        return dataform_v1beta1.DataformAsyncClient(client_options=options)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self):
+        """Closes the transport of the underlying client."""
+        await self.client.transport.close()
+
+    async def _call(self, family:str, rpc:Callable, request):
+        """Awaits a client method under the policy of its family, holding a concurrency slot only while the RPC is in flight."""
+        async with self._semaphore:
+            return await instrumented_call_async(self.instrumentation, self.policy, family, rpc, request)
+
+    async def _pages(self, family:str, rpc:Callable, request) -> AsyncIterator[Any]:
+        """Yields every response page of a paged client method, each page being its own call under the policy and concurrency limit."""
+        while True:
+            # the first page of a pager is the response it was created from, taking it issues no further RPC
+            page = await anext((await self._call(family, rpc, request)).pages)
+            yield page
+            if not page.next_page_token:
+                return
+            request.page_token = page.next_page_token
+
+    async def list_repositories(self):
+        """Lists repositories in Dataform.
+        Returns:
+            ListRepositoriesAsyncPager: async iterable of repository objects
+        """
+        parent = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}"
+        request = dataform_v1beta1.ListRepositoriesRequest(
+            parent  = parent,
+        )
+        return await self._call(READ, self.client.list_repositories, request)
+
+    async def get_repository(self, repository_name:str) -> "Repository":
+        """Gets a repository in Dataform.
+        Args:
+            repository_name (str): The name of the repository.
+        Returns:
+            Repository: repository object
+        """
+        request = dataform_v1beta1.GetRepositoryRequest(
+            name  = repository_name,
+        )
+        return await self._call(READ, self.client.get_repository, request)
+
+    async def list_workspaces(self, repository_name:str):
+        """Lists workspaces in Dataform.
+        Args:
+            repository_name (str): The name of the repository.
+        Returns:
+            ListWorkspacesAsyncPager: async iterable of workspace objects
+        """
+        parent = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}"
+        request = dataform_v1beta1.ListWorkspacesRequest(
+            parent  = parent,
+        )
+        return await self._call(READ, self.client.list_workspaces, request)
+
+    async def get_workspace(self, repository_name:str, workspace_name:str) -> "Workspace":
+        """Gets a workspace in Dataform.
+        Args:
+            repository_name (str): The name of the repository.
+            workspace_name (str): The name of the workspace.
+        Returns:
+            Workspace: workspace object
+        """
+        workspace_path = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}/workspaces/{workspace_name}"
+        request = dataform_v1beta1.GetWorkspaceRequest(
+            name  = workspace_path,
+        )
+        return await self._call(READ, self.client.get_workspace, request)
+
+    async def create_workspace(self, repository_name:str, workspace_name:str) -> "Workspace":
+        """Creates a workspace in Dataform.
+        Args:
+            repository_name (str): The name of the repository.
+            workspace_name (str): The name of the workspace.
+        Returns:
+            Workspace: workspace object
+        """
+        parent = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}"
+        request = dataform_v1beta1.CreateWorkspaceRequest(
+            parent = parent,
+            workspace_id = workspace_name
+        )
+        try:
+            return await self._call(WRITE, self.client.create_workspace, request)
+        except exceptions.AlreadyExists:
+            logger.info(f"workspace: {parent}/workspaces/{workspace_name} already exsists. Fetching ...")
+            return await self.get_workspace(repository_name, workspace_name)
+        except Exception as e:
+            logger.error(f"Failed to create workspace: {e}")
+            raise
+
+    async def delete_workspace(self, repository_name:str, workspace_name:str):
+        """Deletes a workspace in Dataform.
+        Args:
+            repository_name (str): The name of the repository.
+            workspace_name (str): The name of the workspace.
+        """
+        workspace_path = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}/workspaces/{workspace_name}"
+        request = dataform_v1beta1.DeleteWorkspaceRequest(
+            name  = workspace_path,
+        )
+        try:
+            await self._call(WRITE, self.client.delete_workspace, request)
+            logger.info(f"Deleted workspace: {workspace_path}")
+        except exceptions.NotFound:
+            logger.error(f"Workspace: {workspace_path} not found")
+        except Exception as e:
+            logger.error(f"Failed to delte workspace: {e}")
+            raise
+
+    async def create_compilation_request(self, repository_name:str, git_commitish:str|None, workspace_name:str|None, code_compilation_config:CodeCompilationConfigType) -> "CompilationResult":
+        """Creates a compilation request in Dataform.
+        Args:
+            repository_name (str): The name of the repository.
+            git_commitish (str|None): The git commitish to compile from. E.g., a branch, tag, or commit SHA.
+            workspace_name (str|None): The workspace name to compile from.
+            code_compilation_config (CodeCompilationConfigType): The code compilation configuration.
+        Returns:
+            CompilationResult: The created compilation result.
+
+        Raises:
+            ValueError: If both workspace_name and git_commitish are provided.
+        """
+        if(workspace_name  is not None and git_commitish is not None):
+            raise ValueError("Compilation request can only be created of one of workspace or git_commitish")
+
+        parent = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}"
+
+        compilation_result_dict: CompilationResultType = {
+            "code_compilation_config": dataform_v1beta1.CodeCompilationConfig(**code_compilation_config)
+        }
+
+        if(workspace_name):
+            compilation_result_dict["workspace"] = f"{parent}/workspaces/{workspace_name}"
+        elif(git_commitish):
+            compilation_result_dict["git_commitish"] = git_commitish
+
+        request = dataform_v1beta1.CreateCompilationResultRequest(
+            parent=parent,
+            compilation_result = dataform_v1beta1.CompilationResult(**compilation_result_dict)
+        )
+        cache = self.compilation_cache if (git_commitish and not workspace_name) else None
+        if(cache is not None and git_commitish):
+            cached = cache.lookup(parent, git_commitish, dict(code_compilation_config))
+            if cached is not None:
+                return cached
+        compilation_result = await self._call(COMPILE, self.client.create_compilation_result, request)
+        if(cache is not None and git_commitish):
+            cache.store(parent, git_commitish, dict(code_compilation_config), compilation_result)
+        return compilation_result
+
+    async def query_compilation_result_actions(self, compilation_result_name:str):
+        """Queries compilation result actions in Dataform.
+        Args:
+            compilation_result_name (str): The name of the compilation result.
+        Returns:
+            QueryCompilationResultActionsAsyncPager: async iterable of compilation result actions.
+        """
+        request = dataform_v1beta1.QueryCompilationResultActionsRequest(
+            name = compilation_result_name
+        )
+        return await self._call(READ, self.client.query_compilation_result_actions, request)
+
+    async def iter_compilation_result_actions(self, compilation_result_name:str, page_size:int = DEFAULT_ACTIONS_PAGE_SIZE, filter:Optional[str] = None, compact:bool = False) -> AsyncIterator[Any]:
+        """Streams compilation result actions page by page, holding at most one page in memory.
+        Args:
+            compilation_result_name (str): The name of the compilation result.
+            page_size (int): The number of actions requested per page.
+            filter (str|None): Optional server side filter, e.g. 'file_path = "definitions/table.sqlx"'.
+            compact (bool): Yield ActionRecord projections (target, type, dependencies, tags) instead of full proto messages.
+        Returns:
+            AsyncIterator[CompilationResultAction|ActionRecord]: The compilation result actions.
+        """
+        request = dataform_v1beta1.QueryCompilationResultActionsRequest(
+            name = compilation_result_name,
+            page_size = page_size,
+            filter = filter or "",
+        )
+        async for page in self._pages(READ, self.client.query_compilation_result_actions, request):
+            if compact:
+                for action in type(page).pb(page).compilation_result_actions:
+                    yield compact_compilation_action(action)
+            else:
+                for action in page.compilation_result_actions:
+                    yield action
+
+    async def create_workflow_invocation(self, repository_name:str, compilation_result_name:str, invocation_config:InvocationConfigType) -> "WorkflowInvocation":
+        """Creates a workflow invocation in Dataform.
+        Args:
+            repository_name (str): The name of the repository.
+            compilation_result_name (str): The name of the compilation result.
+            invocation_config (InvocationConfigType): The invocation configuration.
+        Returns:
+            WorkflowInvocation: The created workflow invocation.
+        """
+        parent = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}"
+        workflow_invocation = dataform_v1beta1.WorkflowInvocation(
+            compilation_result = compilation_result_name,
+            invocation_config = dataform_v1beta1.InvocationConfig(**invocation_config)
+        )
+        request = dataform_v1beta1.CreateWorkflowInvocationRequest(
+            parent = parent,
+            workflow_invocation = workflow_invocation
+        )
+        return await self._call(INVOKE, self.client.create_workflow_invocation, request)
+
+    async def get_workflow_invocation(self, repository_name: str, workflow_invocation_id: str) -> "WorkflowInvocation":
+        """Gets a workflow invocation in Dataform.
+        Args:
+            repository_name (str): The name of the repository.
+            workflow_invocation_id (str): The ID of the workflow invocation.
+        Returns:
+            WorkflowInvocation: The workflow invocation.
+        """
+        workflow_invocation_path = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}/workflowInvocations/{workflow_invocation_id}"
+        request = dataform_v1beta1.GetWorkflowInvocationRequest(
+            name=workflow_invocation_path
+        )
+        return await self._call(READ, self.client.get_workflow_invocation, request)
+
+    async def list_workflow_invocations(self, repository_name: str, **kwargs):
+        """Lists workflow invocations in Dataform.
+        Args:
+            repository_name (str): The name of the repository.
+            **kwargs: Optional parameters for the request like page_size, page_token, order_by.
+        Returns:
+            ListWorkflowInvocationsAsyncPager: async iterable of workflow invocations.
+        """
+        parent = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}"
+        request = dataform_v1beta1.ListWorkflowInvocationsRequest(
+            parent=parent,
+            **kwargs
+        )
+        return await self._call(READ, self.client.list_workflow_invocations, request)
+
+    async def get_latest_workflow_invocation(self, repository_name: str):
+        """Gets the most recent workflow invocation for a repository.
+        Args:
+            repository_name (str): The name of the repository.
+        Returns:
+            The most recent WorkflowInvocation, or None if there are no invocations.
+        """
+        invocations = await self.list_workflow_invocations(
+            repository_name,
+            order_by="create_time desc",
+            page_size=1,
+        )
+        async for invocation in invocations:
+            return invocation
+        return None
+
+    async def query_workflow_invocation_actions(self, repository_name: str, workflow_invocation_id: str, **kwargs):
+        """Queries workflow invocation actions in Dataform.
+        Args:
+            repository_name (str): The name of the repository.
+            workflow_invocation_id (str): The ID of the workflow invocation.
+            **kwargs: Optional parameters for the request like page_size, page_token.
+        Returns:
+            QueryWorkflowInvocationActionsAsyncPager: async iterable of workflow invocation actions.
+        """
+        if not repository_name:
+            raise ValueError("repository_name must be provided.")
+        if not workflow_invocation_id:
+            raise ValueError("workflow_invocation_id must be provided.")
+
+        workflow_invocation_path = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}/workflowInvocations/{workflow_invocation_id}"
+        request = dataform_v1beta1.QueryWorkflowInvocationActionsRequest(
+            name=workflow_invocation_path,
+            **kwargs
+        )
+        return await self._call(READ, self.client.query_workflow_invocation_actions, request)
+
+    async def iter_workflow_invocation_actions(self, repository_name:str, workflow_invocation_id:str, page_size:int = DEFAULT_ACTIONS_PAGE_SIZE, compact:bool = False) -> AsyncIterator[Any]:
+        """Streams workflow invocation actions page by page, holding at most one page in memory.
+        Args:
+            repository_name (str): The name of the repository.
+            workflow_invocation_id (str): The ID of the workflow invocation.
+            page_size (int): The number of actions requested per page.
+            compact (bool): Yield ActionRecord projections (target, type, state) instead of full proto messages.
+        Returns:
+            AsyncIterator[WorkflowInvocationAction|ActionRecord]: The workflow invocation actions.
+        """
+        if not repository_name:
+            raise ValueError("repository_name must be provided.")
+        if not workflow_invocation_id:
+            raise ValueError("workflow_invocation_id must be provided.")
+        request = dataform_v1beta1.QueryWorkflowInvocationActionsRequest(
+            name = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}/workflowInvocations/{workflow_invocation_id}",
+            page_size = page_size,
+        )
+        async for page in self._pages(READ, self.client.query_workflow_invocation_actions, request):
+            if compact:
+                for action in type(page).pb(page).workflow_invocation_actions:
+                    yield compact_invocation_action(action)
+            else:
+                for action in page.workflow_invocation_actions:
+                    yield action
+
+    async def write_file(self, repository_name:str, workspace_name:str, relative_path:str, contents:str|bytes) -> None:
+        """Writes a file to a workspace in Dataform.
+        Args:
+            repository_name (str): The name of the repository.
+            workspace_name (str): The name of the workspace.
+            relative_path (str): The relative path of the file to write.
+            contents (str|bytes): The contents of the file to write.
+        """
+        workspace_path = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}/workspaces/{workspace_name}"
+
+        if isinstance(contents, str):
+            buffer_contents = contents.encode(encoding="utf-8")
+        else: buffer_contents = contents
+
+        request = dataform_v1beta1.WriteFileRequest(workspace=workspace_path, path=relative_path, contents=buffer_contents)
+        await self._call(WRITE, self.client.write_file, request)
+
+    async def remove_file(self, repository_name:str, workspace_name:str, relative_path:str) -> None:
+        """Removes a file from a workspace in Dataform.
+        Args:
+            repository_name (str): The name of the repository.
+            workspace_name (str): The name of the workspace.
+            relative_path (str): The relative path of the file to remove.
+        """
+        workspace_path = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}/workspaces/{workspace_name}"
+        request = dataform_v1beta1.RemoveFileRequest(workspace=workspace_path, path=relative_path)
+        await self._call(WRITE, self.client.remove_file, request)
+
+    async def read_file(self, repository_name:str, workspace_name:str, relative_path:str) -> bytes:
+        """Reads a file from a workspace in Dataform.
+        Args:
+            repository_name (str): The name of the repository.
+            workspace_name (str): The name of the workspace.
+            relative_path (str): The relative path of the file to read.
+        Returns:
+            bytes: The contents of the file.
+        """
+        workspace_path = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}/workspaces/{workspace_name}"
+        request = dataform_v1beta1.ReadFileRequest(workspace=workspace_path, path=relative_path)
+        response = await self._call(READ, self.client.read_file, request)
+        return response.file_contents
+
+    async def query_directory_contents(self, repository_name:str, workspace_name:str, relative_path:str = "", **kwargs):
+        """Lists the files and directories directly under a directory of a workspace in Dataform.
+        Args:
+            repository_name (str): The name of the repository.
+            workspace_name (str): The name of the workspace.
+            relative_path (str): The directory to list, relative to the workspace root. Defaults to the root.
+            **kwargs: Optional parameters for the request like page_size, page_token.
+        Returns:
+            QueryDirectoryContentsAsyncPager: async iterable of directory entries with paths relative to the workspace root.
+        """
+        workspace_path = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}/workspaces/{workspace_name}"
+        request = dataform_v1beta1.QueryDirectoryContentsRequest(workspace=workspace_path, path=relative_path, **kwargs)
+        return await self._call(READ, self.client.query_directory_contents, request)
+
+    def get_workflow_invocation_url(self, repository_name: str, workflow_invocation_id: str) -> str:
+        """Generates the URL for a workflow invocation in Dataform.
+        Args:
+            repository_name (str): The name of the repository.
+            workflow_invocation_id (str): The ID of the workflow invocation can be found in the name attribute of return value of create_workflow_invocation method.
+        Returns:
+            str: The URL of the workflow invocation.
+        """
+        return f"https://console.cloud.google.com/bigquery/dataform/locations/{self.gcp_location}/repositories/{repository_name}/workflows/{workflow_invocation_id}?project={self.gcp_project_id}"
+
+    async def install_npm_pacakages(self, repository_name: str, workspace_name: str):
+        """Installs npm packages in a workspace in Dataform.
+        Args:
+            repository_name (str): The name of the repository.
+            workspace_name (str): The name of the workspace.
+        """
+        workspace_path = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}/workspaces/{workspace_name}"
+        request = dataform_v1beta1.InstallNpmPackagesRequest(workspace=workspace_path)
+        await self._call(WRITE, self.client.install_npm_packages, request)
+
+    async def pull_git_commits(self, repository_name: str, workspace_name: str, git_options: GitOptions):
+        """Pulls git commits in a workspace in Dataform.
+        Args:
+            repository_name (str): The name of the repository.
+            workspace_name (str): The name of the workspace.
+            git_options (GitOptions): The git options in the format {"remote_branch": str, "user_name": str, "email_address": str}
+        """
+        workspace_path = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}/workspaces/{workspace_name}"
+        author = dataform_v1beta1.CommitAuthor(name=git_options["user_name"], email_address=git_options["email_address"])
+        request = dataform_v1beta1.PullGitCommitsRequest(name=workspace_path, remote_branch=git_options["remote_branch"], author=author)
+        await self._call(WRITE, self.client.pull_git_commits, request)
+
+    async def get_workspace_git_state(self, repository_name:str, workspace_name:str):
+        """Gets the git state of a workspace in Dataform.
+        Args:
+            repository_name (str): The name of the repository.
+            workspace_name (str): The name of the workspace.
+        Returns:
+            The git state of the workspace.
+        """
+        workspace_path = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}/workspaces/{workspace_name}"
+        request = dataform_v1beta1.FetchFileGitStatusesRequest(name=workspace_path)
+        return await self._call(READ, self.client.fetch_file_git_statuses, request)
+
+    async def reset_workspace_changes(self, repository_name:str, workspace_name:str, paths:Optional[List[str]] = None, clean=True):
+        """Resets changes in a workspace in Dataform.
+        Args:
+            repository_name (str): The name of the repository.
+            workspace_name (str): The name of the workspace.
+            paths (List[str]|None): The list of file paths to reset. If empty, all changes will be reset.
+            clean (bool): Whether to delete untracked files.
+        """
+        workspace_path = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}/workspaces/{workspace_name}"
+        request = dataform_v1beta1.ResetWorkspaceChangesRequest(
+            name=workspace_path,
+            paths=paths or [],
+            clean=clean
+        )
+        await self._call(WRITE, self.client.reset_workspace_changes, request)
+
+    async def fetch_repository_history(self, repository_name:str, **kwargs):
+        """Fetches the commit history of a repository in Dataform, newest first.
+        Args:
+            repository_name (str): The name of the repository.
+            **kwargs: Optional parameters for the request like page_size, page_token.
+        Returns:
+            FetchRepositoryHistoryAsyncPager: async iterable of CommitLogEntry objects.
+        """
+        repository_path = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}"
+        request = dataform_v1beta1.FetchRepositoryHistoryRequest(name=repository_path, **kwargs)
+        return await self._call(READ, self.client.fetch_repository_history, request)
+
+    async def fetch_git_ahead_behind(self, repository_name:str, workspace_name:str, remote_branch:str):
+        """Fetches git ahead/behind in a workspace in Dataform.
+        Args:
+            repository_name (str): The name of the repository.
+            workspace_name (str): The name of the workspace.
+            remote_branch (str): The remote branch to compare the workspace against.
+        Returns:
+            FetchGitAheadBehindResponse: The number of commits ahead and behind the remote branch.
+        """
+        workspace_path = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}/workspaces/{workspace_name}"
+        request = dataform_v1beta1.FetchGitAheadBehindRequest(
+            name=workspace_path,
+            remote_branch=remote_branch
+        )
+        return await self._call(READ, self.client.fetch_git_ahead_behind, request)
+
+    async def push_workspace_commits(self, repository_name:str, workspace_name:str, remote_branch:str):
+        """Pushes workspace commits in a workspace in Dataform.
+        Args:
+            repository_name (str): The name of the repository.
+            workspace_name (str): The name of the workspace.
+            remote_branch (str): The remote branch to push the commits to.
+        """
+        workspace_path = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}/workspaces/{workspace_name}"
+        request = dataform_v1beta1.PushGitCommitsRequest(
+            name=workspace_path,
+            remote_branch=remote_branch
+        )
+        await self._call(WRITE, self.client.push_git_commits, request)
+
+    async def run_dataform_remotely(self, repository_name:str, code_compilation_config:CodeCompilationConfigType, invocation_config: InvocationConfigType, workspace_name:str|None, git_commitish:str|None):
+        """Runs Dataform remotely by creating a compilation request and workflow invocation.
+        Args:
+            repository_name (str): The name of the repository.
+            code_compilation_config (CodeCompilationConfigType): The code compilation configuration.
+            invocation_config (InvocationConfigType): The invocation configuration.
+            workspace_name (str|None): The workspace name to compile from.
+            git_commitish (str|None): The git commitish to compile from. E.g., a branch, tag, or commit SHA.
+
+        Returns:
+            Dict[str, Any]: A dictionary containing the workflow invocation object, ID, and URL.
+
+        Raises:
+            ValueError: If both workspace_name and git_commitish are provided.
+        """
+        instrumentation = self.instrumentation
+        with instrumentation.operation("run_dataform_remotely", repository_name):
+            with instrumentation.operation("run_dataform_remotely.compile", repository_name):
+                compilation_result = await self.create_compilation_request(repository_name, git_commitish, workspace_name, code_compilation_config)
+            if(compilation_result and compilation_result.name):
+                with instrumentation.operation("run_dataform_remotely.invoke", repository_name):
+                    workflow_invocation = await self.create_workflow_invocation(repository_name, compilation_result.name, invocation_config)
+                workflow_invocation_id = workflow_invocation.name.split("/").pop()
+                if(workflow_invocation_id):
+                    workflow_invocation_url = self.get_workflow_invocation_url(repository_name, workflow_invocation_id)
+                    return {
+                        "workflow_invocation": workflow_invocation,
+                        "workflow_invocation_id": workflow_invocation_id,
+                        "workflow_invocation_url": workflow_invocation_url,
+                    }
+
+    async def run_many(self, specs:List[RunSpec], max_in_flight:int = DEFAULT_MAX_IN_FLIGHT) -> List[RunReport]:
+        """Compiles once per distinct commit/config and runs many workflow invocations in parallel.
+        Args:
+            specs (List[RunSpec]): The runs to execute. A run waits for every run named in its depends_on to succeed.
+            max_in_flight (int): The maximum number of workflow invocations running at once.
+        Returns:
+            List[RunReport]: Per run state, invocation ID, URL, error and timings, in the order of specs.
+        """
+        return await fanout.run_many(self, specs, max_in_flight)
+
+    async def list_fleet(self, scopes:Iterable[FleetScope], include_workspaces:bool = True, include_latest_invocation:bool = True, max_concurrency_per_project:int = DEFAULT_PROJECT_CONCURRENCY, rate_per_project:Optional[float] = None) -> AsyncIterator[FleetRecord]:
+        """Lists repositories, their workspaces and latest workflow invocations across many projects and locations concurrently.
+        Args:
+            scopes (Iterable[FleetScope]): The (gcp_project_id, gcp_location) pairs to list.
+            include_workspaces (bool): Whether to list the workspaces of every repository.
+            include_latest_invocation (bool): Whether to fetch the latest workflow invocation of every repository.
+            max_concurrency_per_project (int): Maximum number of RPCs in flight per project.
+            rate_per_project (float|None): Maximum RPCs per second per project, unlimited by default.
+        Returns:
+            AsyncIterator[FleetRecord]: A record per resource (or failed listing) as soon as it was listed.
+        """
+        lister = FleetLister(self, include_workspaces, include_latest_invocation, max_concurrency_per_project, rate_per_project)
+        async for record in lister.stream(scopes):
+            yield record
+
+    async def export_invocation_history(self, repository_name:str, writer:HistoryWriter, start_time:Optional[datetime] = None, end_time:Optional[datetime] = None, state_path:Optional[str] = None, max_concurrency:int = DEFAULT_EXPORT_CONCURRENCY) -> ExportSummary:
+        """Exports finished workflow invocations and the timings of their actions to writer.
+        Args:
+            repository_name (str): The name of the repository.
+            writer (HistoryWriter): Destination of the rows, e.g. CsvHistoryWriter or ParquetHistoryWriter.
+            start_time (datetime|None): Only export invocations that started at or after this time.
+            end_time (datetime|None): Only export invocations that started before this time.
+            state_path (str|None): JSON file holding the watermark. When set, the export resumes where the previous one stopped.
+            max_concurrency (int): The maximum number of invocations whose actions are fetched at once.
+        Returns:
+            ExportSummary: Counts of exported and skipped invocations, exported actions and the new watermark.
+        """
+        return await history.export_invocation_history(self, repository_name, writer, start_time, end_time, state_path, max_concurrency)
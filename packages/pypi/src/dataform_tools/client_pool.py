@@ -0,0 +1,175 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from ._lazy import client_options_generator, dataform_v1beta1, transports
+
+if TYPE_CHECKING:
+    from google.cloud.dataform_v1beta1 import DataformClient
+    from google.cloud.dataform_v1beta1.services.dataform.transports import DataformGrpcTransport
+    from .dataform_tools import ClientOptions
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_KEEPALIVE_TIME_MS = 30_000
+DEFAULT_KEEPALIVE_TIMEOUT_MS = 10_000
+DEFAULT_IDLE_TIMEOUT_SECONDS = 300.0
+
+
+def client_options_fingerprint(client_options: Optional["ClientOptions"]) -> str:
+    """Returns a stable hash of client options, so equal options share clients without keeping secrets such as api_key as keys."""
+    canonical = {key: value for key, value in (client_options or {}).items() if value is not None}
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class _PooledClient():
+    __slots__ = ("client", "leases", "last_released_at")
+
+    def __init__(self, client: "DataformClient"):
+        self.client = client
+        self.leases = 0
+        self.last_released_at = time.monotonic()
+
+
+class ClientPool():
+    def __init__(self, max_channels: int = 1, keepalive_time_ms: int = DEFAULT_KEEPALIVE_TIME_MS, keepalive_timeout_ms: int = DEFAULT_KEEPALIVE_TIMEOUT_MS, idle_timeout_seconds: Optional[float] = DEFAULT_IDLE_TIMEOUT_SECONDS):
+        """Shares warm DataformClient instances (and their gRPC channels) between DataformTools objects.
+
+        Clients are keyed on a fingerprint of their ClientOptions. Up to max_channels clients, each
+        with its own channel, are created per fingerprint and handed out to the least loaded one.
+        Clients that have not been leased for idle_timeout_seconds are closed. The pool is thread safe.
+        Args:
+            max_channels (int): The maximum number of channels per set of client options.
+            keepalive_time_ms (int): Interval of gRPC keepalive pings that keep idle channels warm.
+            keepalive_timeout_ms (int): How long to wait for a keepalive ping ack before the channel is considered broken.
+            idle_timeout_seconds (float|None): Unleased clients are closed after this many seconds. None keeps them until close().
+        """
+        if max_channels < 1:
+            raise ValueError("max_channels must be at least 1.")
+        self.max_channels = max_channels
+        self.keepalive_time_ms = keepalive_time_ms
+        self.keepalive_timeout_ms = keepalive_timeout_ms
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self._clients: Dict[str, List[_PooledClient]] = {}
+        self._leases: Dict[int, Tuple[str, _PooledClient]] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _channel_options(self) -> List[Tuple[str, Any]]:
+        return [
+            ("grpc.keepalive_time_ms", self.keepalive_time_ms),
+            ("grpc.keepalive_timeout_ms", self.keepalive_timeout_ms),
+            ("grpc.keepalive_permit_without_calls", 1),
+            ("grpc.http2.max_pings_without_data", 0),
+        ]
+
+    def _create_client(self, client_options: Optional["ClientOptions"]) -> "DataformClient":
+        keepalive_options = self._channel_options()
+
+        def create_channel(host: str, **kwargs) -> Any:
+            kwargs["options"] = list(kwargs.get("options") or []) + keepalive_options
+            return transports.DataformGrpcTransport.create_channel(host, **kwargs)
+
+        def create_transport(**kwargs) -> "DataformGrpcTransport":
+            return transports.DataformGrpcTransport(channel=create_channel, **kwargs)
+
+        if client_options is None:
+            return dataform_v1beta1.DataformClient(transport=create_transport)
+        options = client_options_generator.ClientOptions(**client_options)
+        return dataform_v1beta1.DataformClient(client_options=options, transport=create_transport)
+
+    def acquire(self, client_options: Optional["ClientOptions"] = None) -> "DataformClient":
+        """Leases a client for the given options, creating one if none can be shared.
+        Args:
+            client_options (ClientOptions|None): Options of the client.
+        Returns:
+            DataformClient: A client that must be handed back with release().
+        """
+        fingerprint = client_options_fingerprint(client_options)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ClientPool is closed.")
+            self._evict_idle_locked()
+            pooled_clients = self._clients.setdefault(fingerprint, [])
+            pooled = min(pooled_clients, key=lambda candidate: candidate.leases, default=None)
+            if pooled is None or (pooled.leases > 0 and len(pooled_clients) < self.max_channels):
+                pooled = _PooledClient(self._create_client(client_options))
+                pooled_clients.append(pooled)
+                logger.debug(f"Created pooled Dataform client {len(pooled_clients)}/{self.max_channels} for options {fingerprint[:12]}")
+            pooled.leases += 1
+            self._leases[id(pooled.client)] = (fingerprint, pooled)
+            return pooled.client
+
+    def release(self, client: "DataformClient") -> None:
+        """Hands a leased client back to the pool. The client must not be used afterwards.
+
+        Releasing a client the pool did not hand out, or more often than it was leased, is ignored so it
+        can never close a client another holder still uses.
+        """
+        with self._lock:
+            lease = self._leases.get(id(client))
+            if lease is None:
+                return
+            _, pooled = lease
+            if pooled.leases == 0:
+                logger.warning("Ignoring release of a Dataform client that is not leased")
+                return
+            pooled.leases -= 1
+            if pooled.leases == 0:
+                pooled.last_released_at = time.monotonic()
+            self._evict_idle_locked()
+
+    def evict_idle(self) -> int:
+        """Closes clients that have not been leased for idle_timeout_seconds.
+        Returns:
+            int: The number of clients closed.
+        """
+        with self._lock:
+            return self._evict_idle_locked()
+
+    def _evict_idle_locked(self) -> int:
+        if self.idle_timeout_seconds is None:
+            return 0
+        deadline = time.monotonic() - self.idle_timeout_seconds
+        evicted = 0
+        for fingerprint, pooled_clients in list(self._clients.items()):
+            keep = []
+            for pooled in pooled_clients:
+                if pooled.leases == 0 and pooled.last_released_at < deadline:
+                    self._close_client(pooled)
+                    evicted += 1
+                else:
+                    keep.append(pooled)
+            if keep:
+                self._clients[fingerprint] = keep
+            else:
+                del self._clients[fingerprint]
+        return evicted
+
+    def _close_client(self, pooled: _PooledClient) -> None:
+        self._leases.pop(id(pooled.client), None)
+        try:
+            pooled.client.transport.close()
+        except Exception as e:
+            logger.warning(f"Failed to close pooled Dataform client: {e}")
+
+    def close(self) -> None:
+        """Closes every client, leased or not. Further acquire() calls raise RuntimeError."""
+        with self._lock:
+            self._closed = True
+            for pooled_clients in self._clients.values():
+                for pooled in pooled_clients:
+                    self._close_client(pooled)
+            self._clients.clear()
+            self._leases.clear()
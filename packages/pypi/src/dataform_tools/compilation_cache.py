@@ -0,0 +1,224 @@
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+
+from ._lazy import dataform_v1beta1
+
+if TYPE_CHECKING:
+    from google.cloud.dataform_v1beta1.types import CompilationResult
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 256
+
+_COMMIT_SHA_PATTERN = re.compile(r"^[0-9a-f]{40}$")
+
+# Callable resolving (repository_path, git_commitish) to a full commit SHA, or None if it cannot be resolved.
+CommitishResolver = Callable[[str, str], Optional[str]]
+
+
+def config_hash(code_compilation_config: dict) -> str:
+    """Returns a canonical sha256 of a code compilation config. Key order and keys set to None do not change the hash."""
+    canonical = {key: value for key, value in code_compilation_config.items() if value is not None}
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def resolve_commit_sha(repository_path: str, git_commitish: str) -> Optional[str]:
+    """Default resolver: a full 40 character commit SHA resolves to itself, branches and tags are unresolved."""
+    commitish = git_commitish.strip().lower()
+    return commitish if _COMMIT_SHA_PATTERN.match(commitish) else None
+
+
+class MemoryCacheBackend():
+    def __init__(self):
+        """In process LRU store of serialized compilation results. Safe to share between threads."""
+        self._entries: "OrderedDict[str, Tuple[bytes, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: bytes, created_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, created_at)
+            self._entries.move_to_end(key)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def trim(self, max_entries: int) -> None:
+        with self._lock:
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SqliteCacheBackend():
+    def __init__(self, path: str):
+        """On disk LRU store of serialized compilation results, shared by every process using the same file.
+        Args:
+            path (str): Path of the SQLite database file. Created if it does not exist.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS compilation_results ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, created_at REAL NOT NULL, last_used_at REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS compilation_results_last_used ON compilation_results (last_used_at)")
+
+    def get(self, key: str) -> Optional[Tuple[bytes, float]]:
+        with self._lock:
+            row = self._connection.execute("SELECT value, created_at FROM compilation_results WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._connection.execute("UPDATE compilation_results SET last_used_at = ? WHERE key = ?", (time.time(), key))
+                return bytes(row[0]), row[1]
+            return None
+
+    def set(self, key: str, value: bytes, created_at: float) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO compilation_results (key, value, created_at, last_used_at) VALUES (?, ?, ?, ?)",
+                (key, value, created_at, time.time()),
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM compilation_results WHERE key = ?", (key,))
+
+    def trim(self, max_entries: int) -> None:
+        with self._lock:
+            self._connection.execute(
+                "DELETE FROM compilation_results WHERE key NOT IN "
+                "(SELECT key FROM compilation_results ORDER BY last_used_at DESC LIMIT ?)",
+                (max_entries,),
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM compilation_results")
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class CompilationCache():
+    def __init__(self, backend: MemoryCacheBackend | SqliteCacheBackend | None = None, ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES, resolve_commitish: CommitishResolver = resolve_commit_sha, ref_ttl_seconds: float = 0):
+        """Caches compilation results keyed on the resolved commit SHA and a canonical hash of the compilation config.
+
+        Only compilations of a git_commitish are cached, workspace contents can change at any time.
+        A branch or tag only hits the cache once resolve_commitish maps it to a commit SHA. Callers that
+        accept a bounded staleness can instead set ref_ttl_seconds to also cache by the unresolved name.
+        Args:
+            backend (MemoryCacheBackend|SqliteCacheBackend|None): Where entries are stored. Defaults to an in memory backend.
+            ttl_seconds (float|None): How long an entry keyed on a commit SHA stays valid. None disables expiry.
+            max_entries (int): Least recently used entries above this count are evicted.
+            resolve_commitish (CommitishResolver): Resolves (repository_path, git_commitish) to a commit SHA or None.
+            ref_ttl_seconds (float): How long an entry keyed on an unresolved branch or tag stays valid. 0 disables these entries.
+        """
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+        self.backend = backend if backend is not None else MemoryCacheBackend()
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.resolve_commitish = resolve_commitish
+        self.ref_ttl_seconds = ref_ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    def _keys(self, repository_path: str, git_commitish: str, code_compilation_config: dict) -> List[Tuple[str, Optional[float]]]:
+        """Returns the (key, ttl) pairs an entry can be found under, most specific first."""
+        digest = config_hash(code_compilation_config)
+        keys: List[Tuple[str, Optional[float]]] = []
+        commit_sha = self.resolve_commitish(repository_path, git_commitish)
+        if commit_sha:
+            keys.append((f"{repository_path}@sha:{commit_sha.lower()}#{digest}", self.ttl_seconds))
+        elif self.ref_ttl_seconds > 0:
+            keys.append((f"{repository_path}@ref:{git_commitish}#{digest}", self.ref_ttl_seconds))
+        return keys
+
+    def lookup(self, repository_path: str, git_commitish: str, code_compilation_config: dict) -> Optional["CompilationResult"]:
+        """Returns a cached compilation result, or None on a miss or expired entry.
+        Args:
+            repository_path (str): The full resource name of the repository.
+            git_commitish (str): The git commitish being compiled.
+            code_compilation_config (dict): The code compilation configuration.
+        Returns:
+            CompilationResult|None: The cached compilation result.
+        """
+        now = time.time()
+        for key, ttl in self._keys(repository_path, git_commitish, code_compilation_config):
+            entry = self.backend.get(key)
+            if entry is None:
+                continue
+            value, created_at = entry
+            if ttl is not None and now - created_at > ttl:
+                self.backend.delete(key)
+                continue
+            self.hits += 1
+            logger.debug(f"Compilation cache hit for {key}")
+            return dataform_v1beta1.CompilationResult.deserialize(value)
+        self.misses += 1
+        return None
+
+    def store(self, repository_path: str, git_commitish: str, code_compilation_config: dict, compilation_result: "CompilationResult") -> None:
+        """Stores a compilation result under its resolved commit SHA (and the unresolved name if enabled).
+        Compilation results with compilation errors are not stored.
+        Args:
+            repository_path (str): The full resource name of the repository.
+            git_commitish (str): The git commitish that was compiled.
+            code_compilation_config (dict): The code compilation configuration.
+            compilation_result (CompilationResult): The compilation result returned by Dataform.
+        """
+        if not compilation_result.name or compilation_result.compilation_errors:
+            return
+        keys = [key for key, _ in self._keys(repository_path, git_commitish, code_compilation_config)]
+        if compilation_result.resolved_git_commit_sha:
+            # the resolved SHA is authoritative, so later compilations of that SHA hit without calling the resolver
+            keys.append(f"{repository_path}@sha:{compilation_result.resolved_git_commit_sha.lower()}#{config_hash(code_compilation_config)}")
+        value = dataform_v1beta1.CompilationResult.serialize(compilation_result)
+        now = time.time()
+        for key in set(keys):
+            self.backend.set(key, value, now)
+        self.backend.trim(self.max_entries)
+
+    def get_or_compile(self, repository_path: str, git_commitish: str, code_compilation_config: dict, compile_fn: Callable[[], "CompilationResult"]) -> "CompilationResult":
+        """Returns the cached compilation result or falls back to compile_fn() and caches its result.
+        Args:
+            repository_path (str): The full resource name of the repository.
+            git_commitish (str): The git commitish being compiled.
+            code_compilation_config (dict): The code compilation configuration.
+            compile_fn (Callable[[], CompilationResult]): Creates the compilation result on a miss.
+        Returns:
+            CompilationResult: The cached or newly created compilation result.
+        """
+        cached = self.lookup(repository_path, git_commitish, code_compilation_config)
+        if cached is not None:
+            return cached
+        compilation_result = compile_fn()
+        self.store(repository_path, git_commitish, code_compilation_config, compilation_result)
+        return compilation_result
+
+    def clear(self) -> None:
+        """Removes every entry from the backend."""
+        self.backend.clear()
@@ -0,0 +1,144 @@
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
+
+from ._lazy import dataform_v1beta1
+from .actions import DEFAULT_ACTIONS_PAGE_SIZE, ActionRecord, TargetKey, compact_compilation_action
+from .graph import CompiledGraph
+from .planner import InvocationPlan, is_executable
+
+if TYPE_CHECKING:
+    from .dataform_tools import CodeCompilationConfigType, DataformTools, InvocationConfigType
+
+
+logger = logging.getLogger(__name__)
+
+
+def action_fingerprint(action: Any) -> str:
+    """Returns a sha256 of the compiled object of a CompilationResultAction (proto-plus or raw protobuf message).
+
+    The compiled object (relation, operations, assertion, declaration, notebook or data preparation)
+    holds the compiled SQL, dependencies, tags and settings of the action, and is serialised
+    deterministically so equal actions of two compilations hash equally. The file path is not
+    part of the hash, moving a definition to another file does not change what it runs.
+    """
+    message_type = dataform_v1beta1.CompilationResultAction
+    pb = message_type.pb(action) if isinstance(action, message_type) else action
+    kind = pb.WhichOneof("compiled_object") or ""
+    digest = hashlib.sha256(kind.encode("utf-8"))
+    if kind:
+        digest.update(getattr(pb, kind).SerializeToString(deterministic=True))
+    return digest.hexdigest()
+
+
+class CompilationDiff():
+    def __init__(self, base_compilation_result_name: str, head_compilation_result_name: str, graph: CompiledGraph, base_fingerprints: Dict[TargetKey, str], head_fingerprints: Dict[TargetKey, str], invocation_config: "InvocationConfigType", include_dependents: bool = True):
+        """Actions that differ between a base and a head compilation result, and the head actions they affect.
+        Args:
+            base_compilation_result_name (str): The name of the compilation result compared against.
+            head_compilation_result_name (str): The name of the compilation result with the changes, the one to invoke.
+            graph (CompiledGraph): The graph of the head compilation result.
+            base_fingerprints (Dict[TargetKey, str]): action_fingerprint of every base action by target.
+            head_fingerprints (Dict[TargetKey, str]): action_fingerprint of every head action by target.
+            invocation_config (InvocationConfigType): Settings (full refresh, service account) carried into the generated configs.
+            include_dependents (bool): Whether actions downstream of a change are affected too.
+        """
+        self.base_compilation_result_name = base_compilation_result_name
+        self.head_compilation_result_name = head_compilation_result_name
+        self.graph = graph
+        self.added = sorted(head_fingerprints.keys() - base_fingerprints.keys())
+        self.removed = sorted(base_fingerprints.keys() - head_fingerprints.keys())
+        self.modified = sorted(target for target, fingerprint in head_fingerprints.items() if target in base_fingerprints and base_fingerprints[target] != fingerprint)
+        changed_ids = [graph.node_id(target) for target in self.added + self.modified]
+        affected_ids = graph.transitive_dependent_ids(changed_ids, include_seeds=True) if include_dependents else sorted(changed_ids)
+        # a changed declaration or disabled action is never executed, but the actions reading from it are affected
+        node_ids = [node_id for node_id in affected_ids if is_executable(graph, node_id)]
+        self.plan = InvocationPlan(graph, node_ids, invocation_config, [])
+
+    @property
+    def changed(self) -> List[TargetKey]:
+        """Targets of added and modified actions."""
+        return sorted(self.added + self.modified)
+
+    @property
+    def affected(self) -> List[TargetKey]:
+        """Targets of the executable actions to run: changed actions and, unless disabled, their transitive dependents."""
+        return self.plan.targets
+
+    def to_invocation_config(self) -> "InvocationConfigType":
+        """Returns a config listing every affected action in included_targets, without tags or transitive flags.
+        Invoke it against head_compilation_result_name. An empty included_targets runs every action, so
+        check is_empty before invoking.
+        """
+        return self.plan.to_invocation_config()
+
+    @property
+    def is_empty(self) -> bool:
+        """Whether no executable action is affected."""
+        return not self.plan.node_ids
+
+    def __repr__(self) -> str:
+        return f"CompilationDiff(added={len(self.added)}, modified={len(self.modified)}, removed={len(self.removed)}, affected={self.plan.count})"
+
+
+def _fingerprinted_actions(tools: "DataformTools", compilation_result_name: str, fingerprints: Dict[TargetKey, str], page_size: int) -> Iterator[ActionRecord]:
+    """Streams the compact actions of a compilation result, recording their fingerprints on the way."""
+    for action in tools.iter_compilation_result_actions(compilation_result_name, page_size=page_size):
+        pb = dataform_v1beta1.CompilationResultAction.pb(action)
+        record = compact_compilation_action(pb)
+        fingerprints[record.target] = action_fingerprint(pb)
+        yield record
+
+
+def diff_compilation_results(tools: "DataformTools", base_compilation_result_name: str, head_compilation_result_name: str, invocation_config: Optional["InvocationConfigType"] = None, include_dependents: bool = True, page_size: int = DEFAULT_ACTIONS_PAGE_SIZE) -> CompilationDiff:
+    """Diffs the actions of two existing compilation results by target and compiled object.
+    Args:
+        tools (DataformTools): The client to use.
+        base_compilation_result_name (str): The name of the compilation result to compare against.
+        head_compilation_result_name (str): The name of the compilation result with the changes.
+        invocation_config (InvocationConfigType|None): Settings (full refresh, service account) carried into the generated config.
+        include_dependents (bool): Whether actions downstream of a change are affected too.
+        page_size (int): The number of actions requested per page.
+    Returns:
+        CompilationDiff: The added, modified and removed targets and the affected head actions.
+    """
+    base_fingerprints: Dict[TargetKey, str] = {}
+    head_fingerprints: Dict[TargetKey, str] = {}
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        base_future = executor.submit(lambda: sum(1 for _ in _fingerprinted_actions(tools, base_compilation_result_name, base_fingerprints, page_size)))
+        graph = CompiledGraph(_fingerprinted_actions(tools, head_compilation_result_name, head_fingerprints, page_size))
+        base_future.result()
+    if invocation_config is None:
+        invocation_config = {"transitive_dependencies_included": False, "transitive_dependents_included": False, "fully_refresh_incremental_tables_enabled": False}
+    diff = CompilationDiff(base_compilation_result_name, head_compilation_result_name, graph, base_fingerprints, head_fingerprints, invocation_config, include_dependents)
+    logger.info(f"Diffed {len(base_fingerprints)} base and {len(head_fingerprints)} head actions: {diff!r}")
+    return diff
+
+
+def diff_compilations(tools: "DataformTools", repository_name: str, base_git_commitish: str, head_git_commitish: str, code_compilation_config: "CodeCompilationConfigType", invocation_config: Optional["InvocationConfigType"] = None, include_dependents: bool = True) -> CompilationDiff:
+    """Compiles two git commitishes concurrently and diffs their actions.
+    Args:
+        tools (DataformTools): The client to use.
+        repository_name (str): The name of the repository.
+        base_git_commitish (str): The commitish to compare against, e.g. the target branch of a pull request.
+        head_git_commitish (str): The commitish with the changes, e.g. the pull request branch.
+        code_compilation_config (CodeCompilationConfigType): The code compilation configuration used for both.
+        invocation_config (InvocationConfigType|None): Settings (full refresh, service account) carried into the generated config.
+        include_dependents (bool): Whether actions downstream of a change are affected too.
+    Returns:
+        CompilationDiff: The added, modified and removed targets and the affected head actions.
+    Raises:
+        ValueError: If either compilation has errors.
+    """
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = {git_commitish: executor.submit(tools.create_compilation_request, repository_name, git_commitish, None, code_compilation_config) for git_commitish in (base_git_commitish, head_git_commitish)}
+        compilation_results = {git_commitish: future.result() for git_commitish, future in futures.items()}
+    names: Dict[str, str] = {}
+    for git_commitish, compilation_result in compilation_results.items():
+        if compilation_result is None or not compilation_result.name:
+            raise ValueError(f"Compilation of {git_commitish} returned no compilation result")
+        if compilation_result.compilation_errors:
+            raise ValueError(f"Compilation of {git_commitish} failed: {compilation_result.compilation_errors[0].message}")
+        names[git_commitish] = compilation_result.name
+    return diff_compilation_results(tools, names[base_git_commitish], names[head_git_commitish], invocation_config, include_dependents)
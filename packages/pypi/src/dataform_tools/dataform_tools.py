@@ -1,15 +1,24 @@
-from ast import Tuple
-from typing import Callable
+from typing import TYPE_CHECKING, Callable, Iterator, Sequence
 import logging
-from typing_extensions import TypedDict, List, Optional, Dict, Any, Union, NotRequired
-from google.cloud import dataform_v1beta1
-from google.cloud.dataform_v1beta1.types import CompilationResult
-from google.cloud.dataform_v1beta1.types import CodeCompilationConfig
-from google.cloud.dataform_v1beta1.types import WorkflowInvocation
-from google.cloud.dataform_v1beta1.types import InvocationConfig
-from google.cloud.dataform_v1beta1.types import Workspace, Repository
-from google.api_core.exceptions import AlreadyExists, GoogleAPICallError, NotFound
-from google.api_core import client_options as client_options_generator
+from typing_extensions import TypedDict, List, Optional, Dict, Any, Tuple, Union, NotRequired
+
+from . import workspace_sync
+from ._lazy import client_options_generator, dataform_v1beta1, exceptions
+from .actions import DEFAULT_ACTIONS_PAGE_SIZE, compact_compilation_action, compact_invocation_action
+from .client_pool import ClientPool
+from .compilation_cache import CompilationCache
+from .compilation_diff import CompilationDiff, diff_compilation_results, diff_compilations
+from .graph import CompiledGraph
+from .instrumentation import NOOP_INSTRUMENTATION, Instrumentation, instrumented_call
+from .planner import InvocationPlan, plan_invocation
+from .policies import COMPILE, INVOKE, READ, WRITE, PolicyLayer
+from .runtime import DEFAULT_HISTORY_INVOCATIONS, DurationHistory, RuntimePredictor
+from .workspace_pool import DEFAULT_IDLE_SECONDS, DEFAULT_LEASE_SECONDS, DEFAULT_POOL_SIZE, WorkspacePool
+from .workspace_state import WorkspaceState
+from .workspace_sync import DEFAULT_SYNC_EXCLUDES, DEFAULT_SYNC_WORKERS, SyncSummary
+
+if TYPE_CHECKING:
+    from google.cloud.dataform_v1beta1.types import CodeCompilationConfig, CompilationResult, Repository, WorkflowInvocation, Workspace
 
 
 logger = logging.getLogger(__name__)
@@ -59,7 +68,7 @@ class InvocationConfigType(TypedDict, total=True):
 class CompilationResultType(TypedDict, total=False):
     workspace: Optional[str]
     git_commitish: Optional[str]
-    code_compilation_config: CodeCompilationConfig
+    code_compilation_config: "CodeCompilationConfig"
 
 class ClientOptions(TypedDict, total=False):
     # NOTE: we have not included all options from google.api_core.client_options.ClientOptions yet
@@ -73,20 +82,66 @@ class ClientOptions(TypedDict, total=False):
 
 
 class DataformTools():
-    def __init__(self, gcp_project_id:str, gcp_location:str, client_options:Optional[ClientOptions] = None):
+    def __init__(self, gcp_project_id:str, gcp_location:str, client_options:Optional[ClientOptions] = None, compilation_cache:Optional[CompilationCache] = None, client_pool:Optional[ClientPool] = None, policy:Optional[PolicyLayer] = None, instrumentation:Optional[Instrumentation] = None):
         """Initializes the DataformTools class.
         Args:
             gcp_project_id (str): The GCP project ID.
             gcp_location (str): The GCP location.
+            client_options (ClientOptions|None): Options passed to the underlying client.
+            compilation_cache (CompilationCache|None): Reuses compilation results of a git_commitish that was already compiled with the same config.
+            client_pool (ClientPool|None): Leases a shared, already connected client instead of creating a new one. Call close() to hand it back.
+            policy (PolicyLayer|None): Timeouts, retries, rate limits and circuit breakers applied to every RPC. Defaults to PolicyLayer().
+            instrumentation (Instrumentation|None): Receives a span per RPC and per run_dataform_remotely phase, e.g. HistogramCollector(). Defaults to a no-op.
         """
         self.gcp_project_id = gcp_project_id
         self.gcp_location = gcp_location
-        if client_options is None:
+        self.compilation_cache = compilation_cache
+        self.client_pool = client_pool
+        self.policy = policy if policy is not None else PolicyLayer()
+        self.instrumentation = instrumentation if instrumentation is not None else NOOP_INSTRUMENTATION
+        self._closed = False
+        # pulls and resets made through this client per (repository, workspace), a WorkspaceState re-lists every file after one
+        self._workspace_generations: Dict[Tuple[str, str], int] = {}
+        if client_pool is not None:
+            self.client = client_pool.acquire(client_options)
+        elif client_options is None:
             self.client = dataform_v1beta1.DataformClient()
         else:
             options = client_options_generator.ClientOptions(**client_options)
             self.client = dataform_v1beta1.DataformClient(client_options=options)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        """Hands the client back to the client pool, or closes its channel if it is not pooled. Calling it again does nothing."""
+        if self._closed:
+            return
+        self._closed = True
+        if self.client_pool is not None:
+            self.client_pool.release(self.client)
+        else:
+            self.client.transport.close()
     
+    def _call(self, family:str, rpc:Callable, request):
+        """Calls a client method under the policy of its family (read, write, compile or invoke)."""
+        return instrumented_call(self.instrumentation, self.policy, family, rpc, request)
+
+    def _pages(self, family:str, rpc:Callable, request) -> Iterator[Any]:
+        """Yields every response page of a paged client method, reissuing the request with each next_page_token.
+        A pager would fetch the pages after the first without the policy and instrumentation, so every page is its own call.
+        """
+        while True:
+            # the first page of a pager is the response it was created from, taking it issues no further RPC
+            page = next(iter(self._call(family, rpc, request).pages))
+            yield page
+            if not page.next_page_token:
+                return
+            request.page_token = page.next_page_token
+
     def list_repositories(self):
         """Lists repositories in Dataform.
         Returns:
@@ -96,10 +151,10 @@ class DataformTools():
         request = dataform_v1beta1.ListRepositoriesRequest(
             parent  = parent,
         )
-        repositories = self.client.list_repositories(request)
+        repositories = self._call(READ, self.client.list_repositories, request)
         return repositories
 
-    def get_repository(self, repository_name:str) -> Repository:
+    def get_repository(self, repository_name:str) -> "Repository":
         """Gets a repository in Dataform.
         Args:
             repository_name (str): The name of the repository.
@@ -109,7 +164,7 @@ class DataformTools():
         request = dataform_v1beta1.GetRepositoryRequest(
             name  = repository_name,
         )
-        repositories = self.client.get_repository(request)
+        repositories = self._call(READ, self.client.get_repository, request)
         return repositories
 
     def list_workspaces(self, repository_name:str):
@@ -123,10 +178,10 @@ class DataformTools():
         request = dataform_v1beta1.ListWorkspacesRequest(
             parent  = parent,
         )
-        workspaces = self.client.list_workspaces(request)
+        workspaces = self._call(READ, self.client.list_workspaces, request)
         return workspaces
 
-    def get_workspace(self, repository_name:str, workspace_name:str) -> Workspace:
+    def get_workspace(self, repository_name:str, workspace_name:str) -> "Workspace":
         """Gets a workspace in Dataform.
         Args:
             repository_name (str): The name of the repository.
@@ -138,10 +193,10 @@ class DataformTools():
         request = dataform_v1beta1.GetWorkspaceRequest(
             name  = workspace_path,
         )
-        workspace = self.client.get_workspace(request)
+        workspace = self._call(READ, self.client.get_workspace, request)
         return workspace
 
-    def create_workspace(self, repository_name:str, workspace_name:str) -> Workspace:
+    def create_workspace(self, repository_name:str, workspace_name:str) -> "Workspace":
         """Creates a workspace in Dataform.
         Args:
             repository_name (str): The name of the repository.
@@ -155,8 +210,8 @@ class DataformTools():
             workspace_id = workspace_name
         )
         try:
-            return self.client.create_workspace(request)
-        except AlreadyExists:
+            return self._call(WRITE, self.client.create_workspace, request)
+        except exceptions.AlreadyExists:
             logger.info(f"workspace: {parent}/workspaces/{workspace_name} already exsists. Fetching ...")
             return self.get_workspace(repository_name, workspace_name)
         except Exception as e:
@@ -174,15 +229,15 @@ class DataformTools():
             name  = workspace_path,
         )
         try:
-            self.client.delete_workspace(request)
+            self._call(WRITE, self.client.delete_workspace, request)
             logger.info(f"Deleted workspace: {workspace_path}")
-        except NotFound:
+        except exceptions.NotFound:
             logger.error(f"Workspace: {workspace_path} not found")
         except Exception as e:
             logger.error(f"Failed to delte workspace: {e}")
             raise
     
-    def create_compilation_request(self, repository_name:str, git_commitish:str|None, workspace_name:str|None, code_compilation_config:CodeCompilationConfigType) -> CompilationResult | None:
+    def create_compilation_request(self, repository_name:str, git_commitish:str|None, workspace_name:str|None, code_compilation_config:CodeCompilationConfigType) -> "CompilationResult | None":
         """Creates a compilation request in Dataform.
         Args:
             repository_name (str): The name of the repository.
@@ -218,7 +273,9 @@ class DataformTools():
             parent=parent,
             compilation_result = compilation_result
         )
-        return self.client.create_compilation_result(request)
+        if(self.compilation_cache is not None and git_commitish and not workspace_name):
+            return self.compilation_cache.get_or_compile(parent, git_commitish, dict(code_compilation_config), lambda: self._call(COMPILE, self.client.create_compilation_result, request))
+        return self._call(COMPILE, self.client.create_compilation_result, request)
     
     def query_compilation_result_actions(self, compilation_result_name:str):
         """Queries compilation result actions in Dataform.
@@ -230,10 +287,32 @@ class DataformTools():
         request = dataform_v1beta1.QueryCompilationResultActionsRequest(
             name = compilation_result_name
         )
-        compilation_result_actions = self.client.query_compilation_result_actions(request)
+        compilation_result_actions = self._call(READ, self.client.query_compilation_result_actions, request)
         return compilation_result_actions       
 
-    def create_workflow_invocation(self, repository_name:str, compilation_result_name:str, invocation_config:InvocationConfigType) -> WorkflowInvocation:
+    def iter_compilation_result_actions(self, compilation_result_name:str, page_size:int = DEFAULT_ACTIONS_PAGE_SIZE, filter:Optional[str] = None, compact:bool = False) -> Iterator[Any]:
+        """Streams compilation result actions page by page, holding at most one page in memory.
+        Args:
+            compilation_result_name (str): The name of the compilation result.
+            page_size (int): The number of actions requested per page.
+            filter (str|None): Optional server side filter, e.g. 'file_path = "definitions/table.sqlx"'.
+            compact (bool): Yield ActionRecord projections (target, type, dependencies, tags) instead of full proto messages.
+        Returns:
+            Iterator[CompilationResultAction|ActionRecord]: The compilation result actions.
+        """
+        request = dataform_v1beta1.QueryCompilationResultActionsRequest(
+            name = compilation_result_name,
+            page_size = page_size,
+            filter = filter or "",
+        )
+        for page in self._pages(READ, self.client.query_compilation_result_actions, request):
+            if compact:
+                for action in type(page).pb(page).compilation_result_actions:
+                    yield compact_compilation_action(action)
+            else:
+                yield from page.compilation_result_actions
+
+    def create_workflow_invocation(self, repository_name:str, compilation_result_name:str, invocation_config:InvocationConfigType) -> "WorkflowInvocation":
         """Creates a workflow invocation in Dataform.
         Args:
             repository_name (str): The name of the repository.
@@ -251,10 +330,72 @@ class DataformTools():
             parent = parent,
             workflow_invocation = workflow_invocation
         )
-        created_workflow_invocation = self.client.create_workflow_invocation(request)
+        created_workflow_invocation = self._call(INVOKE, self.client.create_workflow_invocation, request)
         return created_workflow_invocation
 
-    def get_workflow_invocation(self, repository_name: str, workflow_invocation_id: str) -> WorkflowInvocation:
+    def plan_workflow_invocation(self, compilation_result_name:str, invocation_config:InvocationConfigType) -> InvocationPlan:
+        """Computes on the client which actions a workflow invocation would execute, without creating it.
+        Args:
+            compilation_result_name (str): The name of the compilation result.
+            invocation_config (InvocationConfigType): The invocation configuration.
+        Returns:
+            InvocationPlan: The selected actions with their count, topological layers and critical path depth.
+        """
+        graph = CompiledGraph.from_compilation_result(self, compilation_result_name)
+        return plan_invocation(graph, invocation_config)
+
+    def diff_compilations(self, repository_name:str, base_git_commitish:str, head_git_commitish:str, code_compilation_config:CodeCompilationConfigType, invocation_config:Optional[InvocationConfigType] = None, include_dependents:bool = True) -> CompilationDiff:
+        """Compiles two git commitishes and finds the actions a change affects, to run only those.
+        Actions are matched by target and compared by a hash of their compiled query and settings.
+        Args:
+            repository_name (str): The name of the repository.
+            base_git_commitish (str): The commitish to compare against, e.g. the target branch of a pull request.
+            head_git_commitish (str): The commitish with the changes, e.g. the pull request branch.
+            code_compilation_config (CodeCompilationConfigType): The code compilation configuration used for both.
+            invocation_config (InvocationConfigType|None): Settings (full refresh, service account) carried into the generated config.
+            include_dependents (bool): Whether actions downstream of a change are affected too.
+        Returns:
+            CompilationDiff: Added, modified and removed targets; to_invocation_config() selects the affected actions of the head compilation result.
+        Raises:
+            ValueError: If either compilation has errors.
+        """
+        return diff_compilations(self, repository_name, base_git_commitish, head_git_commitish, code_compilation_config, invocation_config, include_dependents)
+
+    def diff_compilation_results(self, base_compilation_result_name:str, head_compilation_result_name:str, invocation_config:Optional[InvocationConfigType] = None, include_dependents:bool = True) -> CompilationDiff:
+        """Diffs the actions of two existing compilation results, e.g. of a branch and of a workspace.
+        Args:
+            base_compilation_result_name (str): The name of the compilation result to compare against.
+            head_compilation_result_name (str): The name of the compilation result with the changes.
+            invocation_config (InvocationConfigType|None): Settings (full refresh, service account) carried into the generated config.
+            include_dependents (bool): Whether actions downstream of a change are affected too.
+        Returns:
+            CompilationDiff: Added, modified and removed targets and the affected actions of the head compilation result.
+        """
+        return diff_compilation_results(self, base_compilation_result_name, head_compilation_result_name, invocation_config, include_dependents)
+
+    def duration_history(self, repository_name:str, max_invocations:int = DEFAULT_HISTORY_INVOCATIONS, quantile:float = 0.5) -> DurationHistory:
+        """Collects per-action durations from the most recent finished workflow invocations of a repository.
+        Args:
+            repository_name (str): The name of the repository.
+            max_invocations (int): The number of most recent finished invocations to read.
+            quantile (float): Quantile of the durations used as the estimate, e.g. 0.9 for a pessimistic ETA.
+        Returns:
+            DurationHistory: Recent durations per target.
+        """
+        return DurationHistory.from_workflow_invocations(self, repository_name, max_invocations, quantile=quantile)
+
+    def predict_runtime(self, compilation_result_name:str, invocation_config:InvocationConfigType, history:DurationHistory) -> RuntimePredictor:
+        """Plans a workflow invocation and predicts its critical path and ETA from historical action durations.
+        Args:
+            compilation_result_name (str): The name of the compilation result.
+            invocation_config (InvocationConfigType): The invocation configuration.
+            history (DurationHistory): Durations of previous runs, e.g. from duration_history.
+        Returns:
+            RuntimePredictor: Call predict() for the ETA, or follow() to update it while the invocation runs.
+        """
+        return RuntimePredictor.from_plan(self.plan_workflow_invocation(compilation_result_name, invocation_config), history)
+
+    def get_workflow_invocation(self, repository_name: str, workflow_invocation_id: str) -> "WorkflowInvocation":
         """Gets a workflow invocation in Dataform.
         Args:
             repository_name (str): The name of the repository.
@@ -266,7 +407,7 @@ class DataformTools():
         request = dataform_v1beta1.GetWorkflowInvocationRequest(
             name=workflow_invocation_path
         )
-        workflow_invocation = self.client.get_workflow_invocation(request)
+        workflow_invocation = self._call(READ, self.client.get_workflow_invocation, request)
         return workflow_invocation
 
     def list_workflow_invocations(self, repository_name: str, **kwargs):
@@ -282,7 +423,7 @@ class DataformTools():
             parent=parent,
             **kwargs
         )
-        workflow_invocations = self.client.list_workflow_invocations(request)
+        workflow_invocations = self._call(READ, self.client.list_workflow_invocations, request)
         return workflow_invocations
 
     def get_latest_workflow_invocation(self, repository_name: str):
@@ -318,9 +459,34 @@ class DataformTools():
             name=workflow_invocation_path,
             **kwargs
         )
-        workflow_invocation_actions = self.client.query_workflow_invocation_actions(request)
+        workflow_invocation_actions = self._call(READ, self.client.query_workflow_invocation_actions, request)
         return workflow_invocation_actions
 
+    def iter_workflow_invocation_actions(self, repository_name:str, workflow_invocation_id:str, page_size:int = DEFAULT_ACTIONS_PAGE_SIZE, compact:bool = False) -> Iterator[Any]:
+        """Streams workflow invocation actions page by page, holding at most one page in memory.
+        Args:
+            repository_name (str): The name of the repository.
+            workflow_invocation_id (str): The ID of the workflow invocation.
+            page_size (int): The number of actions requested per page.
+            compact (bool): Yield ActionRecord projections (target, type, state) instead of full proto messages.
+        Returns:
+            Iterator[WorkflowInvocationAction|ActionRecord]: The workflow invocation actions.
+        """
+        if not repository_name:
+            raise ValueError("repository_name must be provided.")
+        if not workflow_invocation_id:
+            raise ValueError("workflow_invocation_id must be provided.")
+        request = dataform_v1beta1.QueryWorkflowInvocationActionsRequest(
+            name = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}/workflowInvocations/{workflow_invocation_id}",
+            page_size = page_size,
+        )
+        for page in self._pages(READ, self.client.query_workflow_invocation_actions, request):
+            if compact:
+                for action in type(page).pb(page).workflow_invocation_actions:
+                    yield compact_invocation_action(action)
+            else:
+                yield from page.workflow_invocation_actions
+
     def write_file(self, repository_name:str, workspace_name:str, relative_path:str, contents:str|bytes)-> None:
         """Writes a file to a workspace in Dataform.
         Args:
@@ -339,7 +505,7 @@ class DataformTools():
 
         request = dataform_v1beta1.WriteFileRequest(workspace=workspace_path,  path=relative_path, contents=buffer_contents)
 
-        self.client.write_file(request)
+        self._call(WRITE, self.client.write_file, request)
     
     def remove_file(self, repository_name:str, worksapce_name:str, relative_path:str) -> None:
         """Removes a file from a workspace in Dataform.
@@ -352,7 +518,78 @@ class DataformTools():
         """
         workspace_path = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}/workspaces/{worksapce_name}"
         request = dataform_v1beta1.RemoveFileRequest(workspace=workspace_path, path=relative_path)
-        self.client.remove_file(request)
+        self._call(WRITE, self.client.remove_file, request)
+
+    def read_file(self, repository_name:str, workspace_name:str, relative_path:str) -> bytes:
+        """Reads a file from a workspace in Dataform.
+        Args:
+            repository_name (str): The name of the repository.
+            workspace_name (str): The name of the workspace.
+            relative_path (str): The relative path of the file to read.
+        Returns:
+            bytes: The contents of the file.
+        """
+        workspace_path = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}/workspaces/{workspace_name}"
+        request = dataform_v1beta1.ReadFileRequest(workspace=workspace_path, path=relative_path)
+        return self._call(READ, self.client.read_file, request).file_contents
+
+    def query_directory_contents(self, repository_name:str, workspace_name:str, relative_path:str = "", **kwargs):
+        """Lists the files and directories directly under a directory of a workspace in Dataform.
+        Args:
+            repository_name (str): The name of the repository.
+            workspace_name (str): The name of the workspace.
+            relative_path (str): The directory to list, relative to the workspace root. Defaults to the root.
+            **kwargs: Optional parameters for the request like page_size, page_token.
+        Returns:
+            QueryDirectoryContentsPager: iterable of directory entries with paths relative to the workspace root.
+        """
+        workspace_path = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}/workspaces/{workspace_name}"
+        request = dataform_v1beta1.QueryDirectoryContentsRequest(workspace=workspace_path, path=relative_path, **kwargs)
+        return self._call(READ, self.client.query_directory_contents, request)
+
+    def sync_directory(self, repository_name:str, workspace_name:str, local_root:str, max_workers:int = DEFAULT_SYNC_WORKERS, delete_stale:bool = True, exclude:Sequence[str] = DEFAULT_SYNC_EXCLUDES, state:Optional[WorkspaceState] = None) -> SyncSummary:
+        """Mirrors a local directory into a workspace in Dataform, uploading only files whose contents differ.
+        Args:
+            repository_name (str): The name of the repository.
+            workspace_name (str): The name of the workspace.
+            local_root (str): The local directory to mirror into the workspace root.
+            max_workers (int): The number of threads used to read, write and remove files concurrently.
+            delete_stale (bool): Whether to remove workspace files that do not exist locally.
+            exclude (Sequence[str]): Glob patterns of paths (or path components) that are neither uploaded nor removed.
+            state (WorkspaceState|None): Manifest of the workspace, refreshed just before the sync. Files of the same size are compared with its hashes instead of being downloaded.
+        Returns:
+            SyncSummary: Counts of uploaded, removed and skipped files, bytes sent and time taken.
+        """
+        return workspace_sync.sync_directory(self, repository_name, workspace_name, local_root, max_workers, delete_stale, exclude, state)
+
+    def workspace_state(self, repository_name:str, workspace_name:str, manifest_path:str, remote_branch:str|None = None, max_workers:int = DEFAULT_SYNC_WORKERS, exclude:Sequence[str] = DEFAULT_SYNC_EXCLUDES) -> WorkspaceState:
+        """Loads (or starts) a local manifest of the files of a workspace. Call refresh() on it to fetch what changed since the last refresh.
+        Args:
+            repository_name (str): The name of the repository.
+            workspace_name (str): The name of the workspace.
+            manifest_path (str): JSON file the manifest is loaded from and saved to.
+            remote_branch (str|None): Branch to compare commits against, so commits made or pulled in the workspace trigger a full rescan.
+            max_workers (int): The number of threads used to list and read files concurrently.
+            exclude (Sequence[str]): Glob patterns of paths (or path components) that are not tracked.
+        Returns:
+            WorkspaceState: The tracked state of the workspace.
+        """
+        return WorkspaceState(self, repository_name, workspace_name, manifest_path, remote_branch, max_workers, exclude)
+
+    def workspace_pool(self, repository_name:str, state_path:str, size:int = DEFAULT_POOL_SIZE, prefix:str = "pool-", lease_seconds:float = DEFAULT_LEASE_SECONDS, idle_seconds:float = DEFAULT_IDLE_SECONDS, install_npm_packages:bool = True) -> WorkspacePool:
+        """Opens (or starts) a pool of warm workspaces that CI jobs lease, reset and return instead of creating and deleting their own.
+        Args:
+            repository_name (str): The name of the repository.
+            state_path (str): JSON file holding the pool state, shared by every process using the pool.
+            size (int): The maximum number of workspaces in the pool.
+            prefix (str): Prefix of the names of pooled workspaces.
+            lease_seconds (float): How long a lease lasts unless renewed, after which a crashed job's workspace is reclaimed.
+            idle_seconds (float): How long a workspace may stay unused before expire_idle() deletes it.
+            install_npm_packages (bool): Whether to install npm packages in new workspaces.
+        Returns:
+            WorkspacePool: The pool, call warm() to prepare workspaces ahead of time and lease() to take one.
+        """
+        return WorkspacePool(self, repository_name, state_path, size, prefix, lease_seconds, idle_seconds, install_npm_packages)
 
     def get_workflow_invocation_url(self, repository_name: str, workflow_invocation_id: str) -> str:
         """Generates the URL for a workflow invocation in Dataform.
@@ -374,7 +611,7 @@ class DataformTools():
         """
         workspace_path = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}/workspaces/{workspace_name}"
         request = dataform_v1beta1.InstallNpmPackagesRequest(workspace=workspace_path)
-        self.client.install_npm_packages(request)
+        self._call(WRITE, self.client.install_npm_packages, request)
     
     def pull_git_commits(self, repository_name: str, workspace_name: str, git_options: GitOptions):
         """Pulls git commits in a workspace in Dataform.
@@ -386,7 +623,8 @@ class DataformTools():
         workspace_path = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}/workspaces/{workspace_name}"
         author = dataform_v1beta1.CommitAuthor(name=git_options["user_name"], email_address=git_options["email_address"])
         request = dataform_v1beta1.PullGitCommitsRequest(name=workspace_path, remote_branch=git_options["remote_branch"], author=author)
-        self.client.pull_git_commits(request)
+        self._call(WRITE, self.client.pull_git_commits, request)
+        self._bump_workspace_generation(repository_name, workspace_name)
     
     def get_workspace_git_state(self, repository_name:str, workspace_name:str):
         """Gets the git state of a workspace in Dataform.
@@ -398,7 +636,7 @@ class DataformTools():
         """
         workspace_path = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}/workspaces/{workspace_name}"
         request = dataform_v1beta1.FetchFileGitStatusesRequest(name=workspace_path)
-        workspace_git_state = self.client.fetch_file_git_statuses(request)
+        workspace_git_state = self._call(READ, self.client.fetch_file_git_statuses, request)
         return workspace_git_state
     
     def reset_workspace_changes(self, repository_name:str, workspace_name:str, paths:List[str] = [], clean=True):
@@ -415,7 +653,24 @@ class DataformTools():
             paths=paths,
             clean=clean
         )
-        self.client.reset_workspace_changes(request)
+        self._call(WRITE, self.client.reset_workspace_changes, request)
+        self._bump_workspace_generation(repository_name, workspace_name)
+
+    def _bump_workspace_generation(self, repository_name:str, workspace_name:str) -> None:
+        key = (repository_name, workspace_name)
+        self._workspace_generations[key] = self._workspace_generations.get(key, 0) + 1
+
+    def fetch_repository_history(self, repository_name:str, **kwargs):
+        """Fetches the commit history of a repository in Dataform, newest first.
+        Args:
+            repository_name (str): The name of the repository.
+            **kwargs: Optional parameters for the request like page_size, page_token.
+        Returns:
+            FetchRepositoryHistoryPager: iterable of CommitLogEntry objects.
+        """
+        repository_path = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}"
+        request = dataform_v1beta1.FetchRepositoryHistoryRequest(name=repository_path, **kwargs)
+        return self._call(READ, self.client.fetch_repository_history, request)
 
     def fetch_git_ahead_behind(self, repository_name:str, workspace_name:str, remote_branch:str):
         """Fetches git ahead/behind in a workspace in Dataform.
@@ -423,13 +678,15 @@ class DataformTools():
             repository_name (str): The name of the repository.
             workspace_name (str): The name of the workspace.
             remote_branch (str): The remote branch to compare the workspace against.
+        Returns:
+            FetchGitAheadBehindResponse: The number of commits ahead and behind the remote branch.
         """
         workspace_path = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}/workspaces/{workspace_name}"
         request = dataform_v1beta1.FetchGitAheadBehindRequest(
             name=workspace_path,
             remote_branch=remote_branch
         )
-        self.client.fetch_git_ahead_behind()
+        return self._call(READ, self.client.fetch_git_ahead_behind, request)
 
     def push_workspace_commits(self, repository_name:str, workspace_name:str, remote_branch:str):
         """Pushes workspace commits in a workspace in Dataform.
@@ -443,7 +700,7 @@ class DataformTools():
             name=workspace_path,
             remote_branch=remote_branch
         )
-        self.client.push_git_commits()
+        self._call(WRITE, self.client.push_git_commits, request)
     
     def run_dataform_remotely(self, repository_name:str, code_compilation_config:CodeCompilationConfigType, invocation_config: InvocationConfigType, workspace_name:str|None, git_commitish:str|None):
         """Runs Dataform remotely by creating a compilation request and workflow invocation.
@@ -461,15 +718,19 @@ class DataformTools():
             ValueError: If both workspace_name and git_commitish are provided.
         """
         workspace_path = f"projects/{self.gcp_project_id}/locations/{self.gcp_location}/repositories/{repository_name}/workspaces/{workspace_name}"
-        compilation_result = self.create_compilation_request(repository_name, git_commitish, workspace_name, code_compilation_config)
-        if(compilation_result and compilation_result.name):
-            workflow_invocation =  self.create_workflow_invocation(repository_name, compilation_result.name, invocation_config)
-            workflow_invocation_id = workflow_invocation.name.split("/").pop()
-            if(workflow_invocation_id):
-                workflow_invocation_url = self.get_workflow_invocation_url(repository_name, workflow_invocation_id)
-                return {
-                    "workflow_invocation": workflow_invocation,
-                    "workflow_invocation_id": workflow_invocation_id,
-                    "workflow_invocation_url": workflow_invocation_url,
-                }
+        instrumentation = self.instrumentation
+        with instrumentation.operation("run_dataform_remotely", repository_name):
+            with instrumentation.operation("run_dataform_remotely.compile", repository_name):
+                compilation_result = self.create_compilation_request(repository_name, git_commitish, workspace_name, code_compilation_config)
+            if(compilation_result and compilation_result.name):
+                with instrumentation.operation("run_dataform_remotely.invoke", repository_name):
+                    workflow_invocation =  self.create_workflow_invocation(repository_name, compilation_result.name, invocation_config)
+                workflow_invocation_id = workflow_invocation.name.split("/").pop()
+                if(workflow_invocation_id):
+                    workflow_invocation_url = self.get_workflow_invocation_url(repository_name, workflow_invocation_id)
+                    return {
+                        "workflow_invocation": workflow_invocation,
+                        "workflow_invocation_id": workflow_invocation_id,
+                        "workflow_invocation_url": workflow_invocation_url,
+                    }
 
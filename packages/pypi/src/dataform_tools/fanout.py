@@ -0,0 +1,165 @@
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from typing_extensions import NotRequired, TypedDict
+
+from .compilation_cache import config_hash
+from .watcher import WorkflowWatcher
+
+if TYPE_CHECKING:
+    from google.cloud.dataform_v1beta1.types import CompilationResult
+    from .async_dataform_tools import AsyncDataformTools
+    from .dataform_tools import CodeCompilationConfigType, InvocationConfigType
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_IN_FLIGHT = 10
+
+
+class RunSpec(TypedDict):
+    # Unique name of the run, referenced by depends_on of other runs.
+    name: str
+    repository_name: str
+    code_compilation_config: "CodeCompilationConfigType"
+    invocation_config: "InvocationConfigType"
+    workspace_name: NotRequired[Optional[str]]
+    git_commitish: NotRequired[Optional[str]]
+    # Names of runs that must succeed before this run starts.
+    depends_on: NotRequired[List[str]]
+
+
+class RunReport(TypedDict):
+    name: str
+    repository_name: str
+    # Final WorkflowInvocation state, "SKIPPED" when a dependency did not succeed or "ERROR" when compilation or the invocation request failed.
+    state: str
+    compilation_result_name: Optional[str]
+    workflow_invocation_id: Optional[str]
+    workflow_invocation_url: Optional[str]
+    error: Optional[str]
+    # Seconds spent waiting for dependencies and a free slot.
+    queued_seconds: float
+    # Seconds spent waiting for the (shared) compilation result.
+    compile_seconds: float
+    # Seconds from creating the invocation until it reached a terminal state.
+    run_seconds: float
+    total_seconds: float
+
+
+def _validate(specs: List[RunSpec]) -> None:
+    names = [spec["name"] for spec in specs]
+    if len(set(names)) != len(names):
+        raise ValueError("Run spec names must be unique.")
+    known = set(names)
+    for spec in specs:
+        unknown = set(spec.get("depends_on") or []) - known
+        if unknown:
+            raise ValueError(f"Run spec {spec['name']} depends on unknown runs: {sorted(unknown)}")
+    # Kahn's algorithm, anything left over is part of a cycle
+    remaining = {spec["name"]: set(spec.get("depends_on") or []) for spec in specs}
+    ready = [name for name, dependencies in remaining.items() if not dependencies]
+    while ready:
+        finished = ready.pop()
+        del remaining[finished]
+        for name, dependencies in remaining.items():
+            if finished in dependencies:
+                dependencies.discard(finished)
+                if not dependencies:
+                    ready.append(name)
+    if remaining:
+        raise ValueError(f"Run specs have a dependency cycle between: {sorted(remaining)}")
+
+
+async def run_many(tools: "AsyncDataformTools", specs: List[RunSpec], max_in_flight: int = DEFAULT_MAX_IN_FLIGHT, watcher: Optional[WorkflowWatcher] = None) -> List[RunReport]:
+    """Compiles and invokes many runs in parallel and waits for all of them.
+
+    Runs sharing the same repository, workspace/git_commitish and compilation config share one
+    compilation result. A run starts once every run in its depends_on succeeded (it is skipped if one
+    did not), and at most max_in_flight invocations run at the same time.
+    Args:
+        tools (AsyncDataformTools): The client to use.
+        specs (List[RunSpec]): The runs to execute.
+        max_in_flight (int): The maximum number of workflow invocations running at once.
+        watcher (WorkflowWatcher|None): Watcher used to wait for invocations. Defaults to a new watcher that is closed afterwards.
+    Returns:
+        List[RunReport]: One report per spec, in the order of specs.
+    """
+    if max_in_flight < 1:
+        raise ValueError("max_in_flight must be at least 1.")
+    _validate(specs)
+
+    own_watcher = watcher is None
+    active_watcher = watcher if watcher is not None else WorkflowWatcher(tools)
+    slots = asyncio.Semaphore(max_in_flight)
+    compilations: Dict[Tuple[str, Optional[str], Optional[str], str], "asyncio.Task[CompilationResult]"] = {}
+    finished: Dict[str, "asyncio.Future[RunReport]"] = {spec["name"]: asyncio.get_running_loop().create_future() for spec in specs}
+
+    def compilation_for(spec: RunSpec) -> "asyncio.Task[CompilationResult]":
+        workspace_name = spec.get("workspace_name")
+        git_commitish = spec.get("git_commitish")
+        key = (spec["repository_name"], workspace_name, git_commitish, config_hash(dict(spec["code_compilation_config"])))
+        if key not in compilations:
+            task = asyncio.ensure_future(tools.create_compilation_request(spec["repository_name"], git_commitish, workspace_name, spec["code_compilation_config"]))
+            # compilations start eagerly, mark failures as retrieved in case every run using it is skipped
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            compilations[key] = task
+        return compilations[key]
+
+    async def execute(spec: RunSpec) -> RunReport:
+        start = time.monotonic()
+        report: RunReport = {
+            "name": spec["name"],
+            "repository_name": spec["repository_name"],
+            "state": "ERROR",
+            "compilation_result_name": None,
+            "workflow_invocation_id": None,
+            "workflow_invocation_url": None,
+            "error": None,
+            "queued_seconds": 0.0,
+            "compile_seconds": 0.0,
+            "run_seconds": 0.0,
+            "total_seconds": 0.0,
+        }
+        compilation = compilation_for(spec)
+        try:
+            dependencies = [await finished[name] for name in spec.get("depends_on") or []]
+            failed = [dependency["name"] for dependency in dependencies if dependency["state"] != "SUCCEEDED"]
+            if failed:
+                report["state"] = "SKIPPED"
+                report["error"] = f"Dependencies did not succeed: {', '.join(failed)}"
+                return report
+
+            async with slots:
+                compile_start = time.monotonic()
+                report["queued_seconds"] = compile_start - start
+                compilation_result = await asyncio.shield(compilation)
+                report["compile_seconds"] = time.monotonic() - compile_start
+                report["compilation_result_name"] = compilation_result.name
+                if compilation_result.compilation_errors:
+                    report["error"] = f"Compilation failed: {compilation_result.compilation_errors[0].message}"
+                    return report
+
+                run_start = time.monotonic()
+                workflow_invocation = await tools.create_workflow_invocation(spec["repository_name"], compilation_result.name, spec["invocation_config"])
+                workflow_invocation_id = workflow_invocation.name.split("/").pop()
+                report["workflow_invocation_id"] = workflow_invocation_id
+                report["workflow_invocation_url"] = tools.get_workflow_invocation_url(spec["repository_name"], workflow_invocation_id)
+                final = await asyncio.shield(active_watcher.watch(spec["repository_name"], workflow_invocation_id))
+                report["run_seconds"] = time.monotonic() - run_start
+                report["state"] = final.state.name
+                return report
+        except Exception as e:
+            logger.error(f"Run {spec['name']} failed: {e}")
+            report["error"] = str(e)
+            return report
+        finally:
+            report["total_seconds"] = time.monotonic() - start
+            finished[spec["name"]].set_result(report)
+
+    try:
+        return list(await asyncio.gather(*(execute(spec) for spec in specs)))
+    finally:
+        if own_watcher:
+            await active_watcher.close()
@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, Iterable, Optional, Set, Tuple
+from typing_extensions import TypedDict
+
+from ._lazy import dataform_v1beta1, exceptions
+from .policies import READ, CircuitOpenError, TokenBucket
+
+if TYPE_CHECKING:
+    from .async_dataform_tools import AsyncDataformTools
+
+
+logger = logging.getLogger(__name__)
+
+# (gcp_project_id, gcp_location)
+FleetScope = Tuple[str, str]
+
+DEFAULT_PROJECT_CONCURRENCY = 10
+DEFAULT_FLEET_PAGE_SIZE = 100
+
+REPOSITORY = "repository"
+WORKSPACE = "workspace"
+WORKFLOW_INVOCATION = "workflow_invocation"
+ERROR = "error"
+
+
+class FleetRecord(TypedDict):
+    # repository, workspace, workflow_invocation (the latest of a repository) or error
+    kind: str
+    gcp_project_id: str
+    gcp_location: str
+    # Short repository name, None for repositories and errors of a whole location.
+    repository_name: Optional[str]
+    # Full resource name, or the parent that failed to list for errors.
+    name: str
+    # Repository, Workspace or WorkflowInvocation message, None for errors.
+    resource: Any
+    error: Optional[str]
+
+
+class FleetLister():
+    def __init__(self, tools: "AsyncDataformTools", include_workspaces: bool = True, include_latest_invocation: bool = True, max_concurrency_per_project: int = DEFAULT_PROJECT_CONCURRENCY, rate_per_project: Optional[float] = None, page_size: int = DEFAULT_FLEET_PAGE_SIZE):
+        """Lists repositories, workspaces and latest workflow invocations across many projects and locations concurrently.
+
+        Requests go through the client, policy and concurrency limit of tools, which only needs to be
+        authorised for every project: resource names carry the project and location, so one client
+        serves the whole fleet. Each project additionally gets its own concurrency limit and, with
+        rate_per_project, a token bucket, so a large project cannot exhaust its quota or starve others.
+        Args:
+            tools (AsyncDataformTools): The client to use, its own project and location are not used.
+            include_workspaces (bool): Whether to list the workspaces of every repository.
+            include_latest_invocation (bool): Whether to fetch the latest workflow invocation of every repository.
+            max_concurrency_per_project (int): Maximum number of RPCs in flight per project, across its locations.
+            rate_per_project (float|None): Maximum RPCs per second per project, unlimited by default.
+            page_size (int): The number of resources requested per page.
+        """
+        if max_concurrency_per_project < 1:
+            raise ValueError("max_concurrency_per_project must be at least 1.")
+        self.tools = tools
+        self.include_workspaces = include_workspaces
+        self.include_latest_invocation = include_latest_invocation
+        self.max_concurrency_per_project = max_concurrency_per_project
+        self.rate_per_project = rate_per_project
+        self.page_size = page_size
+        self._semaphores: Dict[str, asyncio.Semaphore] = {}
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    async def _call(self, gcp_project_id: str, rpc: Callable, request: Any) -> Any:
+        semaphore = self._semaphores.get(gcp_project_id)
+        if semaphore is None:
+            semaphore = self._semaphores[gcp_project_id] = asyncio.Semaphore(self.max_concurrency_per_project)
+            if self.rate_per_project is not None:
+                self._buckets[gcp_project_id] = TokenBucket(self.rate_per_project, burst=self.max_concurrency_per_project)
+        async with semaphore:
+            bucket = self._buckets.get(gcp_project_id)
+            wait = bucket.reserve() if bucket is not None else 0.0
+            if wait > 0:
+                await asyncio.sleep(wait)
+            return await self.tools._call(READ, rpc, request)
+
+    async def _pages(self, gcp_project_id: str, rpc: Callable, request: Any, field: str) -> AsyncIterator[Any]:
+        """Yields the items of every page, each page being a separate call under the project's limits."""
+        while True:
+            page = await self._call(gcp_project_id, rpc, request)
+            for item in getattr(page, field):
+                yield item
+            if not page.next_page_token:
+                return
+            request.page_token = page.next_page_token
+
+    async def stream(self, scopes: Iterable[FleetScope]) -> AsyncIterator[FleetRecord]:
+        """Yields a record per repository, workspace and latest invocation as soon as it was listed, in no particular order.
+
+        A failed listing (e.g. PermissionDenied for one project) is yielded as an error record and the
+        rest of the fleet is still listed.
+        Args:
+            scopes (Iterable[FleetScope]): The (gcp_project_id, gcp_location) pairs to list.
+        Returns:
+            AsyncIterator[FleetRecord]: The merged records of every scope.
+        """
+        client = self.tools.client
+        # None once every listing finished
+        queue: "asyncio.Queue[FleetRecord|Exception|None]" = asyncio.Queue()
+        tasks: Set["asyncio.Task[None]"] = set()
+
+        def record(kind: str, gcp_project_id: str, gcp_location: str, repository_name: Optional[str], name: str, resource: Any = None, error: Optional[str] = None) -> FleetRecord:
+            return {"kind": kind, "gcp_project_id": gcp_project_id, "gcp_location": gcp_location, "repository_name": repository_name, "name": name, "resource": resource, "error": error}
+
+        def spawn(work: Callable[[], Any], gcp_project_id: str, gcp_location: str, repository_name: Optional[str], parent: str) -> None:
+            async def run() -> None:
+                try:
+                    await work()
+                except (exceptions.GoogleAPICallError, CircuitOpenError) as e:
+                    logger.debug(f"Listing {parent} failed: {e}")
+                    queue.put_nowait(record(ERROR, gcp_project_id, gcp_location, repository_name, parent, error=f"{type(e).__name__}: {e}"))
+                except Exception as e:
+                    # anything else is a bug, surface it to the consumer instead of losing it in the task
+                    queue.put_nowait(e)
+                finally:
+                    tasks.discard(task)
+                    if not tasks:
+                        queue.put_nowait(None)
+
+            task = asyncio.ensure_future(run())
+            tasks.add(task)
+
+        def list_repository(gcp_project_id: str, gcp_location: str, repository: Any) -> None:
+            repository_name = repository.name.split("/").pop()
+            if self.include_workspaces:
+                async def list_workspaces() -> None:
+                    request = dataform_v1beta1.ListWorkspacesRequest(parent=repository.name, page_size=self.page_size)
+                    async for workspace in self._pages(gcp_project_id, client.list_workspaces, request, "workspaces"):
+                        queue.put_nowait(record(WORKSPACE, gcp_project_id, gcp_location, repository_name, workspace.name, workspace))
+
+                spawn(list_workspaces, gcp_project_id, gcp_location, repository_name, repository.name)
+            if self.include_latest_invocation:
+                async def latest_invocation() -> None:
+                    request = dataform_v1beta1.ListWorkflowInvocationsRequest(parent=repository.name, page_size=1, order_by="create_time desc")
+                    page = await self._call(gcp_project_id, client.list_workflow_invocations, request)
+                    for invocation in page.workflow_invocations[:1]:
+                        queue.put_nowait(record(WORKFLOW_INVOCATION, gcp_project_id, gcp_location, repository_name, invocation.name, invocation))
+
+                spawn(latest_invocation, gcp_project_id, gcp_location, repository_name, repository.name)
+
+        def list_location(gcp_project_id: str, gcp_location: str) -> None:
+            parent = f"projects/{gcp_project_id}/locations/{gcp_location}"
+
+            async def list_repositories() -> None:
+                request = dataform_v1beta1.ListRepositoriesRequest(parent=parent, page_size=self.page_size)
+                async for repository in self._pages(gcp_project_id, client.list_repositories, request, "repositories"):
+                    queue.put_nowait(record(REPOSITORY, gcp_project_id, gcp_location, None, repository.name, repository))
+                    list_repository(gcp_project_id, gcp_location, repository)
+
+            spawn(list_repositories, gcp_project_id, gcp_location, None, parent)
+
+        start = time.perf_counter()
+        for gcp_project_id, gcp_location in dict.fromkeys(scopes):
+            list_location(gcp_project_id, gcp_location)
+        if not tasks:
+            return
+        records = 0
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                records += 1
+                yield item
+        finally:
+            for task in list(tasks):
+                task.cancel()
+        logger.info(f"Listed {records} fleet records in {time.perf_counter() - start:.2f}s")
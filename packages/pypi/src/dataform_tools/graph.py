@@ -0,0 +1,234 @@
+from array import array
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .actions import DEFAULT_ACTIONS_PAGE_SIZE, ActionRecord, TargetKey, compact_compilation_action, target_key
+
+if TYPE_CHECKING:
+    from .dataform_tools import DataformTools
+
+
+class CompiledGraph():
+    """Dependency graph of the actions of a compilation result.
+
+    Nodes are integer ids in the order actions were read. Edges are stored in compressed sparse row
+    form: for node i, its dependencies are _dependency_ids[_dependency_offsets[i]:_dependency_offsets[i + 1]]
+    and likewise for its dependents, so neighbour lookups are array slices and a target lookup is a
+    single dict access. Dependencies on targets that are not actions of the compilation result are
+    dropped and counted in missing_dependencies.
+    """
+
+    def __init__(self, actions: Iterable[Any]):
+        """Builds the graph in a single pass over the actions.
+        Args:
+            actions (Iterable[ActionRecord|CompilationResultAction]): Actions of a compilation result, e.g. from iter_compilation_result_actions.
+        """
+        self.targets: List[TargetKey] = []
+        self.types: List[str] = []
+        self.tags: List[Tuple[str, ...]] = []
+        # 1 for actions disabled in their config, which Dataform skips
+        self.disabled = bytearray()
+        self._index: Dict[TargetKey, int] = {}
+        self._tag_index: Dict[str, List[int]] = {}
+        pending: List[Tuple[TargetKey, ...]] = []
+
+        for action in actions:
+            record = action if isinstance(action, ActionRecord) else compact_compilation_action(action)
+            node_id = len(self.targets)
+            self._index[record.target] = node_id
+            self.targets.append(record.target)
+            self.types.append(record.type)
+            self.tags.append(record.tags)
+            self.disabled.append(record.disabled)
+            for tag in record.tags:
+                self._tag_index.setdefault(tag, []).append(node_id)
+            pending.append(record.dependencies)
+
+        node_count = len(self.targets)
+        self.missing_dependencies = 0
+        dependency_offsets = array("l", [0])
+        dependency_ids = array("l")
+        dependent_counts = [0] * node_count
+        for dependencies in pending:
+            for dependency in dependencies:
+                dependency_id = self._index.get(dependency)
+                if dependency_id is None:
+                    self.missing_dependencies += 1
+                    continue
+                dependency_ids.append(dependency_id)
+                dependent_counts[dependency_id] += 1
+            dependency_offsets.append(len(dependency_ids))
+
+        # invert the dependency lists into dependent lists with a counting sort
+        dependent_offsets = array("l", [0]) * (node_count + 1)
+        for node_id in range(node_count):
+            dependent_offsets[node_id + 1] = dependent_offsets[node_id] + dependent_counts[node_id]
+        dependent_ids = array("l", [0]) * len(dependency_ids)
+        cursor = dependent_offsets[:-1]
+        for node_id in range(node_count):
+            for position in range(dependency_offsets[node_id], dependency_offsets[node_id + 1]):
+                dependency_id = dependency_ids[position]
+                dependent_ids[cursor[dependency_id]] = node_id
+                cursor[dependency_id] += 1
+
+        self._dependency_offsets = dependency_offsets
+        self._dependency_ids = dependency_ids
+        self._dependent_offsets = dependent_offsets
+        self._dependent_ids = dependent_ids
+
+    @classmethod
+    def from_compilation_result(cls, tools: "DataformTools", compilation_result_name: str, page_size: int = DEFAULT_ACTIONS_PAGE_SIZE) -> "CompiledGraph":
+        """Builds the graph by streaming the compact actions of a compilation result.
+        Args:
+            tools (DataformTools): The client to use.
+            compilation_result_name (str): The name of the compilation result.
+            page_size (int): The number of actions requested per page.
+        Returns:
+            CompiledGraph: The dependency graph.
+        """
+        return cls(tools.iter_compilation_result_actions(compilation_result_name, page_size=page_size, compact=True))
+
+    def __len__(self) -> int:
+        return len(self.targets)
+
+    def __contains__(self, target: Any) -> bool:
+        return self._key(target) in self._index
+
+    def __iter__(self) -> Iterator[TargetKey]:
+        return iter(self.targets)
+
+    @staticmethod
+    def _key(target: Any) -> TargetKey:
+        return target if isinstance(target, tuple) else target_key(target)
+
+    def node_id(self, target: Any) -> int:
+        """Returns the id of a target given as a (database, schema, name) tuple, Target dict or Target proto.
+        Raises:
+            KeyError: If the target is not an action of the compilation result.
+        """
+        return self._index[self._key(target)]
+
+    def get_node_id(self, target: Any) -> Optional[int]:
+        """Returns the id of a target, or None if it is not an action of the compilation result."""
+        return self._index.get(self._key(target))
+
+    def dependency_ids(self, node_id: int) -> Sequence[int]:
+        """Returns the ids of the direct dependencies of a node."""
+        return self._dependency_ids[self._dependency_offsets[node_id]:self._dependency_offsets[node_id + 1]]
+
+    def dependent_ids(self, node_id: int) -> Sequence[int]:
+        """Returns the ids of the direct dependents of a node."""
+        return self._dependent_ids[self._dependent_offsets[node_id]:self._dependent_offsets[node_id + 1]]
+
+    def _closure(self, seeds: Iterable[int], offsets: array, ids: array, include_seeds: bool) -> List[int]:
+        visited = bytearray(len(self.targets))
+        stack = []
+        for seed in seeds:
+            if not visited[seed]:
+                visited[seed] = 1
+                stack.append(seed)
+        seed_ids = set(stack)
+        while stack:
+            node_id = stack.pop()
+            for position in range(offsets[node_id], offsets[node_id + 1]):
+                neighbour = ids[position]
+                if not visited[neighbour]:
+                    visited[neighbour] = 1
+                    stack.append(neighbour)
+        return [node_id for node_id in range(len(visited)) if visited[node_id] and (include_seeds or node_id not in seed_ids)]
+
+    def transitive_dependency_ids(self, node_ids: Iterable[int], include_seeds: bool = False) -> List[int]:
+        """Returns the sorted ids of every node the given nodes depend on, directly or transitively."""
+        return self._closure(node_ids, self._dependency_offsets, self._dependency_ids, include_seeds)
+
+    def transitive_dependent_ids(self, node_ids: Iterable[int], include_seeds: bool = False) -> List[int]:
+        """Returns the sorted ids of every node depending on the given nodes, directly or transitively."""
+        return self._closure(node_ids, self._dependent_offsets, self._dependent_ids, include_seeds)
+
+    def dependencies(self, target: Any, transitive: bool = False) -> List[TargetKey]:
+        """Returns the targets a target depends on.
+        Args:
+            target (TargetKey|Target): The target to look up.
+            transitive (bool): Whether to include indirect dependencies.
+        Returns:
+            List[TargetKey]: The dependency targets.
+        """
+        node_id = self.node_id(target)
+        node_ids = self.transitive_dependency_ids([node_id]) if transitive else self.dependency_ids(node_id)
+        return [self.targets[dependency_id] for dependency_id in node_ids]
+
+    def dependents(self, target: Any, transitive: bool = False) -> List[TargetKey]:
+        """Returns the targets that depend on a target, i.e. the actions impacted by a change to it.
+        Args:
+            target (TargetKey|Target): The target to look up.
+            transitive (bool): Whether to include indirect dependents.
+        Returns:
+            List[TargetKey]: The dependent targets.
+        """
+        node_id = self.node_id(target)
+        node_ids = self.transitive_dependent_ids([node_id]) if transitive else self.dependent_ids(node_id)
+        return [self.targets[dependent_id] for dependent_id in node_ids]
+
+    def ids_with_tags(self, tags: Iterable[str]) -> List[int]:
+        """Returns the sorted ids of nodes that have at least one of the tags."""
+        node_ids = set()
+        for tag in tags:
+            node_ids.update(self._tag_index.get(tag, ()))
+        return sorted(node_ids)
+
+    def with_tags(self, tags: Iterable[str]) -> List[TargetKey]:
+        """Returns the targets of actions that have at least one of the tags."""
+        return [self.targets[node_id] for node_id in self.ids_with_tags(tags)]
+
+    def layers(self, node_ids: Optional[Iterable[int]] = None) -> List[List[int]]:
+        """Splits nodes into topological layers, every node only depends on nodes of earlier layers.
+        Args:
+            node_ids (Iterable[int]|None): Restrict layering to these ids, ordered by dependencies through unselected nodes too. Defaults to all nodes.
+        Returns:
+            List[List[int]]: Node ids per layer, layer 0 has no selected dependencies.
+        Raises:
+            ValueError: If the graph has a dependency cycle.
+        """
+        node_count = len(self.targets)
+        if node_ids is None:
+            selected = bytearray(b"\x01") * node_count
+            in_scope = selected
+        else:
+            selected = bytearray(node_count)
+            for node_id in node_ids:
+                selected[node_id] = 1
+            # unselected dependencies can still order selected nodes, so walk everything upstream of the selection
+            in_scope = bytearray(node_count)
+            for node_id in self.transitive_dependency_ids((node_id for node_id in range(node_count) if selected[node_id]), include_seeds=True):
+                in_scope[node_id] = 1
+        in_degree = [0] * node_count
+        remaining = 0
+        for node_id in range(node_count):
+            if in_scope[node_id]:
+                remaining += 1
+                # the scope is closed under dependencies, every dependency is in it
+                in_degree[node_id] = len(self.dependency_ids(node_id))
+
+        # level[i]: number of selected nodes on the longest dependency path ending before node i
+        level = [0] * node_count
+        layers: List[List[int]] = []
+        ready = [node_id for node_id in range(node_count) if in_scope[node_id] and in_degree[node_id] == 0]
+        while ready:
+            node_id = ready.pop()
+            remaining -= 1
+            if selected[node_id]:
+                while len(layers) <= level[node_id]:
+                    layers.append([])
+                layers[level[node_id]].append(node_id)
+            next_level = level[node_id] + selected[node_id]
+            for dependent_id in self.dependent_ids(node_id):
+                if in_scope[dependent_id]:
+                    if next_level > level[dependent_id]:
+                        level[dependent_id] = next_level
+                    in_degree[dependent_id] -= 1
+                    if in_degree[dependent_id] == 0:
+                        ready.append(dependent_id)
+        if remaining:
+            raise ValueError(f"Dependency cycle detected between {remaining} actions")
+        for layer in layers:
+            layer.sort()
+        return layers
@@ -0,0 +1,384 @@
+import asyncio
+import csv
+import json
+import logging
+import os
+import tempfile
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional, Set, Tuple
+from typing_extensions import TypedDict
+
+from ._lazy import dataform_v1beta1
+from .actions import TERMINAL_STATES, _action_states
+from .policies import READ
+from .watcher import parse_workflow_invocation_name
+
+if TYPE_CHECKING:
+    from .async_dataform_tools import AsyncDataformTools
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXPORT_CONCURRENCY = 10
+# Invocations are listed by create time but only carry their start time, which lags the create time while
+# an invocation is queued. Listing goes on this far past the start of the window before it stops.
+START_TIME_SLACK = timedelta(hours=1)
+
+
+class InvocationRow(TypedDict):
+    repository_name: str
+    workflow_invocation_id: str
+    state: str
+    compilation_result: str
+    start_time: Optional[datetime]
+    end_time: Optional[datetime]
+    duration_seconds: Optional[float]
+    action_count: int
+
+
+class ActionRow(TypedDict):
+    repository_name: str
+    workflow_invocation_id: str
+    database: str
+    schema: str
+    name: str
+    # bigquery, notebook or data_preparation
+    type: str
+    state: str
+    start_time: Optional[datetime]
+    end_time: Optional[datetime]
+    duration_seconds: Optional[float]
+    failure_reason: str
+
+
+class ExportSummary(TypedDict):
+    invocations_exported: int
+    actions_exported: int
+    # Invocations in the window that were already exported or are still running.
+    invocations_skipped: int
+    watermark: Optional[datetime]
+    elapsed_seconds: float
+
+
+INVOCATION_COLUMNS = list(InvocationRow.__annotations__)
+ACTION_COLUMNS = list(ActionRow.__annotations__)
+
+
+def _timestamp(timestamp: Any) -> Optional[datetime]:
+    """Converts a protobuf Timestamp to an aware UTC datetime, None if it is unset."""
+    if not timestamp.seconds and not timestamp.nanos:
+        return None
+    return datetime.fromtimestamp(timestamp.seconds + timestamp.nanos / 1e9, tz=timezone.utc)
+
+
+def _timing(interval: Any) -> Tuple[Optional[datetime], Optional[datetime], Optional[float]]:
+    start_time = _timestamp(interval.start_time)
+    end_time = _timestamp(interval.end_time)
+    duration_seconds = (end_time - start_time).total_seconds() if start_time and end_time else None
+    return start_time, end_time, duration_seconds
+
+
+def action_row(repository_name: str, workflow_invocation_id: str, action: Any) -> ActionRow:
+    """Flattens a raw WorkflowInvocationAction protobuf message into an ActionRow."""
+    start_time, end_time, duration_seconds = _timing(action.invocation_timing)
+    return {
+        "repository_name": repository_name,
+        "workflow_invocation_id": workflow_invocation_id,
+        "database": action.target.database,
+        "schema": action.target.schema,
+        "name": action.target.name,
+        "type": (action.WhichOneof("action") or "bigquery_action").removesuffix("_action"),
+        "state": _action_states().get(action.state, "STATE_UNSPECIFIED"),
+        "start_time": start_time,
+        "end_time": end_time,
+        "duration_seconds": duration_seconds,
+        "failure_reason": action.failure_reason,
+    }
+
+
+class HistoryWriter(ABC):
+    """Destination of exported rows. Subclasses write invocations and actions to two tables."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @abstractmethod
+    def write_invocation(self, row: InvocationRow) -> None:
+        pass
+
+    @abstractmethod
+    def write_actions(self, rows: List[ActionRow]) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class CsvHistoryWriter(HistoryWriter):
+    def __init__(self, directory: str):
+        """Appends rows to invocations.csv and actions.csv in directory, writing headers for new files.
+        Timestamps are written as ISO 8601 UTC.
+        Args:
+            directory (str): Directory of the CSV files, created if missing.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self._files = []
+        self._invocations = self._open("invocations.csv", INVOCATION_COLUMNS)
+        self._actions = self._open("actions.csv", ACTION_COLUMNS)
+
+    def _open(self, file_name: str, columns: List[str]) -> csv.DictWriter:
+        path = os.path.join(self.directory, file_name)
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        f = open(path, "a", newline="", encoding="utf-8")
+        self._files.append(f)
+        writer = csv.DictWriter(f, fieldnames=columns)
+        if is_new:
+            writer.writeheader()
+        return writer
+
+    @staticmethod
+    def _format(row: Dict[str, Any]) -> Dict[str, Any]:
+        return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in row.items()}
+
+    def write_invocation(self, row: InvocationRow) -> None:
+        self._invocations.writerow(self._format(dict(row)))
+
+    def write_actions(self, rows: List[ActionRow]) -> None:
+        self._actions.writerows(self._format(dict(row)) for row in rows)
+
+    def close(self) -> None:
+        for f in self._files:
+            f.close()
+        self._files = []
+
+
+class ParquetHistoryWriter(HistoryWriter):
+    def __init__(self, directory: str, row_group_size: int = 50_000):
+        """Writes rows to new invocations-<time>.parquet and actions-<time>.parquet files in directory, one per export.
+        Rows are buffered and flushed as row groups of row_group_size, so memory stays bounded.
+        Requires pyarrow (pip install "dataform-tools[parquet]").
+        Args:
+            directory (str): Directory of the Parquet files, created if missing.
+            row_group_size (int): Rows per Parquet row group.
+        """
+        try:
+            import pyarrow  # pyrefly: ignore[missing-import]
+            import pyarrow.parquet  # pyrefly: ignore[missing-import]
+        except ImportError as e:
+            raise ImportError('ParquetHistoryWriter requires pyarrow, install it with: pip install "dataform-tools[parquet]"') from e
+        self._pyarrow = pyarrow
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.row_group_size = row_group_size
+        timestamp = pyarrow.timestamp("us", tz="UTC")
+        suffix = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+        self._tables = {}
+        for table_name, schema in (
+            ("invocations", pyarrow.schema([
+                ("repository_name", pyarrow.string()), ("workflow_invocation_id", pyarrow.string()), ("state", pyarrow.string()),
+                ("compilation_result", pyarrow.string()), ("start_time", timestamp), ("end_time", timestamp),
+                ("duration_seconds", pyarrow.float64()), ("action_count", pyarrow.int64()),
+            ])),
+            ("actions", pyarrow.schema([
+                ("repository_name", pyarrow.string()), ("workflow_invocation_id", pyarrow.string()), ("database", pyarrow.string()),
+                ("schema", pyarrow.string()), ("name", pyarrow.string()), ("type", pyarrow.string()), ("state", pyarrow.string()),
+                ("start_time", timestamp), ("end_time", timestamp), ("duration_seconds", pyarrow.float64()), ("failure_reason", pyarrow.string()),
+            ])),
+        ):
+            path = os.path.join(directory, f"{table_name}-{suffix}.parquet")
+            self._tables[table_name] = (pyarrow.parquet.ParquetWriter(path, schema), schema, [])
+
+    def _append(self, table_name: str, rows: List[Dict[str, Any]]) -> None:
+        _, _, buffer = self._tables[table_name]
+        buffer.extend(rows)
+        if len(buffer) >= self.row_group_size:
+            self._flush(table_name)
+
+    def _flush(self, table_name: str) -> None:
+        writer, schema, buffer = self._tables[table_name]
+        if buffer:
+            writer.write_table(self._pyarrow.Table.from_pylist(buffer, schema=schema))
+            buffer.clear()
+
+    def write_invocation(self, row: InvocationRow) -> None:
+        self._append("invocations", [dict(row)])
+
+    def write_actions(self, rows: List[ActionRow]) -> None:
+        self._append("actions", [dict(row) for row in rows])
+
+    def close(self) -> None:
+        for table_name, (writer, _, _) in self._tables.items():
+            self._flush(table_name)
+            writer.close()
+        self._tables = {}
+
+
+class ExportState():
+    def __init__(self, path: str):
+        """Watermark of an incremental export, persisted as JSON.
+
+        watermark is the start time from which the next export lists invocations: the start of the
+        oldest invocation that was still running, or else the newest exported one. exported holds the
+        invocations that can still be listed again and were already written, so they are skipped.
+        Invocations that never started are keyed by the start time of the next newer invocation.
+        """
+        self.path = path
+        self.watermark: Optional[datetime] = None
+        # invocation name -> start time
+        self.exported: Dict[str, datetime] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            self.watermark = datetime.fromisoformat(state["watermark"]) if state.get("watermark") else None
+            self.exported = {name: datetime.fromisoformat(started_at) for name, started_at in (state.get("exported") or {}).items()}
+
+    def record(self, name: str, started_at: datetime) -> None:
+        """Marks an invocation as written and saves right away, so an export that fails later does not write it again."""
+        self.exported[name] = started_at
+        self.save()
+
+    def advance(self, watermark: datetime, exported: Dict[str, datetime]) -> None:
+        """Moves the watermark forward and forgets exported invocations that the next export no longer lists."""
+        if self.watermark is not None and watermark < self.watermark:
+            watermark = self.watermark
+        self.watermark = watermark
+        self.exported.update(exported)
+        self.exported = {name: started_at for name, started_at in self.exported.items() if started_at >= watermark - START_TIME_SLACK}
+
+    def save(self) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temporary_path = tempfile.mkstemp(prefix=".export-state-", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"watermark": self.watermark.isoformat() if self.watermark else None, "exported": {name: started_at.isoformat() for name, started_at in self.exported.items()}}, f, sort_keys=True)
+            os.replace(temporary_path, self.path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+
+async def export_invocation_history(tools: "AsyncDataformTools", repository_name: str, writer: HistoryWriter, start_time: Optional[datetime] = None, end_time: Optional[datetime] = None, state_path: Optional[str] = None, max_concurrency: int = DEFAULT_EXPORT_CONCURRENCY) -> ExportSummary:
+    """Exports finished workflow invocations of a repository and the timings of their actions.
+
+    Invocations are listed newest first by create time, and listing stops at the first one that started
+    more than START_TIME_SLACK before the window. Actions of up to max_concurrency invocations are fetched at once and written as soon as
+    an invocation's actions are complete. Invocations that are still running are not exported, those that never started
+    are placed in the window by the start of the next newer invocation. With state_path, every written invocation is saved to
+    the state at once, so an export rerun after a failure does not write it a second time.
+    Args:
+        tools (AsyncDataformTools): The client to use.
+        repository_name (str): The name of the repository.
+        writer (HistoryWriter): Destination of the rows, e.g. CsvHistoryWriter or ParquetHistoryWriter.
+        start_time (datetime|None): Only export invocations that started at or after this time.
+        end_time (datetime|None): Only export invocations that started before this time.
+        state_path (str|None): JSON file holding the watermark. When set, the export resumes where the previous one stopped.
+        max_concurrency (int): The maximum number of invocations whose actions are fetched at once.
+    Returns:
+        ExportSummary: Counts of exported and skipped invocations, exported actions and the new watermark.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1.")
+    start = time.perf_counter()
+    state = ExportState(state_path) if state_path else None
+    window_start = start_time
+    if state is not None and state.watermark is not None and (window_start is None or state.watermark > window_start):
+        window_start = state.watermark
+    already_exported = state.exported if state is not None else {}
+
+    summary: ExportSummary = {"invocations_exported": 0, "actions_exported": 0, "invocations_skipped": 0, "watermark": None, "elapsed_seconds": 0.0}
+    exported: Dict[str, datetime] = {}
+    oldest_running: Optional[datetime] = None
+    newest_seen: Optional[datetime] = None
+
+    async def export(invocation: Any, listed_at: datetime) -> None:
+        pb = type(invocation).pb(invocation)
+        _, workflow_invocation_id = parse_workflow_invocation_name(pb.name)
+        rows: List[ActionRow] = []
+        request = dataform_v1beta1.QueryWorkflowInvocationActionsRequest(name=pb.name, page_size=1000)
+        async for page in tools._pages(READ, tools.client.query_workflow_invocation_actions, request):
+            rows.extend(action_row(repository_name, workflow_invocation_id, action) for action in type(page).pb(page).workflow_invocation_actions)
+        invocation_start, invocation_end, duration_seconds = _timing(pb.invocation_timing)
+        # write both tables only once all actions were fetched, so a failed export never leaves a partial invocation
+        writer.write_actions(rows)
+        writer.write_invocation({
+            "repository_name": repository_name,
+            "workflow_invocation_id": workflow_invocation_id,
+            "state": type(invocation).State(pb.state).name,
+            "compilation_result": pb.compilation_result or pb.resolved_compilation_result,
+            "start_time": invocation_start,
+            "end_time": invocation_end,
+            "duration_seconds": duration_seconds,
+            "action_count": len(rows),
+        })
+        summary["invocations_exported"] += 1
+        summary["actions_exported"] += len(rows)
+        exported[pb.name] = listed_at
+        if state is not None:
+            state.record(pb.name, listed_at)
+
+    async def list_invocations() -> AsyncIterator[Any]:
+        request = dataform_v1beta1.ListWorkflowInvocationsRequest(
+            parent=f"projects/{tools.gcp_project_id}/locations/{tools.gcp_location}/repositories/{repository_name}",
+            order_by="create_time desc",
+            page_size=1000,
+        )
+        async for page in tools._pages(READ, tools.client.list_workflow_invocations, request):
+            for invocation in page.workflow_invocations:
+                yield invocation
+
+    pending: Set["asyncio.Task[None]"] = set()
+    try:
+        # start of the last listed invocation that started, the position in the create time order of those that did not
+        listed_at = datetime.now(timezone.utc)
+        async for invocation in list_invocations():
+            invocation_start = _timestamp(type(invocation).pb(invocation).invocation_timing.start_time)
+            if invocation_start is not None:
+                # every invocation listed from here on was created before this one, which started too long before the window
+                if window_start is not None and invocation_start < window_start - START_TIME_SLACK:
+                    break
+                listed_at = invocation_start
+            # an invocation that never started is filtered by the start of the next newer one, which was created after it
+            if end_time is not None and listed_at >= end_time:
+                continue
+            if window_start is not None and listed_at < window_start:
+                continue
+            if invocation_start is not None:
+                newest_seen = max(newest_seen or invocation_start, invocation_start)
+            if invocation.state.name not in TERMINAL_STATES:
+                if invocation_start is not None:
+                    oldest_running = min(oldest_running or invocation_start, invocation_start)
+                summary["invocations_skipped"] += 1
+                continue
+            if invocation.name in already_exported:
+                summary["invocations_skipped"] += 1
+                continue
+            if len(pending) >= max_concurrency:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    task.result()
+            pending.add(asyncio.ensure_future(export(invocation, listed_at)))
+        if pending:
+            done, pending = await asyncio.wait(pending)
+            for task in done:
+                task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+    if state is not None:
+        # the next export resumes at the oldest invocation that was still running, or else the newest one seen
+        watermark = oldest_running or newest_seen
+        if watermark is not None:
+            state.advance(watermark, exported)
+            state.save()
+        summary["watermark"] = state.watermark
+    summary["elapsed_seconds"] = time.perf_counter() - start
+    logger.info(f"Exported {summary['invocations_exported']} workflow invocations with {summary['actions_exported']} actions from repository {repository_name} in {summary['elapsed_seconds']:.2f}s")
+    return summary
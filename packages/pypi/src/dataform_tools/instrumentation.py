@@ -0,0 +1,256 @@
+import bisect
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, ContextManager, Dict, Iterator, List, Optional
+from typing_extensions import TypedDict
+
+if TYPE_CHECKING:
+    from .policies import PolicyLayer
+
+
+OPERATION = "operation"
+
+_REPOSITORY_PATTERN = re.compile(r"/repositories/([^/]+)")
+
+
+def repository_from_request(request: Any) -> Optional[str]:
+    """Extracts the repository name from the resource name fields of a request message."""
+    for field in ("name", "parent", "workspace", "compilation_result"):
+        value = getattr(request, field, None)
+        if isinstance(value, str):
+            match = _REPOSITORY_PATTERN.search(value)
+            if match:
+                return match.group(1)
+    return None
+
+
+class RpcSpan():
+    __slots__ = ("method", "family", "repository", "request_bytes", "attempts", "outcome", "error", "started_at", "latency_seconds", "handle")
+
+    def __init__(self, method: str, family: str, repository: Optional[str], request_bytes: int = 0):
+        """Measurements of one RPC wrapper call (including its retries) or one composite operation."""
+        self.method = method
+        self.family = family
+        self.repository = repository
+        self.request_bytes = request_bytes
+        self.attempts = 0
+        self.outcome = "ok"
+        self.error: Optional[BaseException] = None
+        self.started_at = time.perf_counter()
+        self.latency_seconds = 0.0
+        # backend specific state, e.g. an OpenTelemetry span
+        self.handle: Any = None
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.latency_seconds = time.perf_counter() - self.started_at
+        if error is not None:
+            self.error = error
+            self.outcome = type(error).__name__
+
+    @property
+    def retries(self) -> int:
+        return max(0, self.attempts - 1)
+
+
+class Instrumentation():
+    """No-op instrumentation and base class of instrumentation backends.
+
+    Backends set enabled = True and override on_start / on_finish. While enabled is False the
+    clients skip building spans entirely, so the default costs a single attribute check per call.
+    """
+    enabled = False
+
+    def on_start(self, span: RpcSpan) -> None:
+        pass
+
+    def on_finish(self, span: RpcSpan) -> None:
+        pass
+
+    def operation(self, name: str, repository: Optional[str] = None) -> ContextManager[Optional[RpcSpan]]:
+        """Measures a composite operation (e.g. run_dataform_remotely) spanning several RPCs."""
+        if not self.enabled:
+            return nullcontext()
+        return self._operation(name, repository)
+
+    @contextmanager
+    def _operation(self, name: str, repository: Optional[str]) -> Iterator[Optional[RpcSpan]]:
+        span = RpcSpan(name, OPERATION, repository)
+        self.on_start(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.finish(e)
+            raise
+        else:
+            span.finish()
+        finally:
+            self.on_finish(span)
+
+
+NOOP_INSTRUMENTATION = Instrumentation()
+
+
+def _start_span(instrumentation: Instrumentation, family: str, rpc: Callable, request: Any) -> RpcSpan:
+    pb = getattr(type(request), "pb", None)
+    request_bytes = pb(request).ByteSize() if pb is not None else 0
+    span = RpcSpan(getattr(rpc, "__name__", "rpc"), family, repository_from_request(request), request_bytes)
+    instrumentation.on_start(span)
+    return span
+
+
+def instrumented_call(instrumentation: Instrumentation, policy: "PolicyLayer", family: str, rpc: Callable[..., Any], request: Any) -> Any:
+    """Calls rpc under policy, reporting a span to instrumentation when it is enabled."""
+    if not instrumentation.enabled:
+        return policy.call(family, rpc, request)
+    span = _start_span(instrumentation, family, rpc, request)
+    try:
+        response = policy.call(family, rpc, request, span)
+    except BaseException as e:
+        span.finish(e)
+        raise
+    else:
+        span.finish()
+        return response
+    finally:
+        instrumentation.on_finish(span)
+
+
+async def instrumented_call_async(instrumentation: Instrumentation, policy: "PolicyLayer", family: str, rpc: Callable[..., Awaitable[Any]], request: Any) -> Any:
+    """Awaits rpc under policy, reporting a span to instrumentation when it is enabled."""
+    if not instrumentation.enabled:
+        return await policy.call_async(family, rpc, request)
+    span = _start_span(instrumentation, family, rpc, request)
+    try:
+        response = await policy.call_async(family, rpc, request, span)
+    except BaseException as e:
+        span.finish(e)
+        raise
+    else:
+        span.finish()
+        return response
+    finally:
+        instrumentation.on_finish(span)
+
+
+class MethodStats(TypedDict):
+    family: str
+    count: int
+    errors: int
+    retries: int
+    request_bytes: int
+    mean_seconds: float
+    p50_seconds: float
+    p90_seconds: float
+    p99_seconds: float
+    max_seconds: float
+
+
+# Upper bounds of the latency buckets: 1ms to ~17 minutes, each 25% wider than the previous one.
+_BUCKET_BOUNDS: List[float] = [0.001 * 1.25 ** index for index in range(63)]
+
+
+class _Histogram():
+    __slots__ = ("family", "buckets", "count", "errors", "retries", "request_bytes", "total_seconds", "max_seconds")
+
+    def __init__(self, family: str):
+        self.family = family
+        self.buckets = [0] * (len(_BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.request_bytes = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def quantile(self, q: float) -> float:
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.buckets):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return min(_BUCKET_BOUNDS[index], self.max_seconds) if index < len(_BUCKET_BOUNDS) else self.max_seconds
+        return 0.0
+
+
+class HistogramCollector(Instrumentation):
+    enabled = True
+
+    def __init__(self):
+        """In process collector keeping a log-bucketed latency histogram (~25% resolution) plus error, retry and payload counters per method."""
+        self._histograms: Dict[str, _Histogram] = {}
+        self._lock = threading.Lock()
+
+    def on_finish(self, span: RpcSpan) -> None:
+        with self._lock:
+            histogram = self._histograms.get(span.method)
+            if histogram is None:
+                histogram = self._histograms[span.method] = _Histogram(span.family)
+            histogram.buckets[bisect.bisect_left(_BUCKET_BOUNDS, span.latency_seconds)] += 1
+            histogram.count += 1
+            histogram.errors += span.outcome != "ok"
+            histogram.retries += span.retries
+            histogram.request_bytes += span.request_bytes
+            histogram.total_seconds += span.latency_seconds
+            histogram.max_seconds = max(histogram.max_seconds, span.latency_seconds)
+
+    def stats(self) -> Dict[str, MethodStats]:
+        """Returns latency percentiles and counters per method name."""
+        with self._lock:
+            return {
+                method: {
+                    "family": histogram.family,
+                    "count": histogram.count,
+                    "errors": histogram.errors,
+                    "retries": histogram.retries,
+                    "request_bytes": histogram.request_bytes,
+                    "mean_seconds": histogram.total_seconds / histogram.count,
+                    "p50_seconds": histogram.quantile(0.5),
+                    "p90_seconds": histogram.quantile(0.9),
+                    "p99_seconds": histogram.quantile(0.99),
+                    "max_seconds": histogram.max_seconds,
+                }
+                for method, histogram in self._histograms.items()
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+
+class OpenTelemetryInstrumentation(Instrumentation):
+    enabled = True
+
+    def __init__(self, tracer: Any = None, meter: Any = None):
+        """Reports every RPC and composite operation as an OpenTelemetry span, and optionally a duration histogram.
+        Requires the opentelemetry-api package (pip install "dataform-tools[opentelemetry]").
+        Args:
+            tracer: Tracer to use. Defaults to the global tracer provider's "dataform_tools" tracer.
+            meter: Meter used to record the "dataform_tools.rpc.duration" histogram. No metrics are recorded if None.
+        """
+        from opentelemetry import context, trace
+        self._context = context
+        self._trace = trace
+        self.tracer = tracer if tracer is not None else trace.get_tracer("dataform_tools")
+        self._duration = meter.create_histogram("dataform_tools.rpc.duration", unit="s") if meter is not None else None
+
+    def on_start(self, span: RpcSpan) -> None:
+        attributes = {"rpc.method": span.method, "dataform.family": span.family, "dataform.request_bytes": span.request_bytes}
+        if span.repository:
+            attributes["dataform.repository"] = span.repository
+        otel_span = self.tracer.start_span(f"dataform_tools.{span.method}", attributes=attributes)
+        # make it the current span so RPC spans of an operation are nested under it
+        span.handle = (otel_span, self._context.attach(self._trace.set_span_in_context(otel_span)))
+
+    def on_finish(self, span: RpcSpan) -> None:
+        otel_span, token = span.handle
+        otel_span.set_attribute("dataform.attempts", span.attempts)
+        otel_span.set_attribute("dataform.outcome", span.outcome)
+        if span.error is not None:
+            otel_span.record_exception(span.error)
+            otel_span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, span.outcome))
+        otel_span.end()
+        self._context.detach(token)
+        if self._duration is not None:
+            self._duration.record(span.latency_seconds, {"rpc.method": span.method, "dataform.outcome": span.outcome})
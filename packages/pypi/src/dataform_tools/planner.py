@@ -0,0 +1,138 @@
+from typing import TYPE_CHECKING, Any, Dict, List
+
+from .actions import TargetKey, target_key
+from .graph import CompiledGraph
+
+if TYPE_CHECKING:
+    from .dataform_tools import InvocationConfigType, Target
+
+
+# Declarations only describe existing tables, Dataform never executes them.
+NON_EXECUTABLE_TYPES = frozenset({"declaration"})
+
+
+def is_executable(graph: CompiledGraph, node_id: int) -> bool:
+    """Whether Dataform would execute the action when it is selected: it is neither a declaration nor disabled."""
+    return graph.types[node_id] not in NON_EXECUTABLE_TYPES and not graph.disabled[node_id]
+
+
+class InvocationPlan():
+    def __init__(self, graph: CompiledGraph, node_ids: List[int], invocation_config: "InvocationConfigType", unmatched_targets: List[TargetKey]):
+        """The exact set of actions a workflow invocation would execute, computed on the client.
+        Args:
+            graph (CompiledGraph): The graph of the compilation result the invocation runs.
+            node_ids (List[int]): Sorted ids of the selected actions.
+            invocation_config (InvocationConfigType): The invocation configuration that was planned.
+            unmatched_targets (List[TargetKey]): Included targets that are not actions of the compilation result.
+        """
+        self.graph = graph
+        self.node_ids = node_ids
+        self.invocation_config = invocation_config
+        self.unmatched_targets = unmatched_targets
+        self.layers = graph.layers(node_ids)
+
+    @property
+    def count(self) -> int:
+        """Number of actions that would be executed."""
+        return len(self.node_ids)
+
+    @property
+    def depth(self) -> int:
+        """Length of the critical path, i.e. the number of actions that have to run one after another."""
+        return len(self.layers)
+
+    @property
+    def targets(self) -> List[TargetKey]:
+        """Targets of the selected actions."""
+        return [self.graph.targets[node_id] for node_id in self.node_ids]
+
+    def _config_for(self, node_ids: List[int]) -> "InvocationConfigType":
+        config: "InvocationConfigType" = {
+            "included_targets": [_target_dict(self.graph.targets[node_id]) for node_id in node_ids],
+            "included_tags": [],
+            "transitive_dependencies_included": False,
+            "transitive_dependents_included": False,
+            "fully_refresh_incremental_tables_enabled": self.invocation_config.get("fully_refresh_incremental_tables_enabled", False),
+        }
+        if "service_account" in self.invocation_config:
+            config["service_account"] = self.invocation_config["service_account"]
+        return config
+
+    def to_invocation_config(self) -> "InvocationConfigType":
+        """Rewrites the planned config to an equivalent one listing every selected action explicitly, without tags or transitive flags."""
+        return self._config_for(self.node_ids)
+
+    def split(self, max_actions: int) -> List["InvocationConfigType"]:
+        """Splits the plan into explicit configs of at most max_actions actions each.
+
+        Actions are taken in topological layer order, so running the returned configs one after another
+        (waiting for each invocation to finish) respects every dependency within the plan, also when it
+        goes through actions outside the plan. Dependencies that fall in the same chunk are ordered by
+        Dataform within that invocation.
+        Args:
+            max_actions (int): The maximum number of actions per invocation.
+        Returns:
+            List[InvocationConfigType]: The configs to invoke in order.
+        """
+        if max_actions < 1:
+            raise ValueError("max_actions must be at least 1.")
+        ordered = [node_id for layer in self.layers for node_id in layer]
+        chunks = [ordered[start:start + max_actions] for start in range(0, len(ordered), max_actions)]
+        return [self._config_for(chunk) for chunk in chunks]
+
+    def __repr__(self) -> str:
+        return f"InvocationPlan(count={self.count}, depth={self.depth}, unmatched_targets={len(self.unmatched_targets)})"
+
+
+def _target_dict(target: TargetKey) -> "Target":
+    database, schema, name = target
+    return {"database": database, "schema": schema, "name": name}
+
+
+def _match_target(graph: CompiledGraph, target: Any, by_name: Dict[str, List[int]]) -> List[int]:
+    key = target_key(target)
+    node_id = graph.get_node_id(key)
+    if node_id is not None:
+        return [node_id]
+    # like Dataform, a target given without database or schema matches on the fields that are set
+    database, schema, name = key
+    return [
+        candidate for candidate in by_name.get(name, ())
+        if (not database or graph.targets[candidate][0] == database) and (not schema or graph.targets[candidate][1] == schema)
+    ]
+
+
+def plan_invocation(graph: CompiledGraph, invocation_config: "InvocationConfigType") -> InvocationPlan:
+    """Computes the actions a workflow invocation with this config would execute.
+    Args:
+        graph (CompiledGraph): The graph of the compilation result to invoke.
+        invocation_config (InvocationConfigType): The invocation configuration.
+    Returns:
+        InvocationPlan: The selected actions with their count, layers and critical path depth.
+    """
+    included_targets = invocation_config.get("included_targets") or []
+    included_tags = invocation_config.get("included_tags") or []
+
+    unmatched_targets: List[TargetKey] = []
+    if not included_targets and not included_tags:
+        selected = list(range(len(graph)))
+    else:
+        by_name: Dict[str, List[int]] = {}
+        if any(graph.get_node_id(target_key(target)) is None for target in included_targets):
+            for node_id, (_, _, name) in enumerate(graph.targets):
+                by_name.setdefault(name, []).append(node_id)
+        seeds = set(graph.ids_with_tags(included_tags))
+        for target in included_targets:
+            matched = _match_target(graph, target, by_name)
+            if not matched:
+                unmatched_targets.append(target_key(target))
+            seeds.update(matched)
+        selected_ids = set(seeds)
+        if invocation_config.get("transitive_dependencies_included"):
+            selected_ids.update(graph.transitive_dependency_ids(seeds))
+        if invocation_config.get("transitive_dependents_included"):
+            selected_ids.update(graph.transitive_dependent_ids(seeds))
+        selected = sorted(selected_ids)
+
+    node_ids = [node_id for node_id in selected if is_executable(graph, node_id)]
+    return InvocationPlan(graph, node_ids, invocation_config, unmatched_targets)
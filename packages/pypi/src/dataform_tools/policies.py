@@ -0,0 +1,305 @@
+import functools
+import logging
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from ._lazy import exceptions
+
+if TYPE_CHECKING:
+    from .instrumentation import RpcSpan
+
+
+logger = logging.getLogger(__name__)
+
+READ = "read"
+WRITE = "write"
+COMPILE = "compile"
+INVOKE = "invoke"
+
+
+@functools.lru_cache(maxsize=None)
+def retryable_errors() -> Tuple[type, ...]:
+    """Transient errors worth retrying for idempotent calls."""
+    return (
+        exceptions.ResourceExhausted,
+        exceptions.ServiceUnavailable,
+        exceptions.DeadlineExceeded,
+        exceptions.InternalServerError,
+        exceptions.Aborted,
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def rejected_errors() -> Tuple[type, ...]:
+    """Errors that mean the service rejected the request before executing it, safe to retry even for non-idempotent calls."""
+    return (exceptions.ResourceExhausted,)
+
+
+def __getattr__(name: str) -> Any:
+    # RETRYABLE_ERRORS and REJECTED_ERRORS are resolved on first use so importing this module does not import google.api_core
+    if name == "RETRYABLE_ERRORS":
+        return retryable_errors()
+    if name == "REJECTED_ERRORS":
+        return rejected_errors()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the service while the circuit breaker of a method family is open."""
+
+
+class RpcPolicy():
+    def __init__(self, timeout: Optional[float] = 60.0, deadline: Optional[float] = 300.0, max_attempts: int = 5, initial_backoff: float = 1.0, max_backoff: float = 30.0, multiplier: float = 2.0, idempotent: bool = True, rate_per_second: Optional[float] = None, burst: int = 1, failure_threshold: Optional[int] = None, reset_timeout: float = 30.0):
+        """Timeout, retry, rate limit and circuit breaker settings shared by a family of RPCs.
+        Args:
+            timeout (float|None): Timeout in seconds of a single attempt.
+            deadline (float|None): Overall seconds across all attempts, attempts and backoff are cut short to respect it.
+            max_attempts (int): Maximum number of attempts, 1 disables retries.
+            initial_backoff (float): Upper bound in seconds of the first (fully jittered) backoff.
+            max_backoff (float): Upper bound in seconds of any backoff.
+            multiplier (float): Factor the backoff bound grows by after each attempt.
+            idempotent (bool): Whether every retryable error may be retried. Non-idempotent calls are only retried when the service rejected them before executing (ResourceExhausted).
+            rate_per_second (float|None): Sustained calls per second allowed by the token bucket. None disables rate limiting.
+            burst (int): Calls allowed at once before the rate limit applies.
+            failure_threshold (int|None): Consecutive failed calls that open the circuit breaker. None disables it.
+            reset_timeout (float): Seconds an open circuit waits before letting a trial call through.
+        """
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1.")
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.multiplier = multiplier
+        self.idempotent = idempotent
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+
+def default_policies() -> Dict[str, RpcPolicy]:
+    """Default policy per family. Invocations are not idempotent, a retried create could start a second run."""
+    return {
+        READ: RpcPolicy(timeout=60.0),
+        WRITE: RpcPolicy(timeout=60.0),
+        COMPILE: RpcPolicy(timeout=300.0, deadline=600.0),
+        INVOKE: RpcPolicy(timeout=60.0, idempotent=False),
+    }
+
+
+class TokenBucket():
+    def __init__(self, rate_per_second: float, burst: int = 1):
+        """Thread safe token bucket. reserve() takes a token and tells the caller how long to wait for it."""
+        if rate_per_second <= 0 or burst < 1:
+            raise ValueError("Expected rate_per_second > 0 and burst >= 1.")
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Takes a token, possibly from the future.
+        Returns:
+            float: Seconds to wait before the call may proceed, 0 if a token was available.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(float(self.burst), self._tokens + (now - self._updated_at) * self.rate_per_second)
+            self._updated_at = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate_per_second
+
+
+class CircuitBreaker():
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        """Opens after failure_threshold consecutive failures and lets one trial call through every reset_timeout seconds."""
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                # half open: let this call through, a failure re-opens the circuit for another reset_timeout
+                self._opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class PolicyCounters():
+    __slots__ = ("calls", "attempts", "retries", "throttled", "throttled_seconds", "rejected", "failures")
+
+    def __init__(self):
+        """Per family counters. throttled counts calls delayed by the rate limiter, rejected counts calls refused by an open circuit."""
+        self.calls = 0
+        self.attempts = 0
+        self.retries = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+        self.rejected = 0
+        self.failures = 0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class PolicyLayer():
+    def __init__(self, policies: Optional[Dict[str, RpcPolicy]] = None):
+        """Applies an RpcPolicy to every RPC made by DataformTools, per family (read, write, compile, invoke).
+        Args:
+            policies (Dict[str, RpcPolicy]|None): Overrides of the default policy per family.
+        """
+        self.policies = default_policies()
+        self.policies.update(policies or {})
+        self.counters: Dict[str, PolicyCounters] = {family: PolicyCounters() for family in self.policies}
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+        for family, policy in self.policies.items():
+            if policy.rate_per_second is not None:
+                self._buckets[family] = TokenBucket(policy.rate_per_second, policy.burst)
+            if policy.failure_threshold is not None:
+                self._breakers[family] = CircuitBreaker(policy.failure_threshold, policy.reset_timeout)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Returns a copy of the counters of every family."""
+        return {family: counters.as_dict() for family, counters in self.counters.items()}
+
+    def _is_retryable(self, policy: RpcPolicy, error: Exception) -> bool:
+        return isinstance(error, retryable_errors() if policy.idempotent else rejected_errors())
+
+    def _begin(self, family: str) -> RpcPolicy:
+        with self._lock:
+            self.counters[family].calls += 1
+        return self.policies[family]
+
+    def _admit(self, family: str) -> float:
+        """Checks the circuit breaker and reserves a rate limit token before an attempt. Returns the seconds to wait."""
+        counters = self.counters[family]
+        breaker = self._breakers.get(family)
+        if breaker is not None and not breaker.allow():
+            with self._lock:
+                counters.rejected += 1
+            raise CircuitOpenError(f"Circuit breaker for {family} calls is open")
+        bucket = self._buckets.get(family)
+        wait = bucket.reserve() if bucket is not None else 0.0
+        if wait > 0:
+            with self._lock:
+                counters.throttled += 1
+                counters.throttled_seconds += wait
+        return wait
+
+    def _after_attempt(self, family: str, policy: RpcPolicy, error: Optional[Exception], attempt: int, started_at: float) -> Optional[float]:
+        """Records an attempt. Returns the backoff before the next attempt, or None if the call is finished."""
+        counters = self.counters[family]
+        breaker = self._breakers.get(family)
+        with self._lock:
+            counters.attempts += 1
+        if error is None:
+            if breaker is not None:
+                breaker.record_success()
+            return None
+        retryable = self._is_retryable(policy, error)
+        backoff = random.uniform(0, min(policy.max_backoff, policy.initial_backoff * policy.multiplier ** (attempt - 1)))
+        if policy.deadline is not None:
+            remaining = policy.deadline - (time.monotonic() - started_at)
+            if backoff >= remaining:
+                retryable = False
+        if not retryable or attempt >= policy.max_attempts:
+            with self._lock:
+                counters.failures += 1
+            # only transient errors count towards opening the circuit, a NotFound says nothing about service health
+            if breaker is not None and isinstance(error, retryable_errors()):
+                breaker.record_failure()
+            return None
+        with self._lock:
+            counters.retries += 1
+        logger.debug(f"Retrying {family} call in {backoff:.2f}s after attempt {attempt}: {error}")
+        return backoff
+
+    def _attempt_timeout(self, policy: RpcPolicy, started_at: float) -> Optional[float]:
+        if policy.deadline is None:
+            return policy.timeout
+        remaining = max(0.0, policy.deadline - (time.monotonic() - started_at))
+        return remaining if policy.timeout is None else min(policy.timeout, remaining)
+
+    def call(self, family: str, rpc: Callable[..., Any], request: Any, span: Optional["RpcSpan"] = None) -> Any:
+        """Calls rpc(request) under the policy of a family, blocking for rate limits and backoff.
+        Args:
+            family (str): One of read, write, compile, invoke.
+            rpc (Callable): The client method to call.
+            request: The request message.
+            span (RpcSpan|None): Span whose attempts are updated, when instrumentation is enabled.
+        Returns:
+            The response of the RPC.
+        """
+        policy = self._begin(family)
+        wait = self._admit(family)
+        if wait > 0:
+            time.sleep(wait)
+        started_at = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            if span is not None:
+                span.attempts = attempt
+            try:
+                response = rpc(request, retry=None, timeout=self._attempt_timeout(policy, started_at))
+            except Exception as e:
+                backoff = self._after_attempt(family, policy, e, attempt, started_at)
+                if backoff is None:
+                    raise
+                # every retry goes through the breaker and the rate limit again, it waits for whichever of backoff and token is later
+                time.sleep(max(backoff, self._admit(family)))
+                continue
+            self._after_attempt(family, policy, None, attempt, started_at)
+            return response
+
+    async def call_async(self, family: str, rpc: Callable[..., Awaitable[Any]], request: Any, span: Optional["RpcSpan"] = None) -> Any:
+        """Awaits rpc(request) under the policy of a family, sleeping asynchronously for rate limits and backoff."""
+        # imported here so the synchronous client never pays for importing asyncio
+        import asyncio
+        policy = self._begin(family)
+        wait = self._admit(family)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        started_at = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            if span is not None:
+                span.attempts = attempt
+            try:
+                response = await rpc(request, retry=None, timeout=self._attempt_timeout(policy, started_at))
+            except Exception as e:
+                backoff = self._after_attempt(family, policy, e, attempt, started_at)
+                if backoff is None:
+                    raise
+                await asyncio.sleep(max(backoff, self._admit(family)))
+                continue
+            self._after_attempt(family, policy, None, attempt, started_at)
+            return response
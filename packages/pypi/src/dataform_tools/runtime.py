@@ -0,0 +1,362 @@
+import bisect
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from typing_extensions import TypedDict
+
+from ._lazy import dataform_v1beta1
+from .actions import TERMINAL_STATES, TargetKey, _action_states, _intern_target, target_key
+from .graph import CompiledGraph
+from .planner import InvocationPlan, is_executable
+from .policies import READ
+
+if TYPE_CHECKING:
+    from .dataform_tools import DataformTools
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_INVOCATIONS = 20
+DEFAULT_MAX_SAMPLES = 20
+# Assumed duration of an action without history when no action has history either.
+DEFAULT_ACTION_SECONDS = 30.0
+DEFAULT_BOTTLENECKS = 10
+
+# WorkflowInvocationAction states after which an action no longer runs.
+FINISHED_ACTION_STATES = frozenset({"SUCCEEDED", "FAILED", "CANCELLED", "SKIPPED", "DISABLED"})
+
+
+def _epoch_seconds(timestamp: Any) -> Optional[float]:
+    if not timestamp.seconds and not timestamp.nanos:
+        return None
+    return timestamp.seconds + timestamp.nanos / 1e9
+
+
+def _row_seconds(value: Any) -> Optional[float]:
+    """Epoch seconds of an exported timestamp, an ISO string in CSV or a datetime in Parquet."""
+    if value in (None, ""):
+        return None
+    return (datetime.fromisoformat(value) if isinstance(value, str) else value).timestamp()
+
+
+def _raw_invocation_action(action: Any) -> Any:
+    message_type = dataform_v1beta1.WorkflowInvocationAction
+    return message_type.pb(action) if isinstance(action, message_type) else action
+
+
+class DurationHistory():
+    def __init__(self, quantile: float = 0.5, max_samples: int = DEFAULT_MAX_SAMPLES):
+        """Recent durations of each action, keyed by target.
+        Args:
+            quantile (float): Quantile of the samples used as the estimate, e.g. 0.9 for a pessimistic ETA.
+            max_samples (int): The number of most recent durations kept per target.
+        """
+        if not 0.0 <= quantile <= 1.0:
+            raise ValueError("quantile must be between 0 and 1.")
+        self.quantile = quantile
+        self.max_samples = max_samples
+        # durations per target, newest first, and the negated end time of each so bisect keeps that order
+        self.samples: Dict[TargetKey, List[float]] = {}
+        self._ages: Dict[TargetKey, List[float]] = {}
+
+    def __len__(self) -> int:
+        return len(self.samples)
+
+    def __contains__(self, target: Any) -> bool:
+        return (target if isinstance(target, tuple) else target_key(target)) in self.samples
+
+    def add(self, target: Any, seconds: float, finished_at: Optional[float] = None) -> None:
+        """Records a duration, keeping the max_samples most recent ones per target whatever order they are added in.
+        Args:
+            target (Target|TargetKey): The action the duration belongs to.
+            seconds (float): The duration.
+            finished_at (float|None): Epoch seconds the action ended. Samples without it count as older than any with it, in the order they are added.
+        """
+        key = target if isinstance(target, tuple) else target_key(target)
+        samples = self.samples.setdefault(key, [])
+        ages = self._ages.setdefault(key, [])
+        age = -finished_at if finished_at is not None else float("inf")
+        index = bisect.bisect_right(ages, age)
+        if index >= self.max_samples:
+            return
+        ages.insert(index, age)
+        samples.insert(index, seconds)
+        if len(samples) > self.max_samples:
+            ages.pop()
+            samples.pop()
+
+    def add_actions(self, actions: Iterable[Any]) -> int:
+        """Records the durations of the succeeded actions of a workflow invocation.
+        Args:
+            actions (Iterable[WorkflowInvocationAction]): Proto-plus or raw protobuf actions, e.g. from iter_workflow_invocation_actions.
+        Returns:
+            int: The number of durations recorded.
+        """
+        succeeded = dataform_v1beta1.WorkflowInvocationAction.State.SUCCEEDED
+        recorded = 0
+        for action in actions:
+            pb = _raw_invocation_action(action)
+            if pb.state != succeeded:
+                continue
+            start_time = _epoch_seconds(pb.invocation_timing.start_time)
+            end_time = _epoch_seconds(pb.invocation_timing.end_time)
+            if start_time is not None and end_time is not None:
+                self.add(_intern_target(pb.target), end_time - start_time, end_time)
+                recorded += 1
+        return recorded
+
+    def add_rows(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Records durations from exported action rows, e.g. csv.DictReader over the actions.csv written by CsvHistoryWriter.
+        Rows may come in any order, e.g. from several appended exports, the most recent ones by end_time are kept.
+        Returns:
+            int: The number of durations recorded.
+        """
+        recorded = 0
+        for row in rows:
+            if row["state"] != "SUCCEEDED" or row["duration_seconds"] in (None, ""):
+                continue
+            self.add((row["database"], row["schema"], row["name"]), float(row["duration_seconds"]), _row_seconds(row.get("end_time")))
+            recorded += 1
+        return recorded
+
+    @classmethod
+    def from_workflow_invocations(cls, tools: "DataformTools", repository_name: str, max_invocations: int = DEFAULT_HISTORY_INVOCATIONS, max_workers: int = 8, quantile: float = 0.5, max_samples: int = DEFAULT_MAX_SAMPLES) -> "DurationHistory":
+        """Collects action durations from the most recent finished workflow invocations of a repository.
+        Args:
+            tools (DataformTools): The client to use.
+            repository_name (str): The name of the repository.
+            max_invocations (int): The number of most recent finished invocations to read.
+            max_workers (int): The number of threads reading the actions of invocations concurrently.
+            quantile (float): Quantile of the samples used as the estimate.
+            max_samples (int): The number of most recent durations kept per target.
+        Returns:
+            DurationHistory: The collected durations.
+        """
+        history = cls(quantile, max_samples)
+        workflow_invocation_names = []
+        request = dataform_v1beta1.ListWorkflowInvocationsRequest(
+            parent=f"projects/{tools.gcp_project_id}/locations/{tools.gcp_location}/repositories/{repository_name}",
+            order_by="create_time desc",
+            page_size=100,
+        )
+        for page in tools._pages(READ, tools.client.list_workflow_invocations, request):
+            workflow_invocation_names.extend(invocation.name for invocation in page.workflow_invocations if invocation.state.name in TERMINAL_STATES)
+            if len(workflow_invocation_names) >= max_invocations:
+                break
+        del workflow_invocation_names[max_invocations:]
+
+        def read(workflow_invocation_name: str) -> List[Any]:
+            request = dataform_v1beta1.QueryWorkflowInvocationActionsRequest(name=workflow_invocation_name, page_size=1000)
+            return [action for page in tools._pages(READ, tools.client.query_workflow_invocation_actions, request) for action in type(page).pb(page).workflow_invocation_actions]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for actions in executor.map(read, workflow_invocation_names):
+                history.add_actions(actions)
+        logger.info(f"Collected durations of {len(history)} actions from {len(workflow_invocation_names)} workflow invocations of repository {repository_name}")
+        return history
+
+    def estimate(self, target: Any) -> Optional[float]:
+        """Returns the estimated duration of an action in seconds, or None if it has no history."""
+        samples = self.samples.get(target if isinstance(target, tuple) else target_key(target))
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(self.quantile * len(ordered)))]
+
+
+class ActionEstimate(TypedDict):
+    target: TargetKey
+    # WorkflowInvocationAction state name, None until the action was reported by update().
+    state: Optional[str]
+    estimated_seconds: float
+    remaining_seconds: float
+    # Seconds from now until the action is expected to finish.
+    finishes_in_seconds: float
+    # How much longer the action can take without delaying the ETA, 0 on the critical path.
+    slack_seconds: float
+    has_history: bool
+
+
+class RuntimePrediction(TypedDict):
+    eta: datetime
+    remaining_seconds: float
+    # Change of the ETA since the first prediction, positive when the run is slipping.
+    slip_seconds: float
+    # Unfinished actions that determine the ETA, in execution order.
+    critical_path: List[TargetKey]
+    # Unfinished critical actions, longest remaining first.
+    bottlenecks: List[ActionEstimate]
+    total: int
+    finished: int
+    running: int
+    # Actions without history that use the fallback duration.
+    without_history: int
+
+
+class RuntimePredictor():
+    def __init__(self, graph: CompiledGraph, history: DurationHistory, node_ids: Optional[Iterable[int]] = None, default_seconds: Optional[float] = None):
+        """Predicts when a workflow invocation finishes from its dependency graph and historical action durations.
+
+        Every action is assumed to start as soon as its dependencies finished and to take its historical
+        duration, so the ETA is the longest path through the unfinished actions. Feed the actions of the
+        running invocation to update() and call predict() again to move the ETA as actions complete.
+        Args:
+            graph (CompiledGraph): The graph of the compilation result that is invoked.
+            history (DurationHistory): Durations of previous runs.
+            node_ids (Iterable[int]|None): Ids of the actions the invocation executes. Defaults to every executable action.
+            default_seconds (float|None): Duration of actions without history. Defaults to the median estimate of the actions with history.
+        """
+        self.graph = graph
+        self.history = history
+        if node_ids is None:
+            node_ids = [node_id for node_id in range(len(graph)) if is_executable(graph, node_id)]
+        self.node_ids = sorted(node_ids)
+        self._selected = bytearray(len(graph))
+        for node_id in self.node_ids:
+            self._selected[node_id] = 1
+        self._order = [node_id for layer in graph.layers(self.node_ids) for node_id in layer]
+
+        estimates: Dict[int, Optional[float]] = {node_id: history.estimate(graph.targets[node_id]) for node_id in self.node_ids}
+        known = sorted(seconds for seconds in estimates.values() if seconds is not None)
+        if default_seconds is None:
+            default_seconds = known[len(known) // 2] if known else DEFAULT_ACTION_SECONDS
+        self.default_seconds = default_seconds
+        self._has_history = {node_id for node_id, seconds in estimates.items() if seconds is not None}
+        self._estimates = {node_id: default_seconds if seconds is None else seconds for node_id, seconds in estimates.items()}
+        self._states: Dict[int, str] = {}
+        self._started_at: Dict[int, float] = {}
+        self._baseline_eta: Optional[float] = None
+
+    @classmethod
+    def from_plan(cls, plan: InvocationPlan, history: DurationHistory, default_seconds: Optional[float] = None) -> "RuntimePredictor":
+        """Predicts the runtime of the actions selected by an InvocationPlan."""
+        return cls(plan.graph, history, plan.node_ids, default_seconds)
+
+    def update(self, actions: Iterable[Any]) -> int:
+        """Applies the states and start times of the actions of the running workflow invocation.
+        Args:
+            actions (Iterable[WorkflowInvocationAction]): Proto-plus or raw protobuf actions, e.g. from iter_workflow_invocation_actions.
+        Returns:
+            int: The number of actions whose state changed.
+        """
+        action_states = _action_states()
+        changed = 0
+        for action in actions:
+            pb = _raw_invocation_action(action)
+            node_id = self.graph.get_node_id(target_key(pb.target))
+            if node_id is None or not self._selected[node_id]:
+                continue
+            state = action_states.get(pb.state, "STATE_UNSPECIFIED")
+            if self._states.get(node_id) != state:
+                self._states[node_id] = state
+                changed += 1
+            start_time = _epoch_seconds(pb.invocation_timing.start_time)
+            if start_time is not None:
+                self._started_at[node_id] = start_time
+        return changed
+
+    def _schedule(self, now: float) -> Tuple[Dict[int, float], Dict[int, float], Dict[int, float]]:
+        """Returns the remaining seconds, expected finish and latest finish (in seconds from now) of every selected action."""
+        graph = self.graph
+        selected = self._selected
+        remaining: Dict[int, float] = {}
+        finishes_in: Dict[int, float] = {}
+        for node_id in self._order:
+            state = self._states.get(node_id)
+            if state in FINISHED_ACTION_STATES:
+                remaining[node_id] = 0.0
+            elif state == "RUNNING" and node_id in self._started_at:
+                # an action running over its estimate is assumed to finish any moment, the ETA then slips as time passes
+                remaining[node_id] = max(0.0, self._estimates[node_id] - (now - self._started_at[node_id]))
+            else:
+                remaining[node_id] = self._estimates[node_id]
+            ready_in = max((finishes_in[dependency_id] for dependency_id in graph.dependency_ids(node_id) if selected[dependency_id]), default=0.0)
+            finishes_in[node_id] = ready_in + remaining[node_id]
+        total_seconds = max(finishes_in.values(), default=0.0)
+
+        # backward pass: the latest each action can finish without delaying the end of the run
+        latest_finish: Dict[int, float] = {}
+        for node_id in reversed(self._order):
+            latest_finish[node_id] = min((latest_finish[dependent_id] - remaining[dependent_id] for dependent_id in graph.dependent_ids(node_id) if selected[dependent_id]), default=total_seconds)
+        return remaining, finishes_in, latest_finish
+
+    def predict(self, now: Optional[float] = None, bottlenecks: int = DEFAULT_BOTTLENECKS) -> RuntimePrediction:
+        """Computes the ETA, critical path and bottlenecks given the states applied so far.
+        Args:
+            now (float|None): Current time as a Unix timestamp. Defaults to time.time().
+            bottlenecks (int): The number of bottleneck actions to return.
+        Returns:
+            RuntimePrediction: The prediction.
+        """
+        if now is None:
+            now = time.time()
+        graph = self.graph
+        remaining, finishes_in, latest_finish = self._schedule(now)
+        total_seconds = max(finishes_in.values(), default=0.0)
+
+        critical_path: List[TargetKey] = []
+        node_id = max(finishes_in, key=finishes_in.__getitem__) if finishes_in else None
+        while node_id is not None and remaining[node_id] > 0:
+            critical_path.append(graph.targets[node_id])
+            dependency_ids = [dependency_id for dependency_id in graph.dependency_ids(node_id) if self._selected[dependency_id]]
+            node_id = max(dependency_ids, key=finishes_in.__getitem__) if dependency_ids else None
+        critical_path.reverse()
+
+        critical = [node_id for node_id in self._order if remaining[node_id] > 0 and latest_finish[node_id] - finishes_in[node_id] < 1e-6]
+        critical.sort(key=lambda node_id: -remaining[node_id])
+
+        eta = now + total_seconds
+        if self._baseline_eta is None:
+            self._baseline_eta = eta
+        states = list(self._states.values())
+        return {
+            "eta": datetime.fromtimestamp(eta, tz=timezone.utc),
+            "remaining_seconds": total_seconds,
+            "slip_seconds": eta - self._baseline_eta,
+            "critical_path": critical_path,
+            "bottlenecks": [self._action_estimate(node_id, remaining, finishes_in, latest_finish) for node_id in critical[:bottlenecks]],
+            "total": len(self.node_ids),
+            "finished": sum(1 for state in states if state in FINISHED_ACTION_STATES),
+            "running": states.count("RUNNING"),
+            "without_history": len(self.node_ids) - len(self._has_history),
+        }
+
+    def _action_estimate(self, node_id: int, remaining: Dict[int, float], finishes_in: Dict[int, float], latest_finish: Dict[int, float]) -> ActionEstimate:
+        return {
+            "target": self.graph.targets[node_id],
+            "state": self._states.get(node_id),
+            "estimated_seconds": self._estimates[node_id],
+            "remaining_seconds": remaining[node_id],
+            "finishes_in_seconds": finishes_in[node_id],
+            "slack_seconds": max(0.0, latest_finish[node_id] - finishes_in[node_id]),
+            "has_history": node_id in self._has_history,
+        }
+
+    def estimates(self, now: Optional[float] = None) -> List[ActionEstimate]:
+        """Returns the estimate of every unfinished action in execution order.
+        Args:
+            now (float|None): Current time as a Unix timestamp. Defaults to time.time().
+        """
+        remaining, finishes_in, latest_finish = self._schedule(time.time() if now is None else now)
+        return [self._action_estimate(node_id, remaining, finishes_in, latest_finish) for node_id in self._order if remaining[node_id] > 0]
+
+    def follow(self, tools: "DataformTools", repository_name: str, workflow_invocation_id: str, poll_interval: float = 10.0, bottlenecks: int = DEFAULT_BOTTLENECKS) -> Iterator[RuntimePrediction]:
+        """Polls a running workflow invocation and yields a fresh prediction after every poll, until the invocation finished.
+        Args:
+            tools (DataformTools): The client to use.
+            repository_name (str): The name of the repository.
+            workflow_invocation_id (str): The ID of the workflow invocation.
+            poll_interval (float): Seconds between polls.
+            bottlenecks (int): The number of bottleneck actions per prediction.
+        Returns:
+            Iterator[RuntimePrediction]: One prediction per poll, the last one after the invocation reached a terminal state.
+        """
+        while True:
+            invocation = tools.get_workflow_invocation(repository_name, workflow_invocation_id)
+            self.update(tools.iter_workflow_invocation_actions(repository_name, workflow_invocation_id, page_size=1000))
+            yield self.predict(bottlenecks=bottlenecks)
+            if invocation.state.name in TERMINAL_STATES:
+                return
+            time.sleep(poll_interval)
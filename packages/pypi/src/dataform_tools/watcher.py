@@ -0,0 +1,267 @@
+import asyncio
+import heapq
+import inspect
+import logging
+import random
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+from typing_extensions import TypedDict
+
+from ._lazy import exceptions
+from .actions import TERMINAL_STATES
+from .policies import CircuitOpenError
+
+if TYPE_CHECKING:
+    from google.cloud.dataform_v1beta1.types import WorkflowInvocation
+    from .async_dataform_tools import AsyncDataformTools
+
+
+logger = logging.getLogger(__name__)
+
+# (repository_name, workflow_invocation_id)
+InvocationKey = Tuple[str, str]
+
+
+class WorkflowEvent(TypedDict):
+    repository_name: str
+    workflow_invocation_id: str
+    previous_state: Optional[str]
+    state: str
+    workflow_invocation: "WorkflowInvocation"
+
+
+def parse_workflow_invocation_name(name: str) -> InvocationKey:
+    """Splits projects/{project}/locations/{location}/repositories/{repository}/workflowInvocations/{id} into (repository, id)."""
+    parts = name.split("/")
+    if len(parts) != 8 or parts[4] != "repositories" or parts[6] != "workflowInvocations":
+        raise ValueError(f"Not a workflow invocation name: {name}")
+    return parts[5], parts[7]
+
+
+class _Watch():
+    __slots__ = ("key", "state", "interval", "done", "invocation")
+
+    def __init__(self, key: InvocationKey, interval: float, done: "asyncio.Future[WorkflowInvocation]"):
+        self.key = key
+        self.state: Optional[str] = None
+        self.interval = interval
+        self.done = done
+        self.invocation: Optional["WorkflowInvocation"] = None
+
+
+class WorkflowWatcher():
+    def __init__(self, tools: "AsyncDataformTools", min_interval: float = 2.0, max_interval: float = 60.0, multiplier: float = 1.5, jitter: float = 0.2, on_change: Optional[Callable[[WorkflowEvent], Any]] = None):
+        """Tracks the state of many workflow invocations with a single polling loop.
+
+        Each invocation is polled on its own jittered exponential backoff: the interval grows by
+        multiplier while the state is unchanged and drops back to min_interval whenever it changes or
+        the invocation is cancelling. Invocations that are due at the same time are fetched together
+        in one batch, and concurrent requests for the same invocation share a single RPC.
+        Args:
+            tools (AsyncDataformTools): The client used to fetch invocations. Its max_concurrency bounds each batch.
+            min_interval (float): Seconds between polls right after a state change.
+            max_interval (float): Upper bound on the seconds between polls.
+            multiplier (float): Factor the interval grows by after each unchanged poll.
+            jitter (float): Relative random spread applied to every interval, e.g. 0.2 for +/-20%.
+            on_change (Callable[[WorkflowEvent], Any]|None): Called (or awaited, if a coroutine function) on every state change.
+        """
+        if min_interval <= 0 or max_interval < min_interval:
+            raise ValueError("Expected 0 < min_interval <= max_interval.")
+        self.tools = tools
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.on_change = on_change
+        self.polls = 0
+        self._watches: Dict[InvocationKey, _Watch] = {}
+        self._schedule: List[Tuple[float, InvocationKey]] = []
+        self._in_flight: Dict[InvocationKey, "asyncio.Future[WorkflowInvocation]"] = {}
+        self._subscribers: Set["asyncio.Queue[Optional[WorkflowEvent]]"] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    def watch(self, repository_name: str, workflow_invocation_id: str) -> "asyncio.Future[WorkflowInvocation]":
+        """Starts tracking an invocation. Watching an invocation that is already tracked is a no-op.
+        Args:
+            repository_name (str): The name of the repository.
+            workflow_invocation_id (str): The ID of the workflow invocation.
+        Returns:
+            asyncio.Future[WorkflowInvocation]: Resolves with the invocation once it reaches a terminal state. Fails with the
+            error of a poll that is not transient, e.g. NotFound or PermissionDenied.
+        """
+        key = (repository_name, workflow_invocation_id)
+        existing = self._watches.get(key)
+        if existing is not None:
+            return existing.done
+        watch = _Watch(key, self.min_interval, asyncio.get_running_loop().create_future())
+        self._watches[key] = watch
+        heapq.heappush(self._schedule, (time.monotonic(), key))
+        self._ensure_running()
+        return watch.done
+
+    def watch_invocation(self, workflow_invocation: "WorkflowInvocation") -> "asyncio.Future[WorkflowInvocation]":
+        """Starts tracking an invocation returned by create_workflow_invocation."""
+        return self.watch(*parse_workflow_invocation_name(workflow_invocation.name))
+
+    def state(self, repository_name: str, workflow_invocation_id: str) -> Optional[str]:
+        """Returns the last observed state name of a tracked invocation, None before the first poll."""
+        watch = self._watches.get((repository_name, workflow_invocation_id))
+        return watch.state if watch is not None else None
+
+    async def refresh(self, repository_name: str, workflow_invocation_id: str) -> "WorkflowInvocation":
+        """Fetches an invocation now. Concurrent refreshes of the same invocation share one RPC."""
+        return await self._fetch((repository_name, workflow_invocation_id))
+
+    async def wait_all(self, timeout: Optional[float] = None) -> Dict[InvocationKey, "WorkflowInvocation"]:
+        """Waits until every tracked invocation reaches a terminal state.
+        Args:
+            timeout (float|None): Seconds to wait before raising asyncio.TimeoutError.
+        Returns:
+            Dict[InvocationKey, WorkflowInvocation]: Final invocation per (repository_name, workflow_invocation_id).
+        """
+        watches = list(self._watches.values())
+        await asyncio.wait_for(asyncio.gather(*(asyncio.shield(watch.done) for watch in watches)), timeout)
+        return {watch.key: watch.done.result() for watch in watches}
+
+    async def wait_any(self, timeout: Optional[float] = None) -> Tuple[InvocationKey, "WorkflowInvocation"]:
+        """Waits until any tracked invocation that has not finished yet reaches a terminal state.
+        Args:
+            timeout (float|None): Seconds to wait before raising asyncio.TimeoutError.
+        Returns:
+            Tuple[InvocationKey, WorkflowInvocation]: The key and final invocation that finished first.
+        """
+        pending = {watch.done: watch.key for watch in self._watches.values() if not watch.done.done()}
+        if not pending:
+            raise ValueError("No unfinished workflow invocations are being watched.")
+        done, _ = await asyncio.wait(pending.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        if not done:
+            raise asyncio.TimeoutError()
+        finished = done.pop()
+        return pending[finished], finished.result()
+
+    async def events(self) -> AsyncIterator[WorkflowEvent]:
+        """Yields every state change until all tracked invocations reached a terminal state."""
+        queue: "asyncio.Queue[Optional[WorkflowEvent]]" = asyncio.Queue()
+        self._subscribers.add(queue)
+        try:
+            if self._all_done():
+                return
+            while True:
+                event = await queue.get()
+                if event is None:
+                    return
+                yield event
+        finally:
+            self._subscribers.discard(queue)
+
+    async def close(self) -> None:
+        """Stops polling. Unfinished waiters are cancelled."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for watch in self._watches.values():
+            if not watch.done.done():
+                watch.done.cancel()
+        self._notify(None)
+
+    def _all_done(self) -> bool:
+        return all(watch.done.done() for watch in self._watches.values())
+
+    def _ensure_running(self) -> None:
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        self._wakeup.set()
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def _next_interval(self, interval: float) -> float:
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def _fetch(self, key: InvocationKey) -> "WorkflowInvocation":
+        in_flight = self._in_flight.get(key)
+        if in_flight is None:
+            in_flight = asyncio.ensure_future(self.tools.get_workflow_invocation(*key))
+            self._in_flight[key] = in_flight
+            in_flight.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(in_flight)
+
+    async def _poll(self, watch: _Watch) -> None:
+        self.polls += 1
+        try:
+            invocation = await self._fetch(watch.key)
+        except exceptions.NotFound as e:
+            logger.error(f"Workflow invocation {watch.key[1]} in repository {watch.key[0]} not found")
+            watch.done.set_exception(e)
+            return
+        except Exception as e:
+            # only transient errors can go away by polling again, anything else (e.g. PermissionDenied) fails the watch
+            if not isinstance(e, (exceptions.ServiceUnavailable, exceptions.DeadlineExceeded, exceptions.ResourceExhausted, CircuitOpenError)):
+                logger.error(f"Failed to poll workflow invocation {watch.key[1]} in repository {watch.key[0]}: {e}")
+                if not watch.done.done():
+                    watch.done.set_exception(e)
+                return
+            watch.interval = min(self.max_interval, watch.interval * self.multiplier)
+            logger.warning(f"Failed to poll workflow invocation {watch.key[1]}, retrying in ~{watch.interval:.0f}s: {e}")
+            return
+
+        state = invocation.state.name
+        previous_state = watch.state
+        watch.invocation = invocation
+        if state != previous_state:
+            watch.state = state
+            watch.interval = self.min_interval
+            await self._emit({
+                "repository_name": watch.key[0],
+                "workflow_invocation_id": watch.key[1],
+                "previous_state": previous_state,
+                "state": state,
+                "workflow_invocation": invocation,
+            })
+        elif state == "CANCELING":
+            watch.interval = self.min_interval
+        else:
+            watch.interval = min(self.max_interval, watch.interval * self.multiplier)
+        if state in TERMINAL_STATES and not watch.done.done():
+            watch.done.set_result(invocation)
+
+    async def _emit(self, event: WorkflowEvent) -> None:
+        if self.on_change is not None:
+            try:
+                result = self.on_change(event)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.error(f"on_change callback failed for workflow invocation {event['workflow_invocation_id']}: {e}")
+        self._notify(event)
+
+    def _notify(self, event: Optional[WorkflowEvent]) -> None:
+        for queue in self._subscribers:
+            queue.put_nowait(event)
+
+    async def _run(self) -> None:
+        assert self._wakeup is not None
+        while self._schedule:
+            now = time.monotonic()
+            due: List[_Watch] = []
+            while self._schedule and self._schedule[0][0] <= now:
+                _, key = heapq.heappop(self._schedule)
+                due.append(self._watches[key])
+            if due:
+                await asyncio.gather(*(self._poll(watch) for watch in due))
+                now = time.monotonic()
+                for watch in due:
+                    if not watch.done.done():
+                        heapq.heappush(self._schedule, (now + self._next_interval(watch.interval), watch.key))
+                if self._all_done():
+                    self._notify(None)
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._schedule[0][0] - now)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,351 @@
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional
+from typing_extensions import TypedDict
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+if TYPE_CHECKING:
+    from .dataform_tools import DataformTools
+
+
+logger = logging.getLogger(__name__)
+
+POOL_STATE_VERSION = 1
+DEFAULT_POOL_SIZE = 4
+DEFAULT_LEASE_SECONDS = 3600.0
+DEFAULT_IDLE_SECONDS = 24 * 3600.0
+
+IDLE = "idle"
+LEASED = "leased"
+
+
+class WorkspacePoolExhaustedError(RuntimeError):
+    """Raised when every workspace of a full pool stays leased until the lease wait timed out."""
+
+
+class PooledWorkspace(TypedDict):
+    status: str
+    created_at: float
+    # Created and npm packages installed.
+    prepared: bool
+    # Holds changes of a previous lease (reset failed, or the lease expired) and is reset before the next lease.
+    dirty: bool
+    idle_since: Optional[float]
+    lease_id: Optional[str]
+    owner: Optional[str]
+    expires_at: Optional[float]
+
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    """Exclusive lock held by the process, released by the OS if the process dies."""
+    with open(path, "a+") as f:
+        if sys.platform == "win32":
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if sys.platform == "win32":
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class WorkspaceLease():
+    def __init__(self, pool: "WorkspacePool", workspace_name: str, lease_id: str, expires_at: float):
+        """A workspace leased from a WorkspacePool. Use it as a context manager to return it when done."""
+        self.pool = pool
+        self.workspace_name = workspace_name
+        self.lease_id = lease_id
+        self.expires_at = expires_at
+        self.released = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self.released:
+            self.pool.release(self)
+
+    def renew(self, lease_seconds: Optional[float] = None) -> None:
+        """Extends the lease, e.g. from a long running job before it expires."""
+        self.pool.renew(self, lease_seconds)
+
+    def __repr__(self) -> str:
+        return f"WorkspaceLease(workspace_name={self.workspace_name!r}, lease_id={self.lease_id!r})"
+
+
+class WorkspacePool():
+    def __init__(self, tools: "DataformTools", repository_name: str, state_path: str, size: int = DEFAULT_POOL_SIZE, prefix: str = "pool-", lease_seconds: float = DEFAULT_LEASE_SECONDS, idle_seconds: float = DEFAULT_IDLE_SECONDS, install_npm_packages: bool = True, max_workers: int = DEFAULT_POOL_SIZE):
+        """Keeps created, npm installed workspaces of a repository ready to be leased by CI jobs.
+
+        Pool membership and leases live in a JSON state file that every process sharing the pool
+        updates under an exclusive file lock. A job that crashes without releasing its workspace
+        keeps it only until the lease expires; the next lease() reclaims it and resets its changes
+        before handing it out again. reset_workspace_changes only discards uncommitted changes, so
+        jobs should not commit in pooled workspaces.
+        Args:
+            tools (DataformTools): The client to use.
+            repository_name (str): The name of the repository.
+            state_path (str): JSON file holding the pool state, with a .lock file next to it.
+            size (int): The maximum number of workspaces in the pool.
+            prefix (str): Prefix of the names of pooled workspaces.
+            lease_seconds (float): How long a lease lasts unless renewed.
+            idle_seconds (float): How long a workspace may stay unused before expire_idle() deletes it.
+            install_npm_packages (bool): Whether to install npm packages in new workspaces.
+            max_workers (int): The number of workspaces warm() prepares concurrently.
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1.")
+        self.tools = tools
+        self.repository_name = repository_name
+        self.state_path = state_path
+        self.size = size
+        self.prefix = prefix
+        self.lease_seconds = lease_seconds
+        self.idle_seconds = idle_seconds
+        self.install_npm_packages = install_npm_packages
+        self.max_workers = max_workers
+
+    def _load(self) -> Dict[str, PooledWorkspace]:
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path) as f:
+            state = json.load(f)
+        if state.get("version") != POOL_STATE_VERSION or state.get("repository") != self.repository_name:
+            raise ValueError(f"{self.state_path} is not a workspace pool state of repository {self.repository_name}")
+        return state["workspaces"]
+
+    def _save(self, workspaces: Dict[str, PooledWorkspace]) -> None:
+        directory = os.path.dirname(os.path.abspath(self.state_path))
+        fd, temporary_path = tempfile.mkstemp(prefix=".pool-", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"version": POOL_STATE_VERSION, "repository": self.repository_name, "workspaces": workspaces}, f, sort_keys=True)
+            os.replace(temporary_path, self.state_path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+        with _file_lock(self.state_path + ".lock"):
+            yield
+
+    @contextmanager
+    def _transaction(self) -> Iterator[Dict[str, PooledWorkspace]]:
+        """Yields the pool state under the file lock and saves it when the block completes."""
+        with self._locked():
+            workspaces = self._load()
+            yield workspaces
+            self._save(workspaces)
+
+    def workspaces(self) -> Dict[str, PooledWorkspace]:
+        """Returns a snapshot of the pooled workspaces by name."""
+        with self._locked():
+            return self._load()
+
+    @staticmethod
+    def _reclaim_expired(workspaces: Dict[str, PooledWorkspace], now: float) -> None:
+        for workspace_name, workspace in workspaces.items():
+            if workspace["status"] == LEASED and workspace["expires_at"] is not None and workspace["expires_at"] < now:
+                logger.warning(f"Lease of workspace {workspace_name} held by {workspace['owner']} expired, reclaiming it")
+                workspace.update(status=IDLE, dirty=True, idle_since=now, lease_id=None, owner=None, expires_at=None)
+
+    def _add(self, workspaces: Dict[str, PooledWorkspace], now: float) -> str:
+        workspace_name = f"{self.prefix}{uuid.uuid4().hex[:12]}"
+        workspaces[workspace_name] = {"status": IDLE, "created_at": now, "prepared": False, "dirty": False, "idle_since": now, "lease_id": None, "owner": None, "expires_at": None}
+        return workspace_name
+
+    def _mark_leased(self, workspaces: Dict[str, PooledWorkspace], workspace_name: str, owner: Optional[str], now: float) -> None:
+        workspaces[workspace_name].update(status=LEASED, lease_id=uuid.uuid4().hex, owner=owner, expires_at=now + self.lease_seconds, idle_since=None)
+
+    def _take(self, workspaces: Dict[str, PooledWorkspace], owner: Optional[str], now: float) -> Optional[str]:
+        """Leases the best idle workspace, or a new one while the pool is below size. Must run in a transaction."""
+        idle = [name for name, workspace in workspaces.items() if workspace["status"] == IDLE]
+        # ready workspaces first, then dirty ones (a reset), then unprepared ones (create and npm install)
+        idle.sort(key=lambda name: (not workspaces[name]["prepared"], workspaces[name]["dirty"], -(workspaces[name]["idle_since"] or 0)))
+        if idle:
+            workspace_name = idle[0]
+        elif len(workspaces) < self.size:
+            workspace_name = self._add(workspaces, now)
+        else:
+            return None
+        self._mark_leased(workspaces, workspace_name, owner, now)
+        return workspace_name
+
+    def _prepare(self, workspace_name: str, workspace: PooledWorkspace) -> None:
+        if not workspace["prepared"]:
+            self.tools.create_workspace(self.repository_name, workspace_name)
+            if self.install_npm_packages:
+                self.tools.install_npm_pacakages(self.repository_name, workspace_name)
+            logger.info(f"Prepared pooled workspace {workspace_name}")
+        elif workspace["dirty"]:
+            self.tools.reset_workspace_changes(self.repository_name, workspace_name, clean=True)
+
+    def _lease_prepared(self, workspace_name: str, owner: Optional[str]) -> WorkspaceLease:
+        """Prepares a workspace leased in a transaction and returns its lease, giving the slot back if preparing fails."""
+        with self._transaction() as workspaces:
+            workspace = workspaces[workspace_name].copy()
+        lease_id = workspace["lease_id"]
+        try:
+            self._prepare(workspace_name, workspace)
+        except Exception:
+            with self._transaction() as workspaces:
+                if workspace_name in workspaces and workspaces[workspace_name]["lease_id"] == lease_id:
+                    workspaces[workspace_name].update(status=IDLE, dirty=True, idle_since=time.time(), lease_id=None, owner=None, expires_at=None)
+            raise
+        with self._transaction() as workspaces:
+            current = workspaces.get(workspace_name)
+            expires_at = current["expires_at"] if current is not None else None
+            if current is None or lease_id is None or expires_at is None or current["lease_id"] != lease_id:
+                raise ValueError(f"Lease of workspace {workspace_name} expired while it was prepared, increase lease_seconds")
+            current.update(prepared=True, dirty=False)
+        return WorkspaceLease(self, workspace_name, lease_id, expires_at)
+
+    def lease(self, owner: Optional[str] = None, wait_seconds: float = 0.0, poll_interval: float = 5.0) -> WorkspaceLease:
+        """Leases a ready workspace. Creates one when none is idle and the pool is below size.
+        Args:
+            owner (str|None): Who holds the lease, e.g. a CI job URL, for logs and the state file.
+            wait_seconds (float): How long to wait for a workspace to be released when the pool is full.
+            poll_interval (float): Seconds between checks while waiting.
+        Returns:
+            WorkspaceLease: The lease, release it (or use it as a context manager) when done.
+        Raises:
+            WorkspacePoolExhaustedError: If every workspace stayed leased for wait_seconds.
+        """
+        deadline = time.monotonic() + wait_seconds
+        while True:
+            with self._transaction() as workspaces:
+                now = time.time()
+                self._reclaim_expired(workspaces, now)
+                workspace_name = self._take(workspaces, owner, now)
+            if workspace_name is not None:
+                break
+            if time.monotonic() + poll_interval > deadline:
+                raise WorkspacePoolExhaustedError(f"All {self.size} workspaces of the pool of repository {self.repository_name} are leased")
+            time.sleep(poll_interval)
+        lease = self._lease_prepared(workspace_name, owner)
+        logger.info(f"Leased workspace {workspace_name} to {owner}")
+        return lease
+
+    def renew(self, lease: WorkspaceLease, lease_seconds: Optional[float] = None) -> None:
+        """Extends a lease by lease_seconds (defaults to the pool's) from now.
+        Raises:
+            ValueError: If the lease expired and the workspace was reclaimed.
+        """
+        with self._transaction() as workspaces:
+            workspace = workspaces.get(lease.workspace_name)
+            if workspace is None or workspace["lease_id"] != lease.lease_id:
+                raise ValueError(f"Lease of workspace {lease.workspace_name} is no longer held")
+            workspace["expires_at"] = lease.expires_at = time.time() + (self.lease_seconds if lease_seconds is None else lease_seconds)
+
+    def release(self, lease: WorkspaceLease, reset: bool = True) -> None:
+        """Resets a leased workspace and returns it to the pool.
+        Args:
+            lease (WorkspaceLease): The lease to release.
+            reset (bool): Discard uncommitted changes now. Without it the next lease resets the workspace.
+        """
+        clean = False
+        if reset:
+            try:
+                # extends the lease under the lock, so it cannot expire and be handed to another job during the reset
+                self.renew(lease)
+            except ValueError:
+                # reclaimed after expiry, possibly leased again: it must not be reset under its new holder
+                lease.released = True
+                logger.warning(f"Lease of workspace {lease.workspace_name} expired before it was released")
+                return
+            try:
+                self.tools.reset_workspace_changes(self.repository_name, lease.workspace_name, clean=True)
+                clean = True
+            except Exception as e:
+                logger.warning(f"Failed to reset pooled workspace {lease.workspace_name}, it is reset before its next lease: {e}")
+        if self._return(lease, dirty=not clean):
+            logger.info(f"Released workspace {lease.workspace_name}")
+
+    def _return(self, lease: WorkspaceLease, dirty: bool) -> bool:
+        lease.released = True
+        with self._transaction() as workspaces:
+            workspace = workspaces.get(lease.workspace_name)
+            if workspace is None or workspace["lease_id"] != lease.lease_id:
+                logger.warning(f"Lease of workspace {lease.workspace_name} expired before it was released")
+                return False
+            workspace.update(status=IDLE, dirty=dirty, idle_since=time.time(), lease_id=None, owner=None, expires_at=None)
+        return True
+
+    def warm(self, count: Optional[int] = None) -> List[str]:
+        """Creates and npm installs workspaces concurrently until count (default size) idle workspaces are ready.
+        Returns:
+            List[str]: The names of the workspaces that were prepared.
+        """
+        count = self.size if count is None else min(count, self.size)
+        self.expire_idle()
+        with self._transaction() as workspaces:
+            now = time.time()
+            self._reclaim_expired(workspaces, now)
+            ready = sum(1 for workspace in workspaces.values() if workspace["status"] == IDLE and workspace["prepared"] and not workspace["dirty"])
+            unready = [name for name, workspace in workspaces.items() if workspace["status"] == IDLE and (not workspace["prepared"] or workspace["dirty"])]
+            to_prepare = []
+            for _ in range(count - ready):
+                if unready:
+                    workspace_name = unready.pop()
+                elif len(workspaces) < self.size:
+                    workspace_name = self._add(workspaces, now)
+                else:
+                    break
+                # leased while they are prepared, so no job gets a half installed workspace
+                self._mark_leased(workspaces, workspace_name, "warm", now)
+                to_prepare.append(workspace_name)
+        if not to_prepare:
+            return []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            leases = list(executor.map(lambda workspace_name: self._lease_prepared(workspace_name, "warm"), to_prepare))
+        for lease in leases:
+            self._return(lease, dirty=False)
+        return to_prepare
+
+    def expire_idle(self) -> List[str]:
+        """Deletes workspaces that were idle for longer than idle_seconds.
+        Returns:
+            List[str]: The names of the deleted workspaces.
+        """
+        with self._transaction() as workspaces:
+            now = time.time()
+            expired = [name for name, workspace in workspaces.items() if workspace["status"] == IDLE and now - (workspace["idle_since"] or now) > self.idle_seconds]
+            for workspace_name in expired:
+                del workspaces[workspace_name]
+        # delete_workspace ignores workspaces that were never created
+        for workspace_name in expired:
+            self.tools.delete_workspace(self.repository_name, workspace_name)
+        if expired:
+            logger.info(f"Deleted {len(expired)} idle pooled workspaces")
+        return expired
+
+    def drain(self) -> List[str]:
+        """Deletes every idle workspace of the pool, e.g. when retiring it. Leased workspaces are left alone.
+        Returns:
+            List[str]: The names of the deleted workspaces.
+        """
+        with self._transaction() as workspaces:
+            drained = [name for name, workspace in workspaces.items() if workspace["status"] == IDLE]
+            for workspace_name in drained:
+                del workspaces[workspace_name]
+        for workspace_name in drained:
+            self.tools.delete_workspace(self.repository_name, workspace_name)
+        return drained
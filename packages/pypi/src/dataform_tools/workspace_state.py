@@ -0,0 +1,253 @@
+import json
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Set, Tuple
+from typing_extensions import TypedDict
+
+from ._lazy import exceptions
+from .workspace_sync import DEFAULT_SYNC_EXCLUDES, DEFAULT_SYNC_WORKERS, content_hash, is_excluded, list_local_files, list_workspace_files
+
+if TYPE_CHECKING:
+    from .dataform_tools import DataformTools
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+class FileState(TypedDict):
+    hash: str
+    size: int
+    # Last known uncommitted change state (ADDED, MODIFIED, HAS_CONFLICTS), None when the file matches the workspace HEAD.
+    git_status: Optional[str]
+
+
+class WorkspaceChanges(TypedDict):
+    added: List[str]
+    modified: List[str]
+    removed: List[str]
+    # Files whose uncommitted change state changed, e.g. MODIFIED -> None after a commit or reset.
+    git_status_changed: List[str]
+    # Whether every file was listed and hashed, because there was no manifest yet or the commits may have moved.
+    full_scan: bool
+    commits_ahead: Optional[int]
+    commits_behind: Optional[int]
+    files_read: int
+    elapsed_seconds: float
+
+
+class WorkspaceState():
+    def __init__(self, tools: "DataformTools", repository_name: str, workspace_name: str, manifest_path: str, remote_branch: Optional[str] = None, max_workers: int = DEFAULT_SYNC_WORKERS, exclude: Sequence[str] = DEFAULT_SYNC_EXCLUDES):
+        """Tracks the files of a workspace in a local JSON manifest (path, sha256, size and git status).
+
+        refresh() compares the workspace's uncommitted file changes, the head commit of the repository and,
+        when remote_branch is set, the workspace's commits ahead/behind with the manifest and only reads files
+        whose state can have changed. Files are listed and hashed in full only for a new manifest, when the
+        head commit or the commit counts moved, or after a pull or reset made through tools, because only then
+        can files that are unchanged relative to HEAD have different contents.
+        Args:
+            tools (DataformTools): The client to use.
+            repository_name (str): The name of the repository.
+            workspace_name (str): The name of the workspace.
+            manifest_path (str): JSON file the manifest is loaded from and saved to.
+            remote_branch (str|None): Branch to compare commits against. Without it, commits pulled into the workspace by another client are only picked up once the repository's head commit moves, or by refresh(full=True).
+            max_workers (int): The number of threads used to list and read files concurrently.
+            exclude (Sequence[str]): Glob patterns of paths (or path components) that are not tracked.
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1.")
+        self.tools = tools
+        self.repository_name = repository_name
+        self.workspace_name = workspace_name
+        self.manifest_path = manifest_path
+        self.remote_branch = remote_branch
+        self.max_workers = max_workers
+        self.exclude = tuple(exclude)
+        self.files: Dict[str, FileState] = {}
+        # Paths deleted in the workspace but still in HEAD. A reset restores them without an uncommitted
+        # change left to report, so they are re-read on the next refresh.
+        self.deleted: Set[str] = set()
+        self.commits_ahead: Optional[int] = None
+        self.commits_behind: Optional[int] = None
+        self.head_commit: Optional[str] = None
+        self.refreshed_at: Optional[float] = None
+        # pulls and resets seen through tools, one made after this state was created forces a full scan
+        self._workspace_generation = self._current_workspace_generation()
+        self._load()
+
+    @property
+    def is_tracked(self) -> bool:
+        """Whether the manifest has been refreshed at least once."""
+        return self.refreshed_at is not None
+
+    @property
+    def needs_pull(self) -> bool:
+        return bool(self.commits_behind)
+
+    @property
+    def uncommitted_files(self) -> Dict[str, str]:
+        """Returns the last known uncommitted change state of every tracked file that differs from HEAD."""
+        return {path: state["git_status"] for path, state in self.files.items() if state["git_status"] is not None}
+
+    def _load(self) -> None:
+        if not os.path.exists(self.manifest_path):
+            return
+        with open(self.manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("repository") != self.repository_name or manifest.get("workspace") != self.workspace_name:
+            logger.warning(f"Ignoring manifest {self.manifest_path}, it does not belong to workspace {self.workspace_name} of repository {self.repository_name}")
+            return
+        self.files = manifest["files"]
+        self.deleted = set(manifest.get("deleted", []))
+        self.commits_ahead = manifest.get("commits_ahead")
+        self.commits_behind = manifest.get("commits_behind")
+        self.head_commit = manifest.get("head_commit")
+        self.refreshed_at = manifest.get("refreshed_at")
+
+    def save(self) -> None:
+        """Writes the manifest atomically, so an interrupted save never leaves a truncated file behind."""
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "repository": self.repository_name,
+            "workspace": self.workspace_name,
+            "remote_branch": self.remote_branch,
+            "commits_ahead": self.commits_ahead,
+            "commits_behind": self.commits_behind,
+            "head_commit": self.head_commit,
+            "refreshed_at": self.refreshed_at,
+            "files": self.files,
+            "deleted": sorted(self.deleted),
+        }
+        directory = os.path.dirname(os.path.abspath(self.manifest_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, temporary_path = tempfile.mkstemp(prefix=".manifest-", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(manifest, f, sort_keys=True)
+            os.replace(temporary_path, self.manifest_path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    def _fetch_git_statuses(self) -> Dict[str, str]:
+        response = self.tools.get_workspace_git_state(self.repository_name, self.workspace_name)
+        return {change.path: change.state.name for change in response.uncommitted_file_changes if not is_excluded(change.path, self.exclude)}
+
+    def _fetch_ahead_behind(self) -> Tuple[Optional[int], Optional[int]]:
+        if self.remote_branch is None:
+            return None, None
+        response = self.tools.fetch_git_ahead_behind(self.repository_name, self.workspace_name, self.remote_branch)
+        return response.commits_ahead, response.commits_behind
+
+    def _fetch_head_commit(self) -> Optional[str]:
+        commit = next(iter(self.tools.fetch_repository_history(self.repository_name, page_size=1)), None)
+        return commit.commit_sha if commit is not None else None
+
+    def _current_workspace_generation(self) -> int:
+        return self.tools._workspace_generations.get((self.repository_name, self.workspace_name), 0)
+
+    def _read_states(self, executor: ThreadPoolExecutor, paths: List[str], git_statuses: Dict[str, str]) -> Dict[str, Optional[FileState]]:
+        """Reads and hashes files. Files that no longer exist (e.g. an added file removed by a reset) map to None."""
+        def read(path: str) -> Optional[FileState]:
+            try:
+                contents = self.tools.read_file(self.repository_name, self.workspace_name, path)
+            except exceptions.NotFound:
+                return None
+            return {"hash": content_hash(contents), "size": len(contents), "git_status": git_statuses.get(path)}
+
+        return dict(zip(paths, executor.map(read, paths)))
+
+    def refresh(self, full: bool = False) -> WorkspaceChanges:
+        """Brings the manifest up to date with the workspace and saves it.
+        Args:
+            full (bool): List and hash every file even if the git state suggests only a few changed.
+        Returns:
+            WorkspaceChanges: The files added, modified and removed since the previous refresh.
+        """
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            statuses_future = executor.submit(self._fetch_git_statuses)
+            ahead_behind_future = executor.submit(self._fetch_ahead_behind)
+            head_commit_future = executor.submit(self._fetch_head_commit)
+            workspace_generation = self._current_workspace_generation()
+            git_statuses = statuses_future.result()
+            commits_ahead, commits_behind = ahead_behind_future.result()
+            head_commit = head_commit_future.result()
+
+            # counts of 0/0 before and after do not prove HEAD stayed put, a pull or a moved head commit can change files without leaving an uncommitted change
+            full_scan = (
+                full
+                or not self.is_tracked
+                or head_commit != self.head_commit
+                or workspace_generation != self._workspace_generation
+                or (self.remote_branch is not None and (commits_ahead, commits_behind) != (self.commits_ahead, self.commits_behind))
+            )
+            if full_scan:
+                workspace_files = list_workspace_files(self.tools, self.repository_name, self.workspace_name, executor, self.exclude)
+                to_read = sorted(workspace_files)
+                gone = set(self.files) - workspace_files
+            else:
+                # Files without uncommitted changes before and after still match HEAD, which did not move. Anything
+                # with an uncommitted change now, or whose state changed (including deleted files), may have new contents.
+                candidates = set(git_statuses) | {path for path, state in self.files.items() if state["git_status"] is not None} | self.deleted
+                to_read = sorted(path for path in candidates if git_statuses.get(path) != "DELETED")
+                gone = {path for path, status in git_statuses.items() if status == "DELETED"}
+            read_states = self._read_states(executor, to_read, git_statuses)
+        new_states = {path: state for path, state in read_states.items() if state is not None}
+        gone.update(path for path, state in read_states.items() if state is None)
+
+        changes: WorkspaceChanges = {
+            "added": [],
+            "modified": [],
+            "removed": sorted(path for path in gone if path in self.files),
+            "git_status_changed": [],
+            "full_scan": full_scan,
+            "commits_ahead": commits_ahead,
+            "commits_behind": commits_behind,
+            "files_read": len(to_read),
+            "elapsed_seconds": 0.0,
+        }
+        for path, state in new_states.items():
+            previous = self.files.get(path)
+            if previous is None:
+                changes["added"].append(path)
+            elif previous["hash"] != state["hash"]:
+                changes["modified"].append(path)
+            if previous is not None and previous["git_status"] != state["git_status"]:
+                changes["git_status_changed"].append(path)
+        for path in gone:
+            self.files.pop(path, None)
+        self.files.update(new_states)
+        self.deleted = {path for path, status in git_statuses.items() if status == "DELETED"}
+        self.commits_ahead = commits_ahead
+        self.commits_behind = commits_behind
+        self.head_commit = head_commit
+        self._workspace_generation = workspace_generation
+        self.refreshed_at = time.time()
+        self.save()
+
+        changes["elapsed_seconds"] = time.perf_counter() - start
+        logger.info(f"Refreshed workspace {self.workspace_name}: {len(changes['added'])} added, {len(changes['modified'])} modified, {len(changes['removed'])} removed, {len(to_read)} files read{' (full scan)' if full_scan else ''}")
+        return changes
+
+    def diff_local(self, local_root: str) -> Tuple[List[str], List[str]]:
+        """Compares a local directory with the manifest without calling Dataform.
+        Args:
+            local_root (str): The local directory that mirrors the workspace root.
+        Returns:
+            Tuple[List[str], List[str]]: Paths that must be uploaded (new or different locally) and workspace paths missing locally.
+        """
+        local_files = list_local_files(local_root, self.exclude)
+        to_upload = []
+        for relative_path, local_path in sorted(local_files.items()):
+            state = self.files.get(relative_path)
+            if state is not None and os.path.getsize(local_path) == state["size"]:
+                with open(local_path, "rb") as f:
+                    if content_hash(f.read()) == state["hash"]:
+                        continue
+            to_upload.append(relative_path)
+        return to_upload, sorted(self.files.keys() - local_files.keys())
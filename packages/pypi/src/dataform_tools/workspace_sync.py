@@ -0,0 +1,186 @@
+import fnmatch
+import hashlib
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Set
+from typing_extensions import TypedDict
+
+from ._lazy import dataform_v1beta1
+from .policies import READ
+
+if TYPE_CHECKING:
+    from .dataform_tools import DataformTools
+    from .workspace_state import WorkspaceState
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SYNC_WORKERS = 16
+# Paths that are managed by Dataform itself (or are local-only) and must never be uploaded or removed.
+DEFAULT_SYNC_EXCLUDES = (".git", "node_modules", ".DS_Store")
+
+
+class SyncSummary(TypedDict):
+    uploaded: List[str]
+    removed: List[str]
+    files_uploaded: int
+    files_removed: int
+    files_skipped: int
+    # Workspace files downloaded because neither their size nor the manifest told whether they changed.
+    files_read: int
+    bytes_sent: int
+    elapsed_seconds: float
+
+
+def content_hash(contents: bytes) -> str:
+    """Returns the hex sha256 digest used to compare local and workspace file contents."""
+    return hashlib.sha256(contents).hexdigest()
+
+
+def is_excluded(relative_path: str, exclude: Sequence[str]) -> bool:
+    """Checks whether a workspace relative path, or any of its components, matches one of the exclude globs."""
+    parts = relative_path.split("/")
+    for pattern in exclude:
+        if fnmatch.fnmatchcase(relative_path, pattern):
+            return True
+        if any(fnmatch.fnmatchcase(part, pattern) for part in parts):
+            return True
+    return False
+
+
+def list_local_files(local_root: str, exclude: Sequence[str] = DEFAULT_SYNC_EXCLUDES) -> Dict[str, str]:
+    """Walks a local directory.
+    Args:
+        local_root (str): The directory to walk.
+        exclude (Sequence[str]): Glob patterns of paths (or path components) to skip.
+    Returns:
+        Dict[str, str]: Mapping of workspace relative posix path to absolute local path.
+    """
+    files: Dict[str, str] = {}
+    for directory, directory_names, file_names in os.walk(local_root):
+        relative_directory = os.path.relpath(directory, local_root).replace(os.sep, "/")
+        prefix = "" if relative_directory == "." else f"{relative_directory}/"
+        # prune excluded directories so os.walk does not descend into e.g. node_modules
+        directory_names[:] = [name for name in directory_names if not is_excluded(f"{prefix}{name}", exclude)]
+        for file_name in file_names:
+            relative_path = f"{prefix}{file_name}"
+            if not is_excluded(relative_path, exclude):
+                files[relative_path] = os.path.join(directory, file_name)
+    return files
+
+
+def list_workspace_file_sizes(tools: "DataformTools", repository_name: str, workspace_name: str, executor: ThreadPoolExecutor, exclude: Sequence[str] = DEFAULT_SYNC_EXCLUDES) -> Dict[str, Optional[int]]:
+    """Lists every file in a workspace with its size, querying sibling directories concurrently.
+    Args:
+        tools (DataformTools): The client to use.
+        repository_name (str): The name of the repository.
+        workspace_name (str): The name of the workspace.
+        executor (ThreadPoolExecutor): Executor used to query directories in parallel.
+        exclude (Sequence[str]): Glob patterns of paths (or path components) to skip.
+    Returns:
+        Dict[str, Optional[int]]: Size in bytes by workspace relative path, None when the service returned no metadata.
+    """
+    view = dataform_v1beta1.DirectoryContentsView.DIRECTORY_CONTENTS_VIEW_METADATA
+
+    workspace_path = f"projects/{tools.gcp_project_id}/locations/{tools.gcp_location}/repositories/{repository_name}/workspaces/{workspace_name}"
+
+    def query(path: str):
+        request = dataform_v1beta1.QueryDirectoryContentsRequest(workspace=workspace_path, path=path, view=view)
+        pages = tools._pages(READ, tools.client.query_directory_contents, request)
+        return [(entry.file, entry.directory, entry.metadata.size_bytes if "metadata" in entry else None) for page in pages for entry in page.directory_entries]
+
+    files: Dict[str, Optional[int]] = {}
+    pending = [executor.submit(query, "")]
+    while pending:
+        level, pending = pending, []
+        for future in level:
+            for file_path, directory_path, size in future.result():
+                if file_path and not is_excluded(file_path, exclude):
+                    files[file_path] = size
+                elif directory_path and not is_excluded(directory_path, exclude):
+                    pending.append(executor.submit(query, directory_path))
+    return files
+
+
+def list_workspace_files(tools: "DataformTools", repository_name: str, workspace_name: str, executor: ThreadPoolExecutor, exclude: Sequence[str] = DEFAULT_SYNC_EXCLUDES) -> Set[str]:
+    """Lists every file in a workspace, see list_workspace_file_sizes.
+    Returns:
+        Set[str]: Workspace relative paths of all files.
+    """
+    return set(list_workspace_file_sizes(tools, repository_name, workspace_name, executor, exclude))
+
+
+def sync_directory(tools: "DataformTools", repository_name: str, workspace_name: str, local_root: str, max_workers: int = DEFAULT_SYNC_WORKERS, delete_stale: bool = True, exclude: Sequence[str] = DEFAULT_SYNC_EXCLUDES, state: Optional["WorkspaceState"] = None) -> SyncSummary:
+    """Mirrors a local directory into a workspace, uploading only files whose sha256 differs.
+
+    Workspace files are only downloaded when nothing cheaper decides: a file whose size differs from
+    the local one is uploaded, and with state, a file of the same size is compared with its manifest hash.
+    Args:
+        tools (DataformTools): The client to use.
+        repository_name (str): The name of the repository.
+        workspace_name (str): The name of the workspace.
+        local_root (str): The local directory to mirror into the workspace root.
+        max_workers (int): The number of threads used to read, write and remove files concurrently.
+        delete_stale (bool): Whether to remove workspace files that do not exist locally.
+        exclude (Sequence[str]): Glob patterns of paths (or path components) that are neither uploaded nor removed.
+        state (WorkspaceState|None): Manifest of the workspace, refreshed just before the sync so its hashes are current.
+    Returns:
+        SyncSummary: Counts of uploaded, removed and skipped files, bytes sent and time taken.
+    """
+    if not os.path.isdir(local_root):
+        raise ValueError(f"local_root: {local_root} is not a directory")
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1.")
+
+    start = time.perf_counter()
+    local_files = list_local_files(local_root, exclude)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        remote_files = list_workspace_file_sizes(tools, repository_name, workspace_name, executor, exclude)
+        manifest = state.files if state is not None else {}
+        read_paths: List[str] = []
+
+        def local_contents(relative_path: str) -> bytes:
+            with open(local_files[relative_path], "rb") as f:
+                return f.read()
+
+        def needs_upload(relative_path: str) -> bool:
+            if relative_path not in remote_files:
+                return True
+            local_size = os.path.getsize(local_files[relative_path])
+            remote_size = remote_files[relative_path]
+            if remote_size is not None and remote_size != local_size:
+                return True
+            known = manifest.get(relative_path)
+            if known is not None and known["size"] == local_size:
+                return known["hash"] != content_hash(local_contents(relative_path))
+            read_paths.append(relative_path)
+            remote_hash = content_hash(tools.read_file(repository_name, workspace_name, relative_path))
+            return remote_hash != content_hash(local_contents(relative_path))
+
+        def upload(relative_path: str) -> int:
+            contents = local_contents(relative_path)
+            tools.write_file(repository_name, workspace_name, relative_path, contents)
+            return len(contents)
+
+        local_paths = sorted(local_files)
+        to_upload = [path for path, changed in zip(local_paths, executor.map(needs_upload, local_paths)) if changed]
+        to_remove = sorted(remote_files.keys() - local_files.keys()) if delete_stale else []
+
+        bytes_sent = sum(executor.map(upload, to_upload))
+        list(executor.map(lambda path: tools.remove_file(repository_name, workspace_name, path), to_remove))
+
+    elapsed_seconds = time.perf_counter() - start
+    logger.info(f"Synced {local_root} to workspace {workspace_name}: {len(to_upload)} uploaded, {len(to_remove)} removed in {elapsed_seconds:.2f}s")
+    return {
+        "uploaded": to_upload,
+        "removed": to_remove,
+        "files_uploaded": len(to_upload),
+        "files_removed": len(to_remove),
+        "files_skipped": len(local_files) - len(to_upload),
+        "files_read": len(read_paths),
+        "bytes_sent": bytes_sent,
+        "elapsed_seconds": elapsed_seconds,
+    }
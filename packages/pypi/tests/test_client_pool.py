@@ -0,0 +1,33 @@
+import pytest
+
+from fake_server import FakeDataformServer
+
+
+@pytest.fixture
+def server():
+    with FakeDataformServer(actions=10) as server:
+        yield server
+
+
+def test_double_close_keeps_the_other_lease(server):
+    with server.client_pool(idle_timeout_seconds=0) as pool:
+        first = server.dataform_tools(client_pool=pool)
+        second = server.dataform_tools(client_pool=pool)
+        assert first.client is second.client
+        first.close()
+        first.close()
+        # the second holder still leases the client, so idle eviction must not have closed its channel
+        assert pool.evict_idle() == 0
+        assert list(second.list_repositories()) == []
+        second.close()
+
+
+def test_release_more_often_than_leased_is_ignored(server):
+    with server.client_pool(idle_timeout_seconds=None) as pool:
+        client = pool.acquire()
+        pool.release(client)
+        pool.release(client)
+        assert pool.acquire() is client
+        # leased again, so the extra release must not make it look idle
+        pool.idle_timeout_seconds = 0
+        assert pool.evict_idle() == 0
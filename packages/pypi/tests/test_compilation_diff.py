@@ -0,0 +1,30 @@
+from dataform_tools import CompilationDiff, CompiledGraph, action_fingerprint
+from fake_server import generate_actions
+
+
+def _fingerprints(actions):
+    return {(action.target.database, action.target.schema, action.target.name): action_fingerprint(action) for action in actions}
+
+
+def _config():
+    return {"transitive_dependencies_included": False, "transitive_dependents_included": False, "fully_refresh_incremental_tables_enabled": False}
+
+
+def test_modified_action_and_its_dependents_are_affected():
+    base = generate_actions(50)
+    head = generate_actions(50)
+    head[40].relation.select_query += " where true"
+    graph = CompiledGraph(head)
+    diff = CompilationDiff("base", "head", graph, _fingerprints(base), _fingerprints(head), _config())
+    changed = graph.node_id(("project", "dataset", "table_40"))
+    assert diff.modified == [graph.targets[changed]]
+    assert diff.added == [] and diff.removed == []
+    assert diff.affected == [graph.targets[node_id] for node_id in graph.transitive_dependent_ids([changed], include_seeds=True)]
+    included = diff.to_invocation_config()["included_targets"] or []
+    assert len(included) == len(diff.affected)
+
+
+def test_identical_compilations_have_an_empty_diff():
+    actions = generate_actions(20)
+    diff = CompilationDiff("base", "head", CompiledGraph(actions), _fingerprints(actions), _fingerprints(generate_actions(20)), _config())
+    assert diff.is_empty
@@ -0,0 +1,119 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from google.cloud import dataform_v1beta1
+from google.protobuf import timestamp_pb2
+
+from dataform_tools.history import HistoryWriter, export_invocation_history
+from fake_server import FakeDataformServer
+
+
+REPOSITORY = "repository"
+REPOSITORY_PATH = f"projects/project/locations/location/repositories/{REPOSITORY}"
+WINDOW_START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class MemoryHistoryWriter(HistoryWriter):
+    def __init__(self):
+        self.invocations = []
+        self.actions = []
+
+    def write_invocation(self, row):
+        self.invocations.append(row)
+
+    def write_actions(self, rows):
+        self.actions.extend(rows)
+
+
+@pytest.fixture
+def server():
+    with FakeDataformServer(actions=3) as server:
+        yield server
+
+
+def _add_invocation(server, started_at, state=dataform_v1beta1.WorkflowInvocation.State.SUCCEEDED):
+    """Adds a finished invocation, created after every existing one, that started at started_at (None: never started)."""
+    invocation = dataform_v1beta1.WorkflowInvocation.pb(dataform_v1beta1.WorkflowInvocation())
+    invocation.name = f"{REPOSITORY_PATH}/workflowInvocations/{len(server.invocations) + 1}"
+    invocation.state = state
+    if started_at is not None:
+        invocation.invocation_timing.start_time.CopyFrom(timestamp_pb2.Timestamp(seconds=int(started_at.timestamp())))
+        invocation.invocation_timing.end_time.CopyFrom(timestamp_pb2.Timestamp(seconds=int(started_at.timestamp()) + 60))
+    server.invocations[invocation.name] = (invocation, 0.0)
+    return invocation.name.rsplit("/", 1)[1]
+
+
+def _export(server, writer, **kwargs):
+    async def export():
+        tools = server.async_dataform_tools()
+        try:
+            return await export_invocation_history(tools, REPOSITORY, writer, **kwargs)
+        finally:
+            await tools.close()
+
+    return asyncio.run(export())
+
+
+def test_listing_continues_past_invocations_created_before_the_window(server):
+    # queued: created first but started inside the window, after the next one that started before it
+    queued = _add_invocation(server, WINDOW_START + timedelta(minutes=5))
+    _add_invocation(server, WINDOW_START - timedelta(minutes=10))
+    newest = _add_invocation(server, WINDOW_START + timedelta(minutes=10))
+    writer = MemoryHistoryWriter()
+    summary = _export(server, writer, start_time=WINDOW_START)
+    assert sorted(row["workflow_invocation_id"] for row in writer.invocations) == sorted([queued, newest])
+    assert summary["actions_exported"] == 6
+
+
+def test_invocations_without_start_time_are_exported_once(server, tmp_path):
+    _add_invocation(server, WINDOW_START)
+    never_started = _add_invocation(server, None, dataform_v1beta1.WorkflowInvocation.State.CANCELLED)
+    state_path = os.path.join(tmp_path, "state.json")
+    writer = MemoryHistoryWriter()
+    assert _export(server, writer, state_path=state_path)["invocations_exported"] == 2
+    assert never_started in [row["workflow_invocation_id"] for row in writer.invocations]
+    summary = _export(server, MemoryHistoryWriter(), state_path=state_path)
+    assert summary["invocations_exported"] == 0
+    assert summary["invocations_skipped"] == 2
+
+
+def test_invocations_without_start_time_are_filtered_by_the_next_newer_start(server):
+    old_never_started = _add_invocation(server, None, dataform_v1beta1.WorkflowInvocation.State.CANCELLED)
+    _add_invocation(server, WINDOW_START - timedelta(minutes=30))
+    inside = _add_invocation(server, WINDOW_START + timedelta(minutes=5))
+    new_never_started = _add_invocation(server, None, dataform_v1beta1.WorkflowInvocation.State.CANCELLED)
+    _add_invocation(server, WINDOW_START + timedelta(hours=2))
+    writer = MemoryHistoryWriter()
+    _export(server, writer, start_time=WINDOW_START, end_time=WINDOW_START + timedelta(hours=1))
+    exported = sorted(row["workflow_invocation_id"] for row in writer.invocations)
+    assert exported == sorted([inside])
+    assert old_never_started not in exported and new_never_started not in exported
+
+
+class FailingHistoryWriter(MemoryHistoryWriter):
+    def __init__(self, fail_after):
+        super().__init__()
+        self.fail_after = fail_after
+
+    def write_actions(self, rows):
+        if len(self.invocations) >= self.fail_after:
+            raise OSError("disk full")
+        super().write_actions(rows)
+
+
+def test_invocations_written_before_a_failure_are_not_written_again(server, tmp_path):
+    for minutes in range(4):
+        _add_invocation(server, WINDOW_START + timedelta(minutes=minutes))
+    state_path = os.path.join(tmp_path, "state.json")
+    failing = FailingHistoryWriter(fail_after=2)
+    with pytest.raises(OSError):
+        _export(server, failing, start_time=WINDOW_START, state_path=state_path, max_concurrency=1)
+    writer = MemoryHistoryWriter()
+    _export(server, writer, start_time=WINDOW_START, state_path=state_path, max_concurrency=1)
+    first = {row["workflow_invocation_id"] for row in failing.invocations}
+    second = {row["workflow_invocation_id"] for row in writer.invocations}
+    assert len(first) == 2
+    assert first.isdisjoint(second)
+    assert first | second == {"1", "2", "3", "4"}
@@ -0,0 +1,18 @@
+from dataform_tools import HistogramCollector, PolicyLayer, RpcPolicy
+from dataform_tools.policies import READ
+from fake_server import FakeDataformServer
+
+
+def test_each_page_is_recorded_with_its_own_retries():
+    instrumentation = HistogramCollector()
+    policy = PolicyLayer({READ: RpcPolicy(max_attempts=20, initial_backoff=0.0)})
+    with FakeDataformServer(actions=500, seed=5) as server:
+        with server.dataform_tools(policy=policy, instrumentation=instrumentation) as tools:
+            tools.create_workflow_invocation("repository", "compilation_result", {"transitive_dependencies_included": False, "transitive_dependents_included": False, "fully_refresh_incremental_tables_enabled": False})
+            instrumentation.reset()
+            server.error_rate = 0.3
+            actions = list(tools.iter_workflow_invocation_actions("repository", "1", page_size=100, compact=True))
+    assert len(actions) == 500
+    stats = instrumentation.stats()["query_workflow_invocation_actions"]
+    assert stats["count"] == 5
+    assert stats["retries"] == policy.snapshot()[READ]["retries"] > 0
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from dataform_tools import HistogramCollector, PolicyLayer, RpcPolicy
+from dataform_tools.policies import READ
+from fake_server import FakeDataformServer
+
+
+COMPILATION_RESULT = "projects/project/locations/location/repositories/repository/compilationResults/1"
+
+
+def _policy():
+    return PolicyLayer({READ: RpcPolicy(max_attempts=20, initial_backoff=0.0)})
+
+
+@pytest.fixture
+def server():
+    with FakeDataformServer(actions=250, error_rate=0.3, seed=3) as server:
+        yield server
+
+
+def test_every_page_is_a_call_under_the_policy(server):
+    instrumentation = HistogramCollector()
+    with server.dataform_tools(policy=_policy(), instrumentation=instrumentation) as tools:
+        actions = list(tools.iter_compilation_result_actions(COMPILATION_RESULT, page_size=100, compact=True))
+        assert len(actions) == 250
+        # injected errors on the second and third page are retried instead of failing the iteration
+        assert tools.policy.snapshot()[READ]["calls"] == 3
+    assert instrumentation.stats()["query_compilation_result_actions"]["count"] == 3
+
+
+def test_every_async_page_is_a_call_under_the_policy(server):
+    instrumentation = HistogramCollector()
+
+    async def iterate():
+        async with server.async_dataform_tools(policy=_policy(), instrumentation=instrumentation) as tools:
+            actions = [action async for action in tools.iter_compilation_result_actions(COMPILATION_RESULT, page_size=100, compact=True)]
+            return actions, tools.policy.snapshot()
+
+    actions, counters = asyncio.run(iterate())
+    assert len(actions) == 250
+    assert counters[READ]["calls"] == 3
+    assert instrumentation.stats()["query_compilation_result_actions"]["count"] == 3
@@ -0,0 +1,57 @@
+from google.cloud import dataform_v1beta1
+
+from dataform_tools import ActionRecord, CompiledGraph, InvocationPlan, plan_invocation
+from dataform_tools.actions import compact_compilation_action
+
+
+def _key(name):
+    return ("project", "dataset", name)
+
+
+def _graph(edges):
+    """Builds a graph of tables from (name, dependency names) pairs."""
+    return CompiledGraph(ActionRecord(_key(name), "table", tuple(_key(dependency) for dependency in dependencies)) for name, dependencies in edges)
+
+
+def _config():
+    return {"transitive_dependencies_included": False, "transitive_dependents_included": False, "fully_refresh_incremental_tables_enabled": False}
+
+
+def test_layers_follow_dependencies_through_unselected_nodes():
+    # c -> b -> a with b not selected
+    graph = _graph([("a", ()), ("b", ("a",)), ("c", ("b",))])
+    a, c = graph.node_id(_key("a")), graph.node_id(_key("c"))
+    assert graph.layers([c, a]) == [[a], [c]]
+
+
+def test_layers_of_whole_graph():
+    graph = _graph([("a", ()), ("b", ("a",)), ("c", ("a",)), ("d", ("b", "c"))])
+    assert graph.layers() == [[0], [1, 2], [3]]
+
+
+def test_split_orders_chunks_by_indirect_dependencies():
+    # the selected c is listed before its indirect dependency a, reached only through the unselected b
+    graph = _graph([("c", ("b",)), ("b", ("a",)), ("a", ())])
+    plan = InvocationPlan(graph, sorted([graph.node_id(_key("a")), graph.node_id(_key("c"))]), _config(), [])
+    assert plan.depth == 2
+    chunks = plan.split(1)
+    assert [[target["name"] for target in chunk["included_targets"] or []] for chunk in chunks] == [["a"], ["c"]]
+
+
+def test_disabled_actions_and_declarations_are_not_planned():
+    graph = CompiledGraph([
+        ActionRecord(_key("source"), "declaration"),
+        ActionRecord(_key("a"), "table", (_key("source"),)),
+        ActionRecord(_key("b"), "table", (_key("a"),), disabled=True),
+        ActionRecord(_key("c"), "table", (_key("b"),)),
+    ])
+    plan = plan_invocation(graph, {"included_targets": [{"name": "source"}], "transitive_dependencies_included": False, "transitive_dependents_included": True, "fully_refresh_incremental_tables_enabled": False})
+    assert plan.targets == [_key("a"), _key("c")]
+    assert plan.depth == 2
+
+
+def test_disabled_flag_is_read_from_compiled_actions():
+    action = dataform_v1beta1.CompilationResultAction.pb(dataform_v1beta1.CompilationResultAction())
+    action.target.name = "a"
+    action.operations.disabled = True
+    assert compact_compilation_action(action).disabled
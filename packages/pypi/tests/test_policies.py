@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+from google.api_core import exceptions
+
+from dataform_tools import PolicyLayer, RpcPolicy
+from dataform_tools.policies import READ, CircuitOpenError
+
+
+def _flaky(failures, before_failure=None):
+    calls = []
+
+    def rpc(request, retry=None, timeout=None):
+        calls.append(request)
+        if len(calls) <= failures:
+            if before_failure is not None:
+                before_failure()
+            raise exceptions.ServiceUnavailable("unavailable")
+        return "ok"
+
+    return rpc, calls
+
+
+def test_every_attempt_takes_a_rate_limit_token():
+    layer = PolicyLayer({READ: RpcPolicy(max_attempts=3, initial_backoff=0.0, rate_per_second=50.0, burst=1)})
+    rpc, calls = _flaky(failures=2)
+    assert layer.call(READ, rpc, "request") == "ok"
+    assert len(calls) == 3
+    counters = layer.snapshot()[READ]
+    assert counters["calls"] == 1
+    assert counters["attempts"] == 3
+    assert counters["throttled"] == 2
+
+
+def test_retries_stop_once_the_circuit_opens():
+    layer = PolicyLayer({READ: RpcPolicy(max_attempts=5, initial_backoff=0.0, failure_threshold=1, reset_timeout=60.0)})
+    # another call failing opens the circuit while this one is between attempts
+    rpc, calls = _flaky(failures=5, before_failure=layer._breakers[READ].record_failure)
+    with pytest.raises(CircuitOpenError):
+        layer.call(READ, rpc, "request")
+    assert len(calls) == 1
+    assert layer.snapshot()[READ]["rejected"] == 1
+
+
+def test_async_retries_stop_once_the_circuit_opens():
+    layer = PolicyLayer({READ: RpcPolicy(max_attempts=5, initial_backoff=0.0, failure_threshold=1, reset_timeout=60.0)})
+    sync_rpc, calls = _flaky(failures=5, before_failure=layer._breakers[READ].record_failure)
+
+    async def rpc(request, retry=None, timeout=None):
+        return sync_rpc(request, retry=retry, timeout=timeout)
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(layer.call_async(READ, rpc, "request"))
+    assert len(calls) == 1
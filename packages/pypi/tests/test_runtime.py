@@ -0,0 +1,56 @@
+from google.cloud import dataform_v1beta1
+
+from dataform_tools import ActionRecord, CompiledGraph, DurationHistory, RuntimePredictor
+
+
+def _key(name):
+    return ("project", "dataset", name)
+
+
+def _action(name, state):
+    action = dataform_v1beta1.WorkflowInvocationAction.pb(dataform_v1beta1.WorkflowInvocationAction())
+    action.target.database, action.target.schema, action.target.name = _key(name)
+    action.state = state
+    return action
+
+
+def _predictor():
+    graph = CompiledGraph([ActionRecord(_key("a"), "table"), ActionRecord(_key("b"), "table", (_key("a"),))])
+    history = DurationHistory()
+    history.add(_key("a"), 10.0)
+    history.add(_key("b"), 20.0)
+    return RuntimePredictor(graph, history)
+
+
+def test_prediction_follows_the_critical_path():
+    prediction = _predictor().predict(now=0.0)
+    assert prediction["remaining_seconds"] == 30.0
+    assert prediction["critical_path"] == [_key("a"), _key("b")]
+
+
+def test_unknown_action_state_is_unspecified():
+    predictor = _predictor()
+    state = dataform_v1beta1.WorkflowInvocationAction.State
+    assert predictor.update([_action("a", state.SUCCEEDED), _action("b", 99)]) == 2
+    # finished actions are left out of the estimates
+    assert [estimate["state"] for estimate in predictor.estimates(now=0.0)] == ["STATE_UNSPECIFIED"]
+    prediction = predictor.predict(now=0.0)
+    assert prediction["finished"] == 1
+    assert prediction["remaining_seconds"] == 20.0
+
+
+def test_history_keeps_the_most_recent_samples_in_any_order():
+    history = DurationHistory(max_samples=2)
+    for finished_at, seconds in ((300.0, 3.0), (100.0, 1.0), (400.0, 4.0), (200.0, 2.0)):
+        history.add(_key("a"), seconds, finished_at)
+    assert history.samples[_key("a")] == [4.0, 3.0]
+
+
+def test_rows_appended_oldest_first_keep_the_newest_durations():
+    history = DurationHistory(max_samples=1)
+    rows = [
+        {"database": "project", "schema": "dataset", "name": "a", "state": "SUCCEEDED", "duration_seconds": seconds, "end_time": end_time}
+        for seconds, end_time in (("10.0", "2026-01-01T00:00:00+00:00"), ("20.0", "2026-01-02T00:00:00+00:00"))
+    ]
+    assert history.add_rows(rows) == 2
+    assert history.estimate(_key("a")) == 20.0
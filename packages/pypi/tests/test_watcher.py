@@ -0,0 +1,47 @@
+import asyncio
+
+import grpc
+import pytest
+from google.api_core import exceptions
+
+from dataform_tools import PolicyLayer, RpcPolicy
+from dataform_tools.watcher import WorkflowWatcher
+from fake_server import FakeDataformServer
+
+
+REPOSITORY = "repository"
+
+
+def _watch(server, timeout=5.0):
+    async def watch():
+        async with server.async_dataform_tools(policy=PolicyLayer({"read": RpcPolicy(max_attempts=1)})) as tools:
+            watcher = WorkflowWatcher(tools, min_interval=0.01, max_interval=0.05)
+            try:
+                watcher.watch(REPOSITORY, "1")
+                return await watcher.wait_all(timeout=timeout)
+            finally:
+                await watcher.close()
+
+    return asyncio.run(watch())
+
+
+def _create_invocation(server):
+    with server.dataform_tools() as tools:
+        tools.create_workflow_invocation(REPOSITORY, "compilation_result", {"transitive_dependencies_included": False, "transitive_dependents_included": False, "fully_refresh_incremental_tables_enabled": False})
+
+
+def test_permission_denied_fails_the_watch():
+    with FakeDataformServer(actions=10) as server:
+        _create_invocation(server)
+        server.error_code = grpc.StatusCode.PERMISSION_DENIED
+        server.error_rate = 1.0
+        with pytest.raises(exceptions.PermissionDenied):
+            _watch(server)
+
+
+def test_transient_errors_are_polled_again():
+    with FakeDataformServer(actions=10, seed=1) as server:
+        _create_invocation(server)
+        server.error_rate = 0.5
+        results = _watch(server)
+        assert results[(REPOSITORY, "1")].state.name == "SUCCEEDED"
@@ -0,0 +1,73 @@
+import os
+import time
+
+import pytest
+
+from dataform_tools import WorkspacePoolExhaustedError
+from fake_server import FakeDataformServer
+
+
+REPOSITORY = "repository"
+
+
+@pytest.fixture
+def tools():
+    with FakeDataformServer(actions=10) as server:
+        with server.dataform_tools() as tools:
+            yield tools
+
+
+def _pool(tools, tmp_path, **kwargs):
+    return tools.workspace_pool(REPOSITORY, os.path.join(tmp_path, "pool.json"), **kwargs)
+
+
+def _read(tools, workspace_name, path):
+    try:
+        return tools.read_file(REPOSITORY, workspace_name, path)
+    except Exception:
+        return None
+
+
+def test_released_workspace_is_reset_and_leased_again(tools, tmp_path):
+    pool = _pool(tools, tmp_path, size=1)
+    assert len(pool.warm()) == 1
+    with pool.lease(owner="job-1") as lease:
+        tools.write_file(REPOSITORY, lease.workspace_name, "definitions/changed.sqlx", "select 1")
+    with pool.lease(owner="job-2") as again:
+        assert again.workspace_name == lease.workspace_name
+        assert _read(tools, again.workspace_name, "definitions/changed.sqlx") is None
+    with pool.lease():
+        with pytest.raises(WorkspacePoolExhaustedError):
+            pool.lease()
+
+
+def test_stale_release_leaves_the_new_holder_alone(tools, tmp_path):
+    pool = _pool(tools, tmp_path, size=1, lease_seconds=0.05)
+    stale = pool.lease(owner="crashed")
+    time.sleep(0.1)
+    current = pool.lease(owner="job")
+    assert current.workspace_name == stale.workspace_name
+    tools.write_file(REPOSITORY, current.workspace_name, "definitions/changed.sqlx", "select 1")
+    pool.release(stale)
+    assert _read(tools, current.workspace_name, "definitions/changed.sqlx") == b"select 1"
+
+
+def test_lease_cannot_be_reclaimed_while_it_is_reset(tools, tmp_path, monkeypatch):
+    pool = _pool(tools, tmp_path, size=1, lease_seconds=0.2)
+    lease = pool.lease(owner="job-1")
+    time.sleep(0.3)
+    reset = tools.reset_workspace_changes
+    leased_during_reset = []
+
+    def reset_while_another_job_leases(*args, **kwargs):
+        # the expired lease was extended before the reset, so the other job finds the pool full
+        try:
+            leased_during_reset.append(pool.lease(owner="job-2"))
+        except WorkspacePoolExhaustedError:
+            pass
+        return reset(*args, **kwargs)
+
+    monkeypatch.setattr(tools, "reset_workspace_changes", reset_while_another_job_leases)
+    pool.release(lease)
+    assert leased_during_reset == []
+    assert pool.workspaces()[lease.workspace_name]["status"] == "idle"
@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from fake_server import FakeDataformServer
+
+
+REPOSITORY = "repository"
+WORKSPACE = "workspace"
+WORKSPACE_PATH = f"projects/project/locations/location/repositories/{REPOSITORY}/workspaces/{WORKSPACE}"
+
+
+@pytest.fixture
+def server():
+    with FakeDataformServer(actions=10) as server:
+        server.committed_files.update({(WORKSPACE_PATH, path): contents for path, contents in {"a.sqlx": b"select 1", "b.sqlx": b"select 2"}.items()})
+        server.files.update(server.committed_files)
+        yield server
+
+
+@pytest.fixture
+def state(server, tmp_path):
+    tools = server.dataform_tools()
+    yield tools.workspace_state(REPOSITORY, WORKSPACE, os.path.join(tmp_path, "manifest.json"))
+    tools.close()
+
+
+def test_first_refresh_is_a_full_scan(state):
+    changes = state.refresh()
+    assert changes["full_scan"]
+    assert changes["added"] == ["a.sqlx", "b.sqlx"]
+
+
+def test_incremental_refresh_reads_only_changed_files(state):
+    state.refresh()
+    state.tools.write_file(REPOSITORY, WORKSPACE, "a.sqlx", "select 10")
+    changes = state.refresh()
+    assert not changes["full_scan"]
+    assert changes["files_read"] == 1
+    assert changes["modified"] == ["a.sqlx"]
+    assert state.uncommitted_files == {"a.sqlx": "MODIFIED"}
+
+
+def test_deleted_file_restored_by_reset_is_tracked_again(state, server):
+    state.refresh()
+    state.tools.remove_file(REPOSITORY, WORKSPACE, "b.sqlx")
+    assert state.refresh()["removed"] == ["b.sqlx"]
+    # reset by another client, e.g. in the Dataform UI, so only the git state tells that b.sqlx is back
+    with server.dataform_tools() as tools:
+        tools.reset_workspace_changes(REPOSITORY, WORKSPACE)
+    changes = state.refresh()
+    assert not changes["full_scan"]
+    assert changes["added"] == ["b.sqlx"]
+    assert sorted(state.files) == ["a.sqlx", "b.sqlx"]
+    assert state.deleted == set()
+
+
+def test_deleted_paths_survive_reloading_the_manifest(state, server):
+    state.refresh()
+    state.tools.remove_file(REPOSITORY, WORKSPACE, "b.sqlx")
+    state.refresh()
+    with server.dataform_tools() as tools:
+        reloaded = tools.workspace_state(REPOSITORY, WORKSPACE, state.manifest_path)
+        assert reloaded.deleted == {"b.sqlx"}
+        tools.reset_workspace_changes(REPOSITORY, WORKSPACE)
+        assert reloaded.refresh()["added"] == ["b.sqlx"]
+
+
+def _pull(server, path, contents):
+    # a pulled commit changes the file in HEAD and in the workspace, leaving no uncommitted change behind
+    server.committed_files[(WORKSPACE_PATH, path)] = contents
+    server.files[(WORKSPACE_PATH, path)] = contents
+
+
+def test_pull_through_tools_forces_a_full_scan(state, server):
+    state.refresh()
+    _pull(server, "a.sqlx", b"select 10")
+    state.tools.pull_git_commits(REPOSITORY, WORKSPACE, {"remote_branch": "main", "user_name": "user", "email_address": "user@example.com"})
+    changes = state.refresh()
+    assert changes["full_scan"]
+    assert changes["modified"] == ["a.sqlx"]
+    assert not state.refresh()["full_scan"]
+
+
+def test_moved_head_commit_forces_a_full_scan(state, server):
+    server.commit_shas.insert(0, "first")
+    state.refresh()
+    _pull(server, "b.sqlx", b"select 20")
+    server.commit_shas.insert(0, "second")
+    changes = state.refresh()
+    assert changes["full_scan"]
+    assert changes["modified"] == ["b.sqlx"]
+    assert state.head_commit == "second"
@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from fake_server import FakeDataformServer
+
+
+REPOSITORY = "repository"
+WORKSPACE = "workspace"
+
+
+@pytest.fixture
+def tools():
+    with FakeDataformServer(actions=10) as server:
+        with server.dataform_tools() as tools:
+            yield tools
+
+
+@pytest.fixture
+def project(tmp_path):
+    root = tmp_path / "project"
+    (root / "definitions").mkdir(parents=True)
+    (root / "definitions" / "a.sqlx").write_text("select 1")
+    (root / "definitions" / "b.sqlx").write_text("select 2")
+    return str(root)
+
+
+def test_second_sync_uploads_nothing(tools, project):
+    assert tools.sync_directory(REPOSITORY, WORKSPACE, project)["files_uploaded"] == 2
+    summary = tools.sync_directory(REPOSITORY, WORKSPACE, project)
+    assert summary["files_uploaded"] == 0
+    assert summary["files_skipped"] == 2
+
+
+def test_size_change_is_uploaded_without_reading(tools, project):
+    tools.sync_directory(REPOSITORY, WORKSPACE, project)
+    with open(os.path.join(project, "definitions", "a.sqlx"), "w") as f:
+        f.write("select 100")
+    summary = tools.sync_directory(REPOSITORY, WORKSPACE, project)
+    assert summary["uploaded"] == ["definitions/a.sqlx"]
+    # b.sqlx has the same size, without a manifest it is read to compare
+    assert summary["files_read"] == 1
+
+
+def test_manifest_hashes_avoid_reading_files(tools, project, tmp_path):
+    tools.sync_directory(REPOSITORY, WORKSPACE, project)
+    state = tools.workspace_state(REPOSITORY, WORKSPACE, os.path.join(tmp_path, "manifest.json"))
+    state.refresh()
+    with open(os.path.join(project, "definitions", "a.sqlx"), "w") as f:
+        f.write("select 3")
+    summary = tools.sync_directory(REPOSITORY, WORKSPACE, project, state=state)
+    assert summary["uploaded"] == ["definitions/a.sqlx"]
+    assert summary["files_read"] == 0
+    assert tools.read_file(REPOSITORY, WORKSPACE, "definitions/a.sqlx") == b"select 3"